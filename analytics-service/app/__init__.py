@@ -19,11 +19,26 @@ def create_app():
         "DATABASE_URL", "sqlite:///../smartretail.db"
     )
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    # Seconds a rollup may lag before a read triggers an incremental refresh
+    app.config["ANALYTICS_ROLLUP_MAX_AGE"] = int(os.getenv("ANALYTICS_ROLLUP_MAX_AGE", "60"))
+    # Top-products cache: rows kept per window/metric and how stale it may be served
+    app.config["ANALYTICS_TOP_CACHE_SIZE"] = int(os.getenv("ANALYTICS_TOP_CACHE_SIZE", "100"))
+    app.config["ANALYTICS_TOP_MAX_AGE"] = int(os.getenv("ANALYTICS_TOP_MAX_AGE", "3600"))
+    # Response cache for GET endpoints: entries kept and max seconds served
+    # (any order/product write invalidates sooner)
+    app.config["ANALYTICS_CACHE_SIZE"] = int(os.getenv("ANALYTICS_CACHE_SIZE", "256"))
+    app.config["ANALYTICS_CACHE_TTL"] = int(os.getenv("ANALYTICS_CACHE_TTL", "60"))
 
     db.init_app(app)
     CORS(app)
 
+    from .cache import response_cache
+    response_cache.init_app(app)
+
     from .routes import analytics_bp
     app.register_blueprint(analytics_bp, url_prefix="/analytics")
 
+    from .commands import analytics_cli
+    app.cli.add_command(analytics_cli)
+
     return app
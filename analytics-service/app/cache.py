@@ -0,0 +1,121 @@
+# analytics-service/app/cache.py
+"""
+In-process response cache for the analytics GET endpoints.
+
+Entries are keyed on path + sorted query string and tagged with
+utils.data_version(). An entry is served only while that version is
+unchanged and it is younger than the TTL, so an order write invalidates
+it on the next read instead of after the TTL. Least recently used entries
+are evicted beyond `maxsize`.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from functools import wraps
+from hashlib import sha1
+from threading import Lock
+from urllib.parse import urlencode
+import time
+from flask import Response, make_response, request
+from .utils import data_version
+
+
+@dataclass
+class _Entry:
+    version: str
+    stored_at: float
+    body: bytes
+    mimetype: str
+    etag: str
+
+
+class ResponseCache:
+    def __init__(self, maxsize=256, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def init_app(self, app):
+        self.maxsize = app.config["ANALYTICS_CACHE_SIZE"]
+        self.ttl = app.config["ANALYTICS_CACHE_TTL"]
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry.version != version
+                                      or time.monotonic() - entry.stored_at > self.ttl):
+                del self._entries[key]
+                self.invalidations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, version, body, mimetype):
+        entry = _Entry(version, time.monotonic(), body, mimetype, sha1(body).hexdigest())
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def invalidate(self, prefix=""):
+        """Drop entries whose key starts with `prefix` (all by default)."""
+        with self._lock:
+            stale = [k for k in self._entries if k.startswith(prefix)]
+            for k in stale:
+                del self._entries[k]
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+response_cache = ResponseCache()
+
+
+def _cache_key():
+    # date.today() is part of the key: ranges default to "the last N days"
+    query = urlencode(sorted(request.args.items(multi=True)))
+    return f"{request.path}?{query}#{date.today()}"
+
+
+def cached_response(view):
+    """Serve a JSON GET view from response_cache, with ETag / 304 support."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = _cache_key()
+        version = data_version()
+        entry = response_cache.get(key, version)
+        state = "HIT"
+        if entry is None:
+            state = "MISS"
+            resp = make_response(view(*args, **kwargs))
+            if resp.status_code != 200 or resp.is_streamed:
+                return resp
+            entry = response_cache.put(key, version, resp.get_data(), resp.mimetype)
+
+        if entry.etag in request.if_none_match:
+            return Response(status=304, headers={"ETag": f'"{entry.etag}"', "X-Cache": state})
+        return Response(entry.body, mimetype=entry.mimetype,
+                        headers={"ETag": f'"{entry.etag}"', "X-Cache": state})
+    return wrapper
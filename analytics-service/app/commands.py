@@ -0,0 +1,131 @@
+# analytics-service/app/commands.py
+from datetime import date, timedelta
+import click
+from flask.cli import AppGroup
+from sqlalchemy import text
+from . import db
+from .rollups import (
+    CHANGED_DAYS_SQL, DAILY_FUNNEL_SQL, DAILY_SALES_SQL, PRODUCT_DAILY_SQL, backfill,
+    rebuild_daily_funnel, rebuild_daily_sales, rebuild_product_daily,
+    refresh_daily_funnel, refresh_daily_sales, refresh_product_daily,
+    top_products_sql,
+)
+from .utils import DATA_VERSION_SQL
+from .routes import (
+    DAILY_ROLLUP_READ_SQL, FORECAST_READ_SQL, FUNNEL_ROLLUP_READ_SQL,
+    DAILY_REVENUE_SQL, REORDER_DEMAND_SQL, STOCK_STATUS_SQL, TOP_CACHE_READ_SQL, sales_report_sql,
+)
+
+analytics_cli = AppGroup("analytics", help="Maintain the analytics rollup tables.")
+
+# name -> rebuild(start, end) for every watermark-driven rollup
+ROLLUPS = {
+    "daily_sales": rebuild_daily_sales,
+    "product_daily": rebuild_product_daily,
+    "daily_funnel": rebuild_daily_funnel,
+}
+
+
+def _echo_runs(name, runs):
+    days = sum((b - a).days for a, b in runs)
+    click.echo(f"{name}: {days} day(s) recomputed in {len(runs)} range(s)")
+
+
+@analytics_cli.command("backfill")
+@click.argument("names", nargs=-1, type=click.Choice(sorted(ROLLUPS)))
+def backfill_command(names):
+    """Rebuild rollups over the full order history (all of them by default)."""
+    for name in names or sorted(ROLLUPS):
+        _echo_runs(name, backfill(name, ROLLUPS[name]))
+
+
+@analytics_cli.command("refresh")
+def refresh_command():
+    """Fold orders changed since the last run into every rollup."""
+    _echo_runs("daily_sales", refresh_daily_sales())
+    _echo_runs("product_daily", refresh_product_daily())
+    _echo_runs("daily_funnel", refresh_daily_funnel())
+
+
+# Indexes the analytics queries rely on. auth-service's models declare the
+# same ones for `flask db migrate`; this applies them to an existing DB.
+ANALYTICS_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_orders_status_created_id ON orders (status, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_orders_created_status_id ON orders (created_at, status, id)",
+    "CREATE INDEX IF NOT EXISTS ix_orders_created_status_totals ON orders (created_at, status, item_count, total_amount)",
+    "CREATE INDEX IF NOT EXISTS ix_orders_updated_at ON orders (updated_at)",
+    "CREATE INDEX IF NOT EXISTS ix_products_updated_at ON products (updated_at)",
+    "CREATE INDEX IF NOT EXISTS ix_order_items_order_prod_qty_price ON order_items (order_id, product_id, quantity, price)",
+    "CREATE INDEX IF NOT EXISTS ix_apd_class_day_prod ON analytics_product_daily (status_class, day, product_id, quantity, revenue)",
+    'CREATE INDEX IF NOT EXISTS ix_atp_window_metric_rank ON analytics_top_products ("window", metric, rank)',
+]
+
+
+def _plan_checks():
+    """(name, sql, params) for every query the analytics endpoints issue."""
+    today = date.today()
+    rng = {"start": str(today - timedelta(days=30)), "end": str(today + timedelta(days=1))}
+    since = {"since": str(today - timedelta(days=30))}
+    checks = [
+        ("changed_days", CHANGED_DAYS_SQL, since),
+        ("daily_sales_rollup", DAILY_SALES_SQL, rng),
+        ("product_daily_rollup", PRODUCT_DAILY_SQL, rng),
+        ("sales_summary_read", DAILY_ROLLUP_READ_SQL, rng),
+        ("top_products_cache", TOP_CACHE_READ_SQL, {"window": "30d", "metric": "revenue", "limit": 10}),
+        ("daily_funnel_rollup", DAILY_FUNNEL_SQL, rng),
+        ("funnel_read", FUNNEL_ROLLUP_READ_SQL, rng),
+        ("forecast_read", FORECAST_READ_SQL, {"today": str(today), "lim": 14}),
+        ("daily_revenue", DAILY_REVENUE_SQL, rng),
+        ("stock_status", STOCK_STATUS_SQL, since),
+        ("reorder_demand", REORDER_DEMAND_SQL, rng),
+        ("data_version", DATA_VERSION_SQL, {}),
+    ]
+    for metric in ("revenue", "quantity"):
+        checks.append((f"top_products_{metric}", top_products_sql(metric), dict(since, limit=10)))
+        checks.append((f"top_products_{metric}_all", top_products_sql(metric, all_time=True), {"limit": 10}))
+    for group in ("day", "week", "month"):
+        checks.append((f"sales_report_{group}", sales_report_sql(group), rng))
+    return checks
+
+
+# stock/status lists the whole catalog by design
+ALLOWED_SCANS = {("stock_status", "p")}
+
+
+def full_table_scans():
+    """{query name: [full table scans in its plan]} for every query in _plan_checks() (SQLite)."""
+    result = {}
+    for name, sql, params in _plan_checks():
+        plan = db.session.execute(text("EXPLAIN QUERY PLAN " + sql), params).all()
+        scans = []
+        for row in plan:
+            words = row[-1].split()
+            # "SCAN o" is a full table scan; "SCAN o USING [COVERING] INDEX ..." is not
+            if len(words) >= 2 and words[0] == "SCAN" and "INDEX" not in words \
+                    and words[1] != "CONSTANT" and (name, words[1]) not in ALLOWED_SCANS:
+                scans.append(row[-1])
+        result[name] = scans
+    return result
+
+
+@analytics_cli.command("ensure-indexes")
+def ensure_indexes_command():
+    """Create the covering indexes used by the analytics queries."""
+    for ddl in ANALYTICS_INDEXES:
+        db.session.execute(text(ddl))
+    db.session.commit()
+    click.echo(f"{len(ANALYTICS_INDEXES)} index(es) ensured")
+
+
+@analytics_cli.command("check-plans")
+def check_plans_command():
+    """EXPLAIN QUERY PLAN every analytics query; exit 1 on a full table scan (SQLite)."""
+    if db.engine.dialect.name != "sqlite":
+        raise click.ClickException("check-plans reads SQLite query plans only")
+
+    failures = 0
+    for name, scans in full_table_scans().items():
+        failures += len(scans)
+        click.echo(f"FAIL {name}: {'; '.join(scans)}" if scans else f"ok   {name}")
+    if failures:
+        raise SystemExit(1)
@@ -0,0 +1,127 @@
+# analytics-service/app/exports.py
+"""
+Streaming writers for the sales report exports.
+
+Rows are pulled from a server-side cursor in fixed-size batches and each
+batch is encoded and handed to the response before the next one is read,
+so memory stays flat however many rows the range covers.
+"""
+import csv
+import io
+from sqlalchemy import text
+from . import db
+
+CSV_BATCH_ROWS = 10_000
+COLUMNAR_BATCH_ROWS = 65_536  # one Parquet row group / Arrow record batch each
+
+# Raw order lines for BI tooling (every status, one row per order_item)
+ORDER_LINES_SQL = """
+SELECT
+  o.id AS order_id,
+  o.created_at,
+  o.status,
+  o.user_id,
+  oi.product_id,
+  oi.quantity,
+  oi.price,
+  oi.quantity * oi.price AS line_total
+FROM orders o
+JOIN order_items oi ON oi.order_id = o.id
+WHERE o.created_at >= :start AND o.created_at < :end
+ORDER BY o.created_at ASC, o.id ASC
+"""
+
+# column -> arrow type name; also fixes the CSV header order
+SUMMARY_COLUMNS = {"period": "string", "orders": "int64", "items": "int64", "revenue": "float64"}
+LINE_COLUMNS = {
+    "order_id": "int64", "created_at": "string", "status": "string", "user_id": "int64",
+    "product_id": "int64", "quantity": "int64", "price": "float64", "line_total": "float64",
+}
+
+MIMETYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def stream_batches(sql, params, batch_size):
+    """Yield lists of row tuples from a server-side cursor."""
+    conn = db.session.connection().execution_options(stream_results=True, yield_per=batch_size)
+    result = conn.execute(text(sql), params)
+    try:
+        for part in result.partitions(batch_size):
+            yield part
+    finally:
+        result.close()
+
+
+def _csv_value(v):
+    return f"{v:.2f}" if isinstance(v, float) else v
+
+
+def csv_chunks(columns, batches):
+    sio = io.StringIO()
+    writer = csv.writer(sio)
+    writer.writerow(columns)
+    for batch in batches:
+        writer.writerows([_csv_value(v) for v in row] for row in batch)
+        yield sio.getvalue()
+        sio.seek(0)
+        sio.truncate(0)
+    yield sio.getvalue()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back whatever pyarrow wrote since the last drain."""
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._pos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._buf += b
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self):
+        return self._pos
+
+    def drain(self):
+        out = bytes(self._buf)
+        self._buf.clear()
+        return out
+
+
+def columnar_chunks(fmt, columns, batches):
+    """Encode batches as a Parquet file or an Arrow IPC stream, chunk by chunk."""
+    import pyarrow as pa
+
+    schema = pa.schema([(name, getattr(pa, kind)()) for name, kind in columns.items()])
+    sink = _ChunkSink()
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    for batch in batches:
+        arrays = [
+            pa.array([None if v is None else (str(v) if f.type == pa.string() else v) for v in col], type=f.type)
+            for f, col in zip(schema, zip(*batch))
+        ]
+        writer.write_batch(pa.record_batch(arrays, schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def columnar_available():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
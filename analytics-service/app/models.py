@@ -27,7 +27,36 @@ class AnalyticsTopProduct(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, nullable=False, index=True)
     window = db.Column(db.String(20), nullable=False, default="30d")
+    metric = db.Column(db.String(20), nullable=False, default="revenue")
     rank = db.Column(db.Integer, nullable=False)
     quantity = db.Column(db.Integer, nullable=False, default=0)
     revenue = db.Column(db.Float, nullable=False, default=0.0)
     computed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class AnalyticsWatermark(db.Model):
+    __tablename__ = "analytics_watermarks"
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False, unique=True)
+    value = db.Column(db.DateTime)
+    refreshed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class AnalyticsProductDaily(db.Model):
+    __tablename__ = "analytics_product_daily"
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    product_id = db.Column(db.Integer, nullable=False)
+    status_class = db.Column(db.String(10), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+
+class AnalyticsDailyFunnel(db.Model):
+    __tablename__ = "analytics_daily_funnel"
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False, index=True, unique=True)
+    created = db.Column(db.Integer, nullable=False, default=0)
+    pending = db.Column(db.Integer, nullable=False, default=0)
+    reserved = db.Column(db.Integer, nullable=False, default=0)
+    paid = db.Column(db.Integer, nullable=False, default=0)
+    shipped = db.Column(db.Integer, nullable=False, default=0)
+    delivered = db.Column(db.Integer, nullable=False, default=0)
+    cancelled = db.Column(db.Integer, nullable=False, default=0)
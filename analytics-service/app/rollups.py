@@ -0,0 +1,299 @@
+# analytics-service/app/rollups.py
+"""
+Incremental materializers for the analytics_* rollup tables.
+
+Every rollup keeps a watermark in analytics_watermarks: the newest
+orders.updated_at it has already folded in. A refresh only looks at orders
+touched since then, collects the days those orders were created on and
+recomputes just those days, so a late status change (pending -> cancelled)
+rewrites the day it belongs to instead of the whole table.
+"""
+from datetime import datetime, date, timedelta
+from sqlalchemy import text
+from . import db
+
+# Re-read this much before the watermark so rows committed slightly out of
+# order by concurrent writers are not missed. Re-folding a day is idempotent.
+WATERMARK_OVERLAP = timedelta(seconds=60)
+
+
+def _to_dt(v):
+    """SQLite hands back TEXT for raw selects; Postgres a datetime."""
+    if v is None or isinstance(v, datetime):
+        return v
+    return datetime.fromisoformat(str(v))
+
+
+def _to_date(v):
+    if v is None or isinstance(v, date):
+        return v
+    return date.fromisoformat(str(v)[:10])
+
+
+def get_watermark(name):
+    row = db.session.execute(
+        text("SELECT value, refreshed_at FROM analytics_watermarks WHERE name = :name"),
+        {"name": name},
+    ).first()
+    if not row:
+        return None, None
+    return _to_dt(row[0]), _to_dt(row[1])
+
+
+def _set_watermark(name, value):
+    params = {"name": name, "value": str(value) if value else None, "now": str(datetime.utcnow())}
+    updated = db.session.execute(
+        text("UPDATE analytics_watermarks SET value = :value, refreshed_at = :now WHERE name = :name"),
+        params,
+    ).rowcount
+    if not updated:
+        db.session.execute(
+            text("INSERT INTO analytics_watermarks (name, value, refreshed_at) VALUES (:name, :value, :now)"),
+            params,
+        )
+
+
+def _day_runs(days):
+    """Collapse a set of days into contiguous [start, end) ranges."""
+    runs = []
+    for d in sorted(days):
+        if runs and runs[-1][1] == d:
+            runs[-1][1] = d + timedelta(days=1)
+        else:
+            runs.append([d, d + timedelta(days=1)])
+    return [tuple(r) for r in runs]
+
+
+CHANGED_DAYS_SQL = """
+SELECT DATE(created_at) AS day, MAX(updated_at) AS touched
+FROM orders
+WHERE updated_at >= :since
+GROUP BY DATE(created_at)
+"""
+
+
+def _changed_days(since):
+    """
+    Days (by created_at) that hold at least one order touched at/after `since`,
+    plus the newest updated_at seen. `since=None` means everything.
+    """
+    if since is None:
+        # One scalar subquery per bound so each is a single index probe
+        row = db.session.execute(text("""
+            SELECT (SELECT MIN(created_at) FROM orders) AS first,
+                   (SELECT MAX(created_at) FROM orders) AS last,
+                   (SELECT MAX(updated_at) FROM orders) AS touched
+        """)).first()
+        if not row or row[0] is None:
+            return [], None
+        first, last = _to_date(row[0]), _to_date(row[1])
+        return [(first, last + timedelta(days=1))], _to_dt(row[2])
+
+    rows = db.session.execute(text(CHANGED_DAYS_SQL), {"since": str(since)}).all()
+    if not rows:
+        return [], None
+    touched = max(_to_dt(r[1]) for r in rows)
+    return _day_runs({_to_date(r[0]) for r in rows}), touched
+
+
+def refresh(name, rebuild):
+    """
+    Bring rollup `name` up to date. `rebuild(start, end)` must replace every
+    rollup row whose day falls in [start, end). Returns the day ranges that
+    were recomputed. Runs in the caller's session and commits once.
+    """
+    watermark, _ = get_watermark(name)
+    since = watermark - WATERMARK_OVERLAP if watermark else None
+    runs, touched = _changed_days(since)
+
+    for start, end in runs:
+        rebuild(start, end)
+
+    _set_watermark(name, max(filter(None, [watermark, touched]), default=None))
+    db.session.commit()
+    return runs
+
+
+def ensure_fresh(name, rebuild, max_age_seconds):
+    """Refresh `name` if it was never built or is older than max_age_seconds."""
+    _, refreshed_at = get_watermark(name)
+    if refreshed_at and datetime.utcnow() - refreshed_at < timedelta(seconds=max_age_seconds):
+        return []
+    return refresh(name, rebuild)
+
+
+# ---------------------------
+# analytics_daily_sales
+# ---------------------------
+# Reads the per-order totals kept on orders (order-service totals.py), no join
+DAILY_SALES_SQL = """
+SELECT
+  DATE(o.created_at) AS day,
+  COUNT(*) AS orders_count,
+  COALESCE(SUM(o.item_count), 0) AS items_count,
+  COALESCE(SUM(o.total_amount), 0.0) AS revenue
+FROM orders o
+WHERE o.created_at >= :start AND o.created_at < :end
+  AND o.status IN ('pending','reserved','paid','shipped','delivered')
+GROUP BY DATE(o.created_at)
+ORDER BY day ASC
+"""
+
+
+def rebuild_daily_sales(start, end):
+    params = {"start": str(start), "end": str(end)}
+    rows = db.session.execute(text(DAILY_SALES_SQL), params).mappings().all()
+    db.session.execute(
+        text("DELETE FROM analytics_daily_sales WHERE day >= :start AND day < :end"),
+        params,
+    )
+    if rows:
+        now = str(datetime.utcnow())
+        db.session.execute(
+            text("""
+            INSERT INTO analytics_daily_sales (day, orders_count, items_count, revenue, created_at, updated_at)
+            VALUES (:day, :orders_count, :items_count, :revenue, :now, :now)
+            """),
+            [dict(r, day=str(r["day"]), now=now) for r in rows],
+        )
+
+
+def refresh_daily_sales():
+    return refresh("daily_sales", rebuild_daily_sales)
+
+
+# ---------------------------
+# analytics_product_daily
+# ---------------------------
+PRODUCT_DAILY_SQL = """
+INSERT INTO analytics_product_daily (day, product_id, status_class, quantity, revenue)
+SELECT
+  DATE(o.created_at) AS day,
+  oi.product_id,
+  CASE WHEN o.status IN ('paid','shipped','delivered') THEN 'sold' ELSE o.status END AS status_class,
+  SUM(oi.quantity),
+  SUM(oi.quantity * oi.price)
+FROM orders o
+JOIN order_items oi ON oi.order_id = o.id
+WHERE o.created_at >= :start AND o.created_at < :end
+  AND o.status IN ('pending','reserved','paid','shipped','delivered')
+GROUP BY DATE(o.created_at), oi.product_id, status_class
+"""
+
+
+def rebuild_product_daily(start, end):
+    params = {"start": str(start), "end": str(end)}
+    db.session.execute(
+        text("DELETE FROM analytics_product_daily WHERE day >= :start AND day < :end"),
+        params,
+    )
+    db.session.execute(text(PRODUCT_DAILY_SQL), params)
+
+
+def refresh_product_daily():
+    return refresh("product_daily", rebuild_product_daily)
+
+
+# ---------------------------
+# analytics_daily_funnel
+# ---------------------------
+FUNNEL_STATUSES = ("pending", "reserved", "paid", "shipped", "delivered", "cancelled")
+
+# One pass over the range: created count and every status via conditional sums
+DAILY_FUNNEL_SQL = """
+SELECT
+  DATE(o.created_at) AS day,
+  COUNT(*) AS created,
+""" + ",\n".join(
+    f"  SUM(CASE WHEN o.status = '{s}' THEN 1 ELSE 0 END) AS {s}" for s in FUNNEL_STATUSES
+) + """
+FROM orders o
+WHERE o.created_at >= :start AND o.created_at < :end
+GROUP BY DATE(o.created_at)
+ORDER BY day ASC
+"""
+
+
+def rebuild_daily_funnel(start, end):
+    params = {"start": str(start), "end": str(end)}
+    db.session.execute(
+        text("DELETE FROM analytics_daily_funnel WHERE day >= :start AND day < :end"),
+        params,
+    )
+    columns = ", ".join(("day", "created") + FUNNEL_STATUSES)
+    db.session.execute(text(f"INSERT INTO analytics_daily_funnel ({columns}) " + DAILY_FUNNEL_SQL), params)
+
+
+def refresh_daily_funnel():
+    return refresh("daily_funnel", rebuild_daily_funnel)
+
+
+def backfill(name, rebuild):
+    """Forget rollup `name`'s watermark and rebuild it over the whole history."""
+    db.session.execute(text("DELETE FROM analytics_watermarks WHERE name = :name"), {"name": name})
+    return refresh(name, rebuild)
+
+
+# ---------------------------
+# analytics_top_products
+# ---------------------------
+# Windows precomputed by refresh_top_products(); None means all time.
+TOP_WINDOWS = {"7d": 7, "30d": 30, "90d": 90, "all": None}
+TOP_METRICS = ("revenue", "quantity")
+
+
+def top_products_sql(metric, all_time=False):
+    """Rank products over analytics_product_daily; see refresh_product_daily()."""
+    order_expr = "total_revenue DESC" if metric == "revenue" else "total_qty DESC"
+    since_clause = "" if all_time else "AND f.day >= :since"
+    return f"""
+    SELECT
+      p.id AS product_id,
+      p.name AS product_name,
+      SUM(f.quantity) AS total_qty,
+      SUM(f.revenue) AS total_revenue
+    FROM analytics_product_daily f
+    JOIN products p ON p.id = f.product_id
+    WHERE f.status_class = 'sold' {since_clause}
+    GROUP BY p.id, p.name
+    ORDER BY {order_expr}, p.id ASC
+    LIMIT :limit
+    """
+
+
+def refresh_top_products(size):
+    """
+    Recompute the top `size` products for every TOP_WINDOWS x TOP_METRICS
+    pair and replace analytics_top_products in one transaction.
+    Returns the computed_at stamp written on every row.
+    """
+    refresh_product_daily()
+    computed_at = datetime.utcnow()
+    rows = []
+    for window, days in TOP_WINDOWS.items():
+        params = {"limit": size}
+        if days is not None:
+            params["since"] = str(date.today() - timedelta(days=days))
+        for metric in TOP_METRICS:
+            ranked = db.session.execute(
+                text(top_products_sql(metric, all_time=days is None)), params
+            ).mappings().all()
+            rows.extend({
+                "product_id": r["product_id"],
+                "window": window,
+                "metric": metric,
+                "rank": i,
+                "quantity": r["total_qty"],
+                "revenue": r["total_revenue"],
+                "computed_at": str(computed_at),
+            } for i, r in enumerate(ranked, start=1))
+
+    db.session.execute(text("DELETE FROM analytics_top_products"))
+    if rows:
+        db.session.execute(text("""
+            INSERT INTO analytics_top_products
+              (product_id, "window", metric, rank, quantity, revenue, computed_at)
+            VALUES (:product_id, :window, :metric, :rank, :quantity, :revenue, :computed_at)
+        """), rows)
+    db.session.commit()
+    return computed_at
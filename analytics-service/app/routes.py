@@ -1,9 +1,20 @@
-from flask import Blueprint, request, Response, jsonify
+from flask import Blueprint, request, Response, jsonify, current_app, stream_with_context, url_for
 from sqlalchemy import text
 from datetime import datetime, timedelta, date
-from io import StringIO
-import csv
+import numpy as np
 from . import db
+from .forecasting import MODELS as FORECAST_MODELS, demand_rates, forecast
+from .cache import cached_response, response_cache
+from .exports import (
+    COLUMNAR_BATCH_ROWS, CSV_BATCH_ROWS, LINE_COLUMNS, MIMETYPES, ORDER_LINES_SQL,
+    SUMMARY_COLUMNS, columnar_available, columnar_chunks, csv_chunks, stream_batches,
+)
+from .rollups import (
+    DAILY_FUNNEL_SQL, DAILY_SALES_SQL, FUNNEL_STATUSES, TOP_METRICS, TOP_WINDOWS,
+    ensure_fresh, rebuild_daily_funnel, rebuild_daily_sales, rebuild_product_daily,
+    refresh_daily_funnel, refresh_daily_sales, refresh_product_daily,
+    refresh_top_products, top_products_sql,
+)
 
 analytics_bp = Blueprint("analytics", __name__)
 
@@ -30,6 +41,10 @@ def _rows(sql, **params):
     # Convert RowMapping objects to regular dictionaries
     return [dict(row) for row in result]
 
+def _day_ranges(runs):
+    """[start, end) day runs from rollups.refresh() as inclusive JSON ranges"""
+    return [{"from": str(a), "to": str(b - timedelta(days=1))} for a, b in runs]
+
 def _grouping_clause(group: str) -> str:
     """
     SQLite strftime:
@@ -47,23 +62,48 @@ def _grouping_clause(group: str) -> str:
 # ---------------------------
 # GET /analytics/sales-summary?from=YYYY-MM-DD&to=YYYY-MM-DD
 # ---------------------------
+DAILY_ROLLUP_READ_SQL = """
+SELECT day, orders_count, items_count, revenue
+FROM analytics_daily_sales
+WHERE day >= :start AND day < :end
+ORDER BY day ASC
+"""
+
 @analytics_bp.get("/sales-summary")
+@cached_response
 def sales_summary():
-    start, end = _date_bounds()
-    sql = """
-    SELECT
-      DATE(o.created_at) AS day,
-      COUNT(DISTINCT o.id) AS orders_count,
-      COALESCE(SUM(oi.quantity), 0) AS items_count,
-      COALESCE(SUM(oi.quantity * oi.price), 0.0) AS revenue
-    FROM orders o
-    LEFT JOIN order_items oi ON oi.order_id = o.id
-    WHERE DATE(o.created_at) BETWEEN :start AND :end
-      AND o.status IN ('pending','reserved','paid','shipped','delivered')
-    GROUP BY DATE(o.created_at)
-    ORDER BY day ASC
     """
-    data = _rows(sql, start=str(start), end=str(end))
+    Closed days come from analytics_daily_sales (refreshed incrementally when
+    older than ANALYTICS_ROLLUP_MAX_AGE); today's partial bucket is always
+    computed live. Falls back to the full live query if the rollup is missing.
+    """
+    start, end = _date_bounds()
+    today = date.today()
+    live_from = max(start, today)
+
+    try:
+        ensure_fresh("daily_sales", rebuild_daily_sales,
+                     current_app.config["ANALYTICS_ROLLUP_MAX_AGE"])
+        data = []
+        if start < today:
+            data = _rows(DAILY_ROLLUP_READ_SQL, start=str(start),
+                         end=str(min(end + timedelta(days=1), today)))
+            for r in data:
+                r["day"] = str(r["day"])
+        source = "rollup"
+    except Exception:
+        db.session.rollback()
+        live_from = start
+        data = []
+        source = "live"
+
+    if live_from <= end:
+        data += _rows(DAILY_SALES_SQL, start=str(live_from), end=str(end + timedelta(days=1)))
+        if source == "rollup" and start < today:
+            source = "rollup+live"
+        elif source == "rollup":
+            source = "live"
+
     totals = {
         "orders": sum(r["orders_count"] for r in data),
         "items": sum(r["items_count"] for r in data),
@@ -71,38 +111,80 @@ def sales_summary():
     }
     return jsonify({
         "range": {"from": str(start), "to": str(end)}, 
+        "source": source,
         "daily": data, 
         "totals": totals
     })
 
+# ---------------------------
+# POST /analytics/rollups/refresh
+# ---------------------------
+@analytics_bp.post("/rollups/refresh")
+def refresh_rollups():
+    """Fold orders changed since the last run into the rollup tables."""
+    daily_sales = _day_ranges(refresh_daily_sales())
+    product_daily = _day_ranges(refresh_product_daily())
+    daily_funnel = _day_ranges(refresh_daily_funnel())
+    # cached responses may have been built from the rollups before this run
+    response_cache.invalidate()
+    return jsonify({
+        "message": "rollups refreshed",
+        "daily_sales": daily_sales,
+        "product_daily": product_daily,
+        "daily_funnel": daily_funnel,
+    })
+
 # ---------------------------
 # GET /analytics/top-products
 # ---------------------------
+TOP_CACHE_READ_SQL = """
+SELECT t.product_id, p.name AS product_name, t.quantity AS total_qty,
+       t.revenue AS total_revenue, t.computed_at
+FROM analytics_top_products t
+JOIN products p ON p.id = t.product_id
+WHERE t."window" = :window AND t.metric = :metric
+ORDER BY t.rank ASC
+LIMIT :limit
+"""
+
 @analytics_bp.get("/top-products")
+@cached_response
 def top_products():
-    window = int(request.args.get("window", "30"))
+    """
+    Served from analytics_top_products when `window` is one of the
+    precomputed ones (7, 30, 90, all), `limit` fits in the cache and the
+    cache is younger than `max_age` seconds; live SQL otherwise.
+    """
+    window_arg = (request.args.get("window") or "30").lower()
+    window = None if window_arg == "all" else int(window_arg)
     limit = int(request.args.get("limit", "10"))
     metric = (request.args.get("metric") or "revenue").lower()
-    since = date.today() - timedelta(days=window)
+    metric = "revenue" if metric == "revenue" else "quantity"
+    max_age = int(request.args.get("max_age", current_app.config["ANALYTICS_TOP_MAX_AGE"]))
 
-    order_expr = "total_revenue DESC" if metric == "revenue" else "total_qty DESC"
+    window_key = "all" if window is None else f"{window}d"
+    data, computed_at, source = [], None, "live"
+    if window_key in TOP_WINDOWS and limit <= current_app.config["ANALYTICS_TOP_CACHE_SIZE"]:
+        try:
+            data = _rows(TOP_CACHE_READ_SQL, window=window_key, metric=metric, limit=limit)
+        except Exception:
+            db.session.rollback()
+            data = []
+        if data:
+            computed_at = data[0]["computed_at"]
+            if isinstance(computed_at, str):
+                computed_at = datetime.fromisoformat(computed_at)
+            if datetime.utcnow() - computed_at <= timedelta(seconds=max_age):
+                source = "cache"
 
-    sql = f"""
-    SELECT
-      p.id AS product_id,
-      p.name AS product_name,
-      COALESCE(SUM(oi.quantity), 0) AS total_qty,
-      COALESCE(SUM(oi.quantity * oi.price), 0.0) AS total_revenue
-    FROM orders o
-    JOIN order_items oi ON oi.order_id = o.id
-    JOIN products p ON p.id = oi.product_id
-    WHERE DATE(o.created_at) >= :since
-      AND o.status IN ('paid','shipped','delivered')
-    GROUP BY p.id, p.name
-    ORDER BY {order_expr}
-    LIMIT :limit
-    """
-    data = _rows(sql, since=str(since), limit=limit)
+    if source == "live":
+        ensure_fresh("product_daily", rebuild_product_daily,
+                     current_app.config["ANALYTICS_ROLLUP_MAX_AGE"])
+        params = {"limit": limit}
+        if window is not None:
+            params["since"] = str(date.today() - timedelta(days=window))
+        data = _rows(top_products_sql(metric, all_time=window is None), **params)
+        computed_at = datetime.utcnow()
     
     # Add rank and format data
     formatted_data = []
@@ -116,171 +198,230 @@ def top_products():
         })
     
     return jsonify({
-        "window_days": window, 
+        "window_days": window_arg if window is None else window, 
         "metric": metric, 
+        "source": source,
+        "computed_at": computed_at.isoformat(),
+        "max_age_seconds": max_age,
         "top": formatted_data
     })
 
+# ---------------------------
+# POST /analytics/top-products/refresh
+# ---------------------------
+@analytics_bp.post("/top-products/refresh")
+def refresh_top_products_cache():
+    size = current_app.config["ANALYTICS_TOP_CACHE_SIZE"]
+    computed_at = refresh_top_products(size)
+    response_cache.invalidate(url_for("analytics.top_products"))
+    return jsonify({
+        "message": "top products cache refreshed",
+        "windows": list(TOP_WINDOWS),
+        "metrics": list(TOP_METRICS),
+        "size": size,
+        "computed_at": computed_at.isoformat(),
+    })
+
 # ---------------------------
 # GET /analytics/conversion-funnel
 # ---------------------------
+FUNNEL_ROLLUP_READ_SQL = """
+SELECT day, created, pending, reserved, paid, shipped, delivered, cancelled
+FROM analytics_daily_funnel
+WHERE day >= :start AND day < :end
+ORDER BY day ASC
+"""
+
+FUNNEL_KEYS = ("created",) + FUNNEL_STATUSES
+
+def _funnel_period(day, group):
+    """Cohort label for a day; matches _grouping_clause() formats."""
+    if group == "week":
+        return day.strftime("%Y-W%W")
+    return str(day)
+
 @analytics_bp.get("/conversion-funnel")
+@cached_response
 def conversion_funnel():
-    start, end = _date_bounds()
-    
-    # Total created orders in range
-    created_sql = """
-    SELECT COUNT(*) AS n FROM orders o
-    WHERE DATE(o.created_at) BETWEEN :start AND :end
     """
-    created_result = _rows(created_sql, start=str(start), end=str(end))
-    created = created_result[0]["n"] if created_result else 0
-    
-    # Orders by status in that range
-    stages_sql = """
-    SELECT o.status, COUNT(*) AS n
-    FROM orders o
-    WHERE DATE(o.created_at) BETWEEN :start AND :end
-      AND o.status IN ('reserved','paid','shipped','delivered','cancelled')
-    GROUP BY o.status
+    Orders created in the range and the status each one is in now.
+    `group=day|week` adds the same funnel per cohort period. Closed days come
+    from analytics_daily_funnel, today's from one live conditional-aggregation
+    scan (the whole range if the rollup is unavailable).
     """
-    stage_rows = _rows(stages_sql, start=str(start), end=str(end))
-    stage_map = {r["status"]: r["n"] for r in stage_rows}
-
-    result = {
-        "created": created,
-        "reserved": stage_map.get("reserved", 0),
-        "paid": stage_map.get("paid", 0),
-        "shipped": stage_map.get("shipped", 0),
-        "delivered": stage_map.get("delivered", 0),
-        "cancelled": stage_map.get("cancelled", 0),
+    start, end = _date_bounds()
+    group = (request.args.get("group") or "").lower()
+    if group not in ("", "day", "week"):
+        return jsonify({"error": "group must be day or week"}), 400
+    today = date.today()
+    live_from = max(start, today)
+
+    try:
+        ensure_fresh("daily_funnel", rebuild_daily_funnel,
+                     current_app.config["ANALYTICS_ROLLUP_MAX_AGE"])
+        days = []
+        if start < today:
+            days = _rows(FUNNEL_ROLLUP_READ_SQL, start=str(start),
+                         end=str(min(end + timedelta(days=1), today)))
+        source = "rollup"
+    except Exception:
+        db.session.rollback()
+        live_from = start
+        days = []
+        source = "live"
+
+    if live_from <= end:
+        days += _rows(DAILY_FUNNEL_SQL, start=str(live_from), end=str(end + timedelta(days=1)))
+        source = "rollup+live" if source == "rollup" and start < today else "live"
+
+    totals = dict.fromkeys(FUNNEL_KEYS, 0)
+    cohorts = {}
+    for r in days:
+        period = _funnel_period(_parse_date(str(r["day"])), group)
+        bucket = cohorts.setdefault(period, dict.fromkeys(FUNNEL_KEYS, 0))
+        for k in FUNNEL_KEYS:
+            bucket[k] += r[k] or 0
+            totals[k] += r[k] or 0
+
+    out = {
+        "range": {"from": str(start), "to": str(end)},
+        "source": source,
+        "funnel": totals,
     }
-    return jsonify({
-        "range": {"from": str(start), "to": str(end)}, 
-        "funnel": result
-    })
+    if group:
+        out["group"] = group
+        out["cohorts"] = [{"period": p, **c} for p, c in cohorts.items()]
+    return jsonify(out)
 
 # ---------------------------
 # GET /analytics/forecast
 # ---------------------------
+# Daily revenue of completed sales in [start, end), used as forecast history
+DAILY_REVENUE_SQL = """
+SELECT f.day, SUM(f.revenue) AS revenue
+FROM analytics_product_daily f
+WHERE f.status_class = 'sold' AND f.day >= :start AND f.day < :end
+GROUP BY f.day
+"""
+
+FORECAST_READ_SQL = """
+SELECT day, yhat, yhat_lower, yhat_upper, model_name 
+FROM analytics_sales_forecast 
+WHERE day >= :today 
+ORDER BY day ASC 
+LIMIT :lim
+"""
+
+def _revenue_history(lookback):
+    """
+    Completed-sales revenue per day for up to `lookback` days before today,
+    starting at the first day with sales; quiet days inside count as 0.
+    """
+    ensure_fresh("product_daily", rebuild_product_daily,
+                 current_app.config["ANALYTICS_ROLLUP_MAX_AGE"])
+    today = date.today()
+    by_day = {str(r["day"]): r["revenue"] for r in _rows(
+        DAILY_REVENUE_SQL, start=str(today - timedelta(days=lookback)), end=str(today))}
+    if not by_day:
+        return []
+    start = date.fromisoformat(min(by_day))
+    return [by_day.get(str(start + timedelta(days=i)), 0.0) for i in range((today - start).days)]
+
+def _forecast_rows(fc):
+    today = date.today()
+    return [{
+        "day": str(today + timedelta(days=i + 1)),
+        "yhat": round(float(fc.yhat[i]), 2),
+        "yhat_lower": round(float(fc.yhat_lower[i]), 2),
+        "yhat_upper": round(float(fc.yhat_upper[i]), 2),
+        "model_name": fc.model_name,
+    } for i in range(len(fc.yhat))]
+
 @analytics_bp.get("/forecast")
+@cached_response
 def get_forecast():
     horizon = int(request.args.get("horizon", "14"))
     
     # Try table first
-    forecast_sql = """
-    SELECT day, yhat, yhat_lower, yhat_upper, model_name 
-    FROM analytics_sales_forecast 
-    WHERE day >= DATE('now') 
-    ORDER BY day ASC 
-    LIMIT :lim
-    """
     try:
-        rows = _rows(forecast_sql, lim=horizon)
+        rows = _rows(FORECAST_READ_SQL, today=str(date.today()), lim=horizon)
         if rows:
             return jsonify({"source": "table", "forecast": rows})
     except:
-        pass  # Table might not exist, fallback to naive
+        db.session.rollback()  # Table might not exist, forecast on the fly
 
-    # Fallback: naive mean of last 30 days' revenue
-    hist_sql = """
-    SELECT DATE(o.created_at) AS day, COALESCE(SUM(oi.quantity*oi.price),0) AS revenue
-    FROM orders o
-    LEFT JOIN order_items oi ON oi.order_id = o.id
-    WHERE DATE(o.created_at) BETWEEN DATE('now','-30 day') AND DATE('now','-1 day')
-    AND o.status IN ('paid','shipped','delivered')
-    GROUP BY DATE(o.created_at)
-    """
-    hist = _rows(hist_sql)
-    avg = (sum(r["revenue"] for r in hist) / len(hist)) if hist else 0.0
-    avg = round(avg, 2)
-    
-    out = []
-    for i in range(1, horizon + 1):
-        d = date.today() + timedelta(days=i)
-        out.append({
-            "day": str(d), 
-            "yhat": avg, 
-            "yhat_lower": None, 
-            "yhat_upper": None, 
-            "model_name": "naive_mean"
-        })
-    return jsonify({"source": "fallback", "forecast": out})
+    # Fallback: model picked by backtest over the last 90 days, not stored
+    fc = forecast(_revenue_history(90), horizon)
+    return jsonify({"source": "fallback", "forecast": _forecast_rows(fc)})
 
 # ---------------------------
-# POST /analytics/forecast/rebuild
+# POST /analytics/forecast/rebuild?horizon=14&lookback=365&model=auto
 # ---------------------------
 @analytics_bp.post("/forecast/rebuild")
 def rebuild_forecast():
     horizon = int(request.args.get("horizon", "14"))
-    lookback = int(request.args.get("lookback", "30"))
+    lookback = int(request.args.get("lookback", "365"))
+    model = (request.args.get("model") or "auto").lower()
+    if model != "auto" and model not in FORECAST_MODELS:
+        return jsonify({"error": f"model must be auto or one of {sorted(FORECAST_MODELS)}"}), 400
 
-    # Get historical data
-    hist_sql = """
-    SELECT DATE(o.created_at) AS day, COALESCE(SUM(oi.quantity*oi.price),0) AS revenue
-    FROM orders o
-    LEFT JOIN order_items oi ON oi.order_id = o.id
-    WHERE DATE(o.created_at) BETWEEN DATE('now', :lb) AND DATE('now','-1 day')
-    AND o.status IN ('paid','shipped','delivered')
-    GROUP BY DATE(o.created_at)
-    """
-    hist = _rows(hist_sql, lb=f"-{lookback} day")
-    avg = (sum(r["revenue"] for r in hist) / len(hist)) if hist else 0.0
-    avg = round(avg, 2)
+    fc = forecast(_revenue_history(lookback), horizon, model)
+    rows = _forecast_rows(fc)
+    summary = {
+        "model": fc.model_name,
+        "horizon": horizon,
+        "lookback": lookback,
+        "backtest_mae": fc.mae,
+        "yhat": rows[0]["yhat"] if rows else 0.0,
+    }
 
     # Try to create/update forecast table (might fail if table doesn't exist)
     try:
-        for i in range(1, horizon + 1):
-            d = date.today() + timedelta(days=i)
-            db.session.execute(
-                text("""
-                INSERT OR REPLACE INTO analytics_sales_forecast 
-                (day, yhat, yhat_lower, yhat_upper, model_name, created_at)
-                VALUES (:day, :yhat, NULL, NULL, 'naive_mean', CURRENT_TIMESTAMP)
-                """),
-                {"day": str(d), "yhat": avg}
-            )
+        db.session.execute(text("DELETE FROM analytics_sales_forecast WHERE day > :today"),
+                           {"today": str(date.today())})
+        db.session.execute(
+            text("""
+            INSERT OR REPLACE INTO analytics_sales_forecast 
+            (day, yhat, yhat_lower, yhat_upper, model_name, created_at)
+            VALUES (:day, :yhat, :yhat_lower, :yhat_upper, :model_name, CURRENT_TIMESTAMP)
+            """),
+            rows
+        )
         db.session.commit()
-        return jsonify({
-            "message": "forecast rebuilt", 
-            "model": "naive_mean", 
-            "horizon": horizon, 
-            "lookback": lookback, 
-            "yhat": avg
-        })
+        response_cache.invalidate(url_for("analytics.get_forecast"))
+        return jsonify({"message": "forecast rebuilt", **summary})
     except Exception as e:
+        db.session.rollback()
         return jsonify({
             "message": "forecast rebuilt (memory only)", 
-            "model": "naive_mean", 
-            "horizon": horizon, 
-            "lookback": lookback, 
-            "yhat": avg,
+            **summary,
             "note": "forecast table not available"
         })
 
+def sales_report_sql(group):
+    return f"""
+    SELECT
+      {_grouping_clause(group)} AS period,
+      COUNT(*) AS orders,
+      COALESCE(SUM(o.item_count), 0) AS items,
+      COALESCE(SUM(o.total_amount), 0.0) AS revenue
+    FROM orders o
+    WHERE o.created_at >= :start AND o.created_at < :end
+      AND o.status IN ('paid','shipped','delivered')
+    GROUP BY period
+    ORDER BY period ASC
+    """
+
 # ---------------------------
 # GET /analytics/reports/sales
 # ---------------------------
 @analytics_bp.get("/reports/sales")
+@cached_response
 def reports_sales():
     group = (request.args.get("group") or "day").lower()
     start, end = _date_bounds()
-    g = _grouping_clause(group)
 
-    sql = f"""
-    SELECT
-      {g} AS period,
-      COUNT(DISTINCT o.id) AS orders,
-      COALESCE(SUM(oi.quantity), 0) AS items,
-      COALESCE(SUM(oi.quantity * oi.price), 0.0) AS revenue
-    FROM orders o
-    LEFT JOIN order_items oi ON oi.order_id = o.id
-    WHERE DATE(o.created_at) BETWEEN :start AND :end
-      AND o.status IN ('paid','shipped','delivered')
-    GROUP BY period
-    ORDER BY period ASC
-    """
-    rows = _rows(sql, start=str(start), end=str(end))
+    rows = _rows(sales_report_sql(group), start=str(start), end=str(end + timedelta(days=1)))
     totals = {
         "orders": sum(r["orders"] for r in rows),
         "items": sum(r["items"] for r in rows),
@@ -295,84 +436,80 @@ def reports_sales():
 
 # ---------------------------
 # GET /analytics/reports/sales.csv
+# GET /analytics/reports/sales/export?format=csv|parquet|arrow&level=summary|lines
 # ---------------------------
-@analytics_bp.get("/reports/sales.csv")
-def reports_sales_csv():
+def _export_response(fmt):
     group = (request.args.get("group") or "day").lower()
+    level = (request.args.get("level") or "summary").lower()
     start, end = _date_bounds()
-    g = _grouping_clause(group)
+    params = {"start": str(start), "end": str(end + timedelta(days=1))}
 
-    sql = f"""
-    SELECT
-      {g} AS period,
-      COUNT(DISTINCT o.id) AS orders,
-      COALESCE(SUM(oi.quantity), 0) AS items,
-      COALESCE(SUM(oi.quantity * oi.price), 0.0) AS revenue
-    FROM orders o
-    LEFT JOIN order_items oi ON oi.order_id = o.id
-    WHERE DATE(o.created_at) BETWEEN :start AND :end
-      AND o.status IN ('paid','shipped','delivered')
-    GROUP BY period
-    ORDER BY period ASC
-    """
-    rows = _rows(sql, start=str(start), end=str(end))
+    if fmt not in MIMETYPES:
+        return jsonify({"error": "format must be csv, parquet or arrow"}), 400
+    if fmt != "csv" and not columnar_available():
+        return jsonify({"error": f"{fmt} export needs pyarrow installed"}), 501
 
-    sio = StringIO()
-    writer = csv.writer(sio)
-    writer.writerow(["period", "orders", "items", "revenue"])
-    for r in rows:
-        writer.writerow([r["period"], r["orders"], r["items"], f'{round(r["revenue"],2):.2f}'])
-    csv_bytes = sio.getvalue()
-    
+    if level == "lines":
+        sql, columns, name = ORDER_LINES_SQL, LINE_COLUMNS, "lines"
+    else:
+        sql, columns, name = sales_report_sql(group), SUMMARY_COLUMNS, group
+
+    if fmt == "csv":
+        body = csv_chunks(list(columns), stream_batches(sql, params, CSV_BATCH_ROWS))
+    else:
+        body = columnar_chunks(fmt, columns, stream_batches(sql, params, COLUMNAR_BATCH_ROWS))
+
+    ext = {"csv": "csv", "parquet": "parquet", "arrow": "arrows"}[fmt]
     return Response(
-        csv_bytes,
-        mimetype="text/csv",
-        headers={"Content-Disposition": f'attachment; filename="sales_{group}_{start}_{end}.csv"'}
+        stream_with_context(body),
+        mimetype=MIMETYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="sales_{name}_{start}_{end}.{ext}"'}
     )
 
+@analytics_bp.get("/reports/sales.csv")
+def reports_sales_csv():
+    return _export_response("csv")
+
+@analytics_bp.get("/reports/sales/export")
+def reports_sales_export():
+    return _export_response((request.args.get("format") or "csv").lower())
+
 # ---------------------------
 # GET /analytics/stock/status
 # ---------------------------
+STOCK_STATUS_SQL = """
+WITH window_facts AS (
+  SELECT
+    f.product_id,
+    SUM(CASE WHEN f.status_class = 'sold' THEN f.quantity ELSE 0 END) AS sold_qty,
+    SUM(CASE WHEN f.status_class = 'reserved' THEN f.quantity ELSE 0 END) AS reserved_qty
+  FROM analytics_product_daily f
+  WHERE f.status_class IN ('sold','reserved')
+    AND f.day >= :since
+  GROUP BY f.product_id
+)
+SELECT
+  p.id AS product_id,
+  p.name,
+  p.stock,
+  p.price,
+  COALESCE(w.sold_qty, 0) AS sold_last_window,
+  COALESCE(w.reserved_qty, 0) AS reserved
+FROM products p
+LEFT JOIN window_facts w ON w.product_id = p.id
+ORDER BY p.name ASC
+"""
+
 @analytics_bp.get("/stock/status")
+@cached_response
 def stock_status():
     low_threshold = int(request.args.get("low_threshold", "5"))
     window = int(request.args.get("window", "30"))
     since = date.today() - timedelta(days=window)
 
-    sql = """
-    WITH sold AS (
-      SELECT
-        oi.product_id,
-        COALESCE(SUM(oi.quantity),0) AS sold_qty
-      FROM orders o
-      JOIN order_items oi ON oi.order_id = o.id
-      WHERE DATE(o.created_at) >= :since
-        AND o.status IN ('paid','shipped','delivered')
-      GROUP BY oi.product_id
-    ),
-    reserved AS (
-      SELECT
-        oi.product_id,
-        COALESCE(SUM(oi.quantity),0) AS reserved_qty
-      FROM orders o
-      JOIN order_items oi ON oi.order_id = o.id
-      WHERE DATE(o.created_at) >= :since
-        AND o.status = 'reserved'
-      GROUP BY oi.product_id
-    )
-    SELECT
-      p.id AS product_id,
-      p.name,
-      p.stock,
-      p.price,
-      COALESCE(s.sold_qty, 0) AS sold_last_window,
-      COALESCE(r.reserved_qty, 0) AS reserved
-    FROM products p
-    LEFT JOIN sold s ON s.product_id = p.id
-    LEFT JOIN reserved r ON r.product_id = p.id
-    ORDER BY p.name ASC
-    """
-    rows = _rows(sql, since=str(since))
+    ensure_fresh("product_daily", rebuild_product_daily,
+                 current_app.config["ANALYTICS_ROLLUP_MAX_AGE"])
+    rows = _rows(STOCK_STATUS_SQL, since=str(since))
 
     inventory_value = 0.0
     formatted_rows = []
@@ -395,4 +532,108 @@ def stock_status():
         "window_days": window,
         "inventory_value": round(inventory_value, 2),
         "rows": formatted_rows
-    })
\ No newline at end of file
+    })
+
+# ---------------------------
+# GET /analytics/stock/reorder
+# ---------------------------
+REORDER_DEMAND_SQL = """
+SELECT f.product_id, f.day, f.quantity
+FROM analytics_product_daily f
+WHERE f.status_class = 'sold' AND f.day >= :start AND f.day < :end
+"""
+
+# Stock-out dates further out than this are reported as null: with tiny
+# demand, stock / rate runs past what a date (or a C int) can hold
+STOCKOUT_HORIZON_DAYS = 3650
+
+@analytics_bp.get("/stock/reorder")
+@cached_response
+def stock_reorder():
+    """
+    Reorder suggestions for the whole catalog in one pass: completed sales
+    over `lookback` days become a products x days matrix, and demand, days
+    of cover, stock-out date and reorder quantity are computed on it with
+    NumPy.
+      reorder_qty = ceil(rate * (lead_time + review_days) + safety_stock - stock)
+      safety_stock = z * sigma * sqrt(lead_time)
+    """
+    lookback = int(request.args.get("lookback", "56"))
+    lead_time = int(request.args.get("lead_time", "7"))
+    review_days = int(request.args.get("review_days", "7"))
+    z = float(request.args.get("z", "1.65"))
+    include_all = request.args.get("all", "false").lower() in ("1", "true", "yes")
+    limit = request.args.get("limit", type=int)
+
+    ensure_fresh("product_daily", rebuild_product_daily,
+                 current_app.config["ANALYTICS_ROLLUP_MAX_AGE"])
+
+    today = date.today()
+    start = today - timedelta(days=lookback)
+    conn = db.session.connection()
+    products = conn.execute(text("SELECT id, name, stock FROM products ORDER BY id")).all()
+    facts = conn.execute(text(REORDER_DEMAND_SQL), {"start": str(start), "end": str(today)}).all()
+
+    ids = np.array([p[0] for p in products], dtype=np.int64)
+    stock = np.array([p[2] or 0 for p in products], dtype=float)
+    matrix = np.zeros((len(ids), lookback))
+    if facts and len(ids):
+        f_ids, f_days, f_qty = zip(*facts)
+        f_ids = np.array(f_ids, dtype=np.int64)
+        rows = np.searchsorted(ids, f_ids)
+        known = (rows < len(ids)) & (ids[np.minimum(rows, len(ids) - 1)] == f_ids)
+        cols = (np.array(f_days, dtype="datetime64[D]") - np.datetime64(start)).astype(np.int64)
+        np.add.at(matrix, (rows[known], cols[known]), np.array(f_qty, dtype=float)[known])
+
+    rate, sigma = demand_rates(matrix)
+    safety = z * sigma * np.sqrt(lead_time)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cover = np.where(rate > 0, stock / rate, np.inf)
+    reorder_qty = np.maximum(0, np.ceil(rate * (lead_time + review_days) + safety - stock))
+
+    picked = np.arange(len(ids)) if include_all else np.flatnonzero(reorder_qty > 0)
+    picked = picked[np.argsort(cover[picked], kind="stable")]
+    if limit:
+        picked = picked[:limit]
+
+    out = []
+    for i in picked.tolist():
+        finite = np.isfinite(cover[i])
+        out.append({
+            "product_id": int(ids[i]),
+            "name": products[i][1],
+            "stock": int(stock[i]),
+            "daily_demand": round(float(rate[i]), 3),
+            "demand_std": round(float(sigma[i]), 3),
+            "days_of_cover": round(float(cover[i]), 1) if finite else None,
+            "stockout_date": (str(today + timedelta(days=int(cover[i])))
+                              if cover[i] <= STOCKOUT_HORIZON_DAYS else None),
+            "safety_stock": int(np.ceil(safety[i])),
+            "reorder_point": int(np.ceil(rate[i] * lead_time + safety[i])),
+            "reorder_qty": int(reorder_qty[i]),
+        })
+
+    return jsonify({
+        "lookback_days": lookback,
+        "lead_time_days": lead_time,
+        "review_days": review_days,
+        "z": z,
+        "products_evaluated": int(len(ids)),
+        "products_to_reorder": int((reorder_qty > 0).sum()),
+        "computed_at": datetime.utcnow().isoformat(),
+        "rows": out,
+    })
+
+# ---------------------------
+# GET /analytics/cache/stats
+# ---------------------------
+@analytics_bp.get("/cache/stats")
+def cache_stats():
+    return jsonify(response_cache.stats())
+
+# ---------------------------
+# POST /analytics/cache/clear
+# ---------------------------
+@analytics_bp.post("/cache/clear")
+def cache_clear():
+    return jsonify({"message": "cache cleared", "dropped": response_cache.invalidate()})
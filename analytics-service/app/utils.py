@@ -0,0 +1,22 @@
+# analytics-service/app/utils.py
+from sqlalchemy import text
+from . import db
+
+# Each bound is its own scalar subquery so SQLite answers it with one index probe
+DATA_VERSION_SQL = """
+SELECT (SELECT MAX(updated_at) FROM orders) AS orders_updated,
+       (SELECT MAX(id) FROM orders) AS orders_max_id,
+       (SELECT MAX(updated_at) FROM products) AS products_updated,
+       (SELECT MAX(id) FROM products) AS products_max_id,
+       (SELECT MAX(seq) FROM order_events) AS order_events_seq
+"""
+
+
+def data_version():
+    """
+    Cheap token that changes whenever an order or product is written
+    (inserted or updated), or an order event is recorded. Results derived
+    from orders/products stay valid for as long as it is unchanged.
+    """
+    row = db.session.execute(text(DATA_VERSION_SQL)).first()
+    return "|".join("" if v is None else str(v) for v in row)
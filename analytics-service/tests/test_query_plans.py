@@ -0,0 +1,43 @@
+# analytics-service/tests/test_query_plans.py
+"""
+No analytics query may fall back to a full table scan: every query's plan
+is checked on a fresh schema with the same function `flask analytics
+check-plans` runs.
+"""
+import pytest
+from sqlalchemy import text
+
+
+@pytest.fixture(scope="module")
+def app(db_path):
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("DATABASE_URL", "sqlite:///" + db_path)
+        from app import create_app
+        app = create_app()
+    with app.app_context():
+        yield app
+
+
+def test_no_full_table_scans(app):
+    from app.commands import full_table_scans
+    scans = {name: s for name, s in full_table_scans().items() if s}
+    assert scans == {}
+
+
+def _run_ddl(db, ddl):
+    db.session.execute(text(ddl))
+    db.session.commit()
+    # pysqlite keeps prepared EXPLAIN statements per connection and SQLite
+    # does not re-plan them after a schema change: start from a new one
+    db.session.remove()
+    db.engine.dispose()
+
+
+def test_missing_index_is_caught(app):
+    from app import db
+    from app.commands import ANALYTICS_INDEXES, full_table_scans
+    _run_ddl(db, "DROP INDEX ix_orders_updated_at")
+    try:
+        assert full_table_scans()["changed_days"] == ["SCAN orders"]
+    finally:
+        _run_ddl(db, next(ddl for ddl in ANALYTICS_INDEXES if "ix_orders_updated_at" in ddl))
@@ -0,0 +1,104 @@
+# analytics-service/tests/test_rollups.py
+"""
+The incremental rollups (rollups.py) against the live SQL: a refresh folds
+in orders changed since the watermark, so a status change made days after
+an order was placed rewrites the day the order was created on.
+"""
+import sqlite3
+from datetime import date, datetime, timedelta
+
+import pytest
+
+DAY1, DAY2 = date.today() - timedelta(days=5), date.today() - timedelta(days=4)
+# (id, created day, status, product, quantity, price)
+ORDERS = [
+    (1, DAY1, "paid", 1, 2, 10.0),
+    (2, DAY1, "pending", 2, 1, 4.0),
+    (3, DAY2, "delivered", 1, 3, 10.0),
+    (4, DAY2, "cancelled", 2, 5, 4.0),
+]
+
+
+@pytest.fixture(scope="module")
+def db(db_path):
+    con = sqlite3.connect(db_path)
+    con.execute("INSERT INTO users (id, first_name, email, password_hash) VALUES (1, 'c', 'c@example.com', 'x')")
+    con.executemany("INSERT INTO products (id, name, price, stock) VALUES (?, ?, 1.0, 10)", [(1, "A"), (2, "B")])
+    for oid, day, status, pid, qty, price in ORDERS:
+        created = f"{day} 12:00:00"
+        con.execute("INSERT INTO orders (id, user_id, status, created_at, updated_at, total_amount, item_count, "
+                    "line_count) VALUES (?, 1, ?, ?, ?, ?, ?, 1)", (oid, status, created, created, qty * price, qty))
+        con.execute("INSERT INTO order_items (order_id, product_id, quantity, price) VALUES (?, ?, ?, ?)",
+                    (oid, pid, qty, price))
+    con.commit()
+    yield con
+    con.close()
+
+
+@pytest.fixture(scope="module")
+def client(db, db_path):
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("DATABASE_URL", "sqlite:///" + db_path)
+        from app import create_app
+        app = create_app()
+    return app.test_client()
+
+
+def _daily_sales(db):
+    return db.execute("SELECT day, orders_count, items_count, revenue FROM analytics_daily_sales "
+                      "ORDER BY day").fetchall()
+
+
+def _sold(db):
+    return db.execute("SELECT day, product_id, quantity, revenue FROM analytics_product_daily "
+                      "WHERE status_class = 'sold' ORDER BY day, product_id").fetchall()
+
+
+def _funnel(db, day):
+    return db.execute("SELECT created, pending, paid, delivered, cancelled FROM analytics_daily_funnel "
+                      "WHERE day = ?", (str(day),)).fetchone()
+
+
+def test_refresh_builds_every_rollup(client, db):
+    resp = client.post("/analytics/rollups/refresh")
+    assert resp.status_code == 200
+    assert resp.get_json()["daily_sales"] == [{"from": str(DAY1), "to": str(DAY2)}]
+
+    # cancelled orders count in the funnel only
+    assert _daily_sales(db) == [(str(DAY1), 2, 3, 24.0), (str(DAY2), 1, 3, 30.0)]
+    assert _sold(db) == [(str(DAY1), 1, 2, 20.0), (str(DAY2), 1, 3, 30.0)]
+    assert _funnel(db, DAY1) == (2, 1, 1, 0, 0)
+    assert _funnel(db, DAY2) == (2, 0, 0, 1, 1)
+
+
+def test_refresh_is_idempotent(client, db):
+    before = _daily_sales(db), _sold(db), _funnel(db, DAY1), _funnel(db, DAY2)
+    # only the WATERMARK_OVERLAP before the newest change is read again
+    assert client.post("/analytics/rollups/refresh").get_json()["daily_sales"] == [
+        {"from": str(DAY2), "to": str(DAY2)}]
+    assert (_daily_sales(db), _sold(db), _funnel(db, DAY1), _funnel(db, DAY2)) == before
+
+
+def test_late_status_change_rewrites_its_creation_day(client, db):
+    # order 2, placed on DAY1, is paid today and order 1 is cancelled
+    now = str(datetime.utcnow())
+    db.execute("UPDATE orders SET status = 'paid', updated_at = ? WHERE id = 2", (now,))
+    db.execute("UPDATE orders SET status = 'cancelled', updated_at = ? WHERE id = 1", (now,))
+    db.commit()
+
+    body = client.post("/analytics/rollups/refresh").get_json()
+    assert body["daily_sales"] == body["product_daily"] == body["daily_funnel"] == [
+        {"from": str(DAY1), "to": str(DAY2)}]
+    assert _daily_sales(db) == [(str(DAY1), 1, 1, 4.0), (str(DAY2), 1, 3, 30.0)]
+    assert _sold(db) == [(str(DAY1), 2, 1, 4.0), (str(DAY2), 1, 3, 30.0)]
+    assert _funnel(db, DAY1) == (2, 0, 1, 0, 1)
+
+
+def test_summary_from_the_rollup_matches_the_live_query(client, db):
+    summary = client.get(f"/analytics/sales-summary?from={DAY1}&to={DAY2}").get_json()
+    assert summary["source"] == "rollup"
+    live = db.execute(
+        "SELECT COUNT(*), SUM(oi.quantity), SUM(oi.quantity * oi.price) FROM orders o "
+        "JOIN order_items oi ON oi.order_id = o.id "
+        "WHERE o.status IN ('pending','reserved','paid','shipped','delivered')").fetchone()
+    assert summary["totals"] == {"orders": live[0], "items": live[1], "revenue": live[2]}
@@ -33,4 +33,7 @@ def create_app():
     from .routes import auth_bp
     app.register_blueprint(auth_bp)
 
+    from .commands import schema_cli
+    app.cli.add_command(schema_cli)
+
     return app
@@ -0,0 +1,13 @@
+# auth-service/app/commands.py
+import click
+from flask.cli import AppGroup
+from . import schema
+
+schema_cli = AppGroup("schema", help="Upgrade an existing database to the current models.")
+
+
+@schema_cli.command("ensure")
+def ensure_command():
+    """Add the tables, columns and indexes an existing database is missing."""
+    added = schema.ensure()
+    click.echo(f"added: {', '.join(added)}" if added else "schema up to date")
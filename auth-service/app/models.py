@@ -1,4 +1,5 @@
 from datetime import datetime
+from sqlalchemy import DDL, event
 from . import db
 from werkzeug.security import generate_password_hash, check_password_hash
 
@@ -31,13 +32,94 @@ class Product(db.Model):
     __tablename__ = "products"
 
     id = db.Column(db.Integer, primary_key=True)
+    sku = db.Column(db.String(64), nullable=True)  # supplier key, unique when set (imports upsert on it)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
     price = db.Column(db.Float, nullable=False)
-    stock = db.Column(db.Integer, default=0)
+    stock = db.Column(db.Integer, default=0)  # available to promise
+    reserved = db.Column(db.Integer, nullable=False, default=0, server_default="0")  # held by unpaid orders
     image_url = db.Column(db.String(255), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow, index=True)
+
+    __table_args__ = (
+        # keyset-paginated listing sorted by price or name (rowid rides along)
+        db.Index("ix_products_price", "price"),
+        db.Index("ix_products_name", "name"),
+        db.Index("ux_products_sku", "sku", unique=True),
+    )
+
+
+class CatalogVersion(db.Model):
+    """
+    Single row (id 1) counting catalog changes, bumped by triggers on
+    products: version on any change (the listing's ETag/Last-Modified),
+    static_version when a product is added, removed or changes a field
+    other than stock (the product caches' coherence check).
+    """
+    __tablename__ = "catalog_version"
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    static_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    updated_at = db.Column(db.DateTime)
+
+
+# product-service/app/catalog.py holds the same statements for existing DBs
+CATALOG_VERSION_DDL = [
+    """CREATE TRIGGER IF NOT EXISTS catalog_version_ai AFTER INSERT ON products BEGIN
+      UPDATE catalog_version SET version = version + 1, static_version = static_version + 1,
+        updated_at = CURRENT_TIMESTAMP WHERE id = 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS catalog_version_ad AFTER DELETE ON products BEGIN
+      UPDATE catalog_version SET version = version + 1, static_version = static_version + 1,
+        updated_at = CURRENT_TIMESTAMP WHERE id = 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS catalog_version_au
+    AFTER UPDATE OF sku, name, description, price, stock, image_url ON products BEGIN
+      UPDATE catalog_version SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS catalog_version_au_static
+    AFTER UPDATE OF sku, name, description, price, image_url ON products BEGIN
+      UPDATE catalog_version SET static_version = static_version + 1 WHERE id = 1;
+    END""",
+]
+for _ddl in CATALOG_VERSION_DDL:
+    event.listen(Product.__table__, "after_create", DDL(_ddl).execute_if(dialect="sqlite"))
+event.listen(CatalogVersion.__table__, "after_create", DDL(
+    "INSERT INTO catalog_version (id, version, updated_at) VALUES (1, 0, CURRENT_TIMESTAMP)"
+))
+
+
+# Full-text search over products (SQLite FTS5), kept in sync by triggers.
+# products_fts: word/prefix search over name + description, ranked by bm25
+# products_trigram: name trigrams for the typo-tolerant fallback
+# product-service/app/search.py holds the same statements for existing DBs
+PRODUCT_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+    "name, description, content='products', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_trigram USING fts5("
+    "name, content='products', content_rowid='id', tokenize='trigram')",
+    """CREATE TRIGGER IF NOT EXISTS products_search_ai AFTER INSERT ON products BEGIN
+      INSERT INTO products_fts (rowid, name, description) VALUES (new.id, new.name, new.description);
+      INSERT INTO products_trigram (rowid, name) VALUES (new.id, new.name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_search_ad AFTER DELETE ON products BEGIN
+      INSERT INTO products_fts (products_fts, rowid, name, description)
+      VALUES ('delete', old.id, old.name, old.description);
+      INSERT INTO products_trigram (products_trigram, rowid, name) VALUES ('delete', old.id, old.name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_search_au AFTER UPDATE OF name, description ON products BEGIN
+      INSERT INTO products_fts (products_fts, rowid, name, description)
+      VALUES ('delete', old.id, old.name, old.description);
+      INSERT INTO products_trigram (products_trigram, rowid, name) VALUES ('delete', old.id, old.name);
+      INSERT INTO products_fts (rowid, name, description) VALUES (new.id, new.name, new.description);
+      INSERT INTO products_trigram (rowid, name) VALUES (new.id, new.name);
+    END""",
+]
+for _ddl in PRODUCT_SEARCH_DDL:
+    event.listen(Product.__table__, "after_create", DDL(_ddl).execute_if(dialect="sqlite"))
 
 
 # -------------------------------
@@ -48,11 +130,30 @@ class Order(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
-    status = db.Column(db.String(20), default="pending")  # pending, paid, shipped, delivered, cancelled
+    status = db.Column(db.String(20), default="pending")  # reserved, pending, paid, shipped, delivered, cancelled
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)  # analytics watermark
+    client_ref = db.Column(db.String(64))  # offline-shop id, set by POST /orders/bulk
+    # Denormalized from order_items when the order is written (order-service totals.py)
+    total_amount = db.Column(db.Float, nullable=False, default=0.0, server_default="0")
+    item_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")  # sum of quantities
+    line_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")  # order_items rows
 
     items = db.relationship("OrderItem", backref="order", lazy=True)
 
+    # Covering indexes for the analytics range scans (half-open created_at ranges)
+    __table_args__ = (
+        db.Index("ix_orders_status_created_id", "status", "created_at", "id"),
+        db.Index("ix_orders_created_status_id", "created_at", "status", "id"),
+        # Daily sales / sales report sums read only the index
+        db.Index("ix_orders_created_status_totals", "created_at", "status", "item_count", "total_amount"),
+        # Keyset pagination of the order listings on (created_at, id)
+        db.Index("ix_orders_created_id", "created_at", "id"),
+        db.Index("ix_orders_user_created_id", "user_id", "created_at", "id"),
+        # Re-uploads of an offline order are detected by (client_ref, user_id)
+        db.UniqueConstraint("client_ref", "user_id", name="uq_orders_client_ref_user"),
+    )
+
 
 class OrderItem(db.Model):
     __tablename__ = "order_items"
@@ -63,6 +164,110 @@ class OrderItem(db.Model):
     quantity = db.Column(db.Integer, nullable=False, default=1)
     price = db.Column(db.Float, nullable=False)
 
+    __table_args__ = (
+        db.Index("ix_order_items_order_prod_qty_price", "order_id", "product_id", "quantity", "price"),
+    )
+
+
+class StockReservation(db.Model):
+    """
+    Units of one product held for an unpaid ('reserved') order. While held
+    they are counted in products.reserved instead of products.stock; payment
+    commits the hold, cancellation or expiry releases it back to stock.
+    """
+    __tablename__ = "stock_reservations"
+
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey("orders.id"), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey("products.id"), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(10), nullable=False, default="held")  # held, committed, released, expired
+    expires_at = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # the sweeper's "held and expired" probe
+        db.Index("ix_stock_reservations_status_expires", "status", "expires_at"),
+        db.CheckConstraint("quantity > 0", name="ck_sr_qty_pos"),
+    )
+
+
+class IdempotencyKey(db.Model):
+    """
+    Stored outcome of a POST sent with an Idempotency-Key header, so a
+    retried request replays the response instead of running again.
+    Shared by order-service and payment-service; `scope` keeps their key
+    spaces (and different callers) apart.
+    """
+    __tablename__ = "idempotency_keys"
+
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(120), nullable=False)          # e.g. "user:7:POST /orders/"
+    key = db.Column(db.String(255), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)    # sha256 of the request body
+    status = db.Column(db.String(12), nullable=False, default="in_progress")  # in_progress, done
+    response_code = db.Column(db.Integer)
+    response_body = db.Column(db.Text)
+    response_mimetype = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        db.UniqueConstraint("scope", "key", name="uq_idempotency_scope_key"),
+    )
+
+
+class OrderEvent(db.Model):
+    """
+    Append-only outbox of order changes, written in the same transaction
+    as the change itself. `seq` only grows (AUTOINCREMENT, never reused),
+    so consumers follow it with GET /orders/events?after=<last seq seen>.
+    """
+    __tablename__ = "order_events"
+
+    seq = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey("orders.id"), nullable=False, index=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    event_type = db.Column(db.String(20), nullable=False)   # placed, status_changed
+    old_status = db.Column(db.String(20))                    # None for placed
+    new_status = db.Column(db.String(20), nullable=False)
+    payload = db.Column(db.JSON, default=dict)               # items, reason, client_ref...
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+class OrderReportDay(db.Model):
+    """
+    One row per day with an end-of-day order report (order_daily_reports).
+    A frozen day is closed and never recomputed on its own; the current day
+    is recomputed whenever order_events moves past `events_seq`.
+    """
+    __tablename__ = "order_report_days"
+
+    day = db.Column(db.Date, primary_key=True)
+    frozen = db.Column(db.Boolean, nullable=False, default=False)
+    events_seq = db.Column(db.Integer)                  # MAX(order_events.seq) at compute time
+    computed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class OrderDailyReport(db.Model):
+    """Per-day order totals by dimension: total, status, channel (payment) and product."""
+    __tablename__ = "order_daily_reports"
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    dimension = db.Column(db.String(10), nullable=False)   # total, status, channel, product
+    key = db.Column(db.String(32), nullable=False)         # e.g. "paid", "offline", product id
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    items = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        db.UniqueConstraint("day", "dimension", "key", name="uq_order_daily_reports_day_dim_key"),
+    )
+
 # Payments (centralized in auth-service models)
 from datetime import datetime
 from . import db
@@ -200,15 +405,75 @@ class AnalyticsTopProduct(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, db.ForeignKey("products.id"), nullable=False, index=True)
     window = db.Column(db.String(20), nullable=False, default="30d")  # e.g., "7d", "30d", "all"
+    metric = db.Column(db.String(20), nullable=False, default="revenue")  # revenue | quantity
     rank = db.Column(db.Integer, nullable=False)
     quantity = db.Column(db.Integer, nullable=False, default=0)
     revenue = db.Column(db.Float, nullable=False, default=0.0)
     computed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
     __table_args__ = (
-        db.UniqueConstraint("product_id", "window", name="uq_atp_prod_window"),
+        db.UniqueConstraint("product_id", "window", "metric", name="uq_atp_prod_window_metric"),
+        db.Index("ix_atp_window_metric_rank", "window", "metric", "rank"),
         db.CheckConstraint("rank > 0", name="ck_atp_rank_pos"),
         db.CheckConstraint("quantity >= 0", name="ck_atp_qty_nonneg"),
         db.CheckConstraint("revenue >= 0", name="ck_atp_rev_nonneg"),
     )
 
+
+class AnalyticsWatermark(db.Model):
+    """
+    High-water mark per incremental rollup: the latest orders.updated_at
+    already folded into that rollup, and when it was last refreshed.
+    """
+    __tablename__ = "analytics_watermarks"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False, unique=True)   # e.g. "daily_sales"
+    value = db.Column(db.DateTime)                                  # max orders.updated_at seen
+    refreshed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class AnalyticsProductDaily(db.Model):
+    """
+    Per product, per day, per status class fact table. Product-level
+    analytics aggregate over this instead of rescanning order_items.
+    status_class: sold (paid/shipped/delivered) | reserved | pending
+    """
+    __tablename__ = "analytics_product_daily"
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey("products.id"), nullable=False)
+    status_class = db.Column(db.String(10), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        db.UniqueConstraint("day", "product_id", "status_class", name="uq_apd_day_prod_class"),
+        db.Index("ix_apd_class_day_prod", "status_class", "day", "product_id", "quantity", "revenue"),
+        db.CheckConstraint("quantity >= 0", name="ck_apd_qty_nonneg"),
+        db.CheckConstraint("revenue >= 0", name="ck_apd_rev_nonneg"),
+    )
+
+
+class AnalyticsDailyFunnel(db.Model):
+    """
+    Conversion funnel per cohort day: orders created that day and how many
+    of them currently sit in each status. Maintained incrementally, so a
+    later status change rewrites the day the order was created on.
+    """
+    __tablename__ = "analytics_daily_funnel"
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False, index=True, unique=True)
+    created = db.Column(db.Integer, nullable=False, default=0)
+    pending = db.Column(db.Integer, nullable=False, default=0)
+    reserved = db.Column(db.Integer, nullable=False, default=0)
+    paid = db.Column(db.Integer, nullable=False, default=0)
+    shipped = db.Column(db.Integer, nullable=False, default=0)
+    delivered = db.Column(db.Integer, nullable=False, default=0)
+    cancelled = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.CheckConstraint("created >= 0", name="ck_adf_created_nonneg"),
+    )
@@ -0,0 +1,87 @@
+# auth-service/app/schema.py
+"""
+Upgrade path for databases created before the current models. `db
+create_all()` builds a fresh database whole, but it skips tables that
+already exist, so an existing database never gets the columns added to
+them since. `flask schema ensure` adds what is missing, safe to re-run:
+
+  - tables that did not exist yet, created whole from the models
+  - columns added to existing tables (ALTER TABLE ... ADD COLUMN), with
+    their backfill or unique index
+  - the indexes on those columns
+  - derived caches whose unique key changed, rebuilt empty
+
+Feature-specific pieces keep their own commands: `flask catalog ensure`
+and `flask search rebuild` (product-service) for the catalog triggers and
+search index, `flask orders backfill-totals` (order-service) for the order
+totals and `flask analytics ensure-indexes` for the analytics indexes.
+"""
+from sqlalchemy import inspect, text
+from . import db
+
+# Tables added since the first release, created with their indexes if missing
+ADDED_TABLES = [
+    "stock_reservations",
+    "idempotency_keys",
+    "order_events",
+    "order_report_days",
+    "order_daily_reports",
+    "analytics_watermarks",
+    "analytics_product_daily",
+    "analytics_daily_funnel",
+]
+
+# (table, column, column DDL, SQL run once right after adding it or None) for
+# columns added to pre-existing tables
+ADDED_COLUMNS = [
+    # analytics rollup watermark; an order untouched since the upgrade was last written when created
+    ("orders", "updated_at", "DATETIME", "UPDATE orders SET updated_at = created_at WHERE updated_at IS NULL"),
+    # units held by unpaid orders; nothing is held before the upgrade
+    ("products", "reserved", "INTEGER NOT NULL DEFAULT 0", None),
+    # offline-shop order id; the models' uq_orders_client_ref_user as an index
+    # (SQLite cannot add a constraint to an existing table)
+    ("orders", "client_ref", "VARCHAR(64)",
+     "CREATE UNIQUE INDEX uq_orders_client_ref_user ON orders (client_ref, user_id)"),
+]
+
+# Derived caches whose unique key gained a column: dropped and created again
+# from the models when the column is missing (their refresh refills them)
+REBUILT_TABLES = [
+    # unique per (product_id, window, metric) instead of (product_id, window);
+    # empty until POST /analytics/top-products/refresh, live SQL meanwhile
+    ("analytics_top_products", "metric"),
+]
+
+ADDED_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_orders_updated_at ON orders (updated_at)",
+]
+
+
+def ensure():
+    """Create missing tables, add missing columns and indexes; returns what was added."""
+    conn = db.session.connection()
+    tables = set(inspect(conn).get_table_names())
+    added = []
+    for name in ADDED_TABLES:
+        if name not in tables:
+            db.metadata.tables[name].create(conn)
+            added.append(name)
+
+    for name, column in REBUILT_TABLES:
+        if column not in {c["name"] for c in inspect(conn).get_columns(name)}:
+            db.metadata.tables[name].drop(conn)
+            db.metadata.tables[name].create(conn)
+            added.append(f"{name} (rebuilt)")
+
+    for table, column, ddl, then in ADDED_COLUMNS:
+        if column in {c["name"] for c in inspect(conn).get_columns(table)}:
+            continue
+        db.session.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+        if then:
+            db.session.execute(text(then))
+        added.append(f"{table}.{column}")
+
+    for ddl in ADDED_INDEXES:
+        db.session.execute(text(ddl))
+    db.session.commit()
+    return added
@@ -0,0 +1,167 @@
+# auth-service/tests/test_schema_upgrade.py
+"""`flask schema ensure` brings a database created by the first release up to the current models."""
+import json
+import sqlite3
+
+import pytest
+
+# The first release's tables, as `flask db upgrade` created them then
+FIRST_RELEASE_DDL = [
+    """CREATE TABLE users (id INTEGER PRIMARY KEY, first_name VARCHAR(50) NOT NULL, last_name VARCHAR(50),
+       email VARCHAR(120) NOT NULL UNIQUE, password_hash VARCHAR(128) NOT NULL, role VARCHAR(20),
+       created_at DATETIME)""",
+    """CREATE TABLE products (id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, description TEXT,
+       price FLOAT NOT NULL, stock INTEGER, image_url VARCHAR(255), created_at DATETIME, updated_at DATETIME)""",
+    """CREATE TABLE orders (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users (id),
+       status VARCHAR(20), created_at DATETIME)""",
+    """CREATE TABLE order_items (id INTEGER PRIMARY KEY, order_id INTEGER NOT NULL REFERENCES orders (id),
+       product_id INTEGER NOT NULL REFERENCES products (id), quantity INTEGER NOT NULL, price FLOAT NOT NULL)""",
+    """CREATE TABLE analytics_daily_sales (id INTEGER PRIMARY KEY, day DATE NOT NULL UNIQUE,
+       orders_count INTEGER NOT NULL, items_count INTEGER NOT NULL, revenue FLOAT NOT NULL,
+       created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL)""",
+    """CREATE TABLE analytics_sales_forecast (id INTEGER PRIMARY KEY, day DATE NOT NULL UNIQUE,
+       yhat FLOAT NOT NULL, yhat_lower FLOAT, yhat_upper FLOAT, model_name VARCHAR(50),
+       created_at DATETIME NOT NULL)""",
+    """CREATE TABLE analytics_top_products (id INTEGER PRIMARY KEY,
+       product_id INTEGER NOT NULL REFERENCES products (id), "window" VARCHAR(20) NOT NULL,
+       rank INTEGER NOT NULL, quantity INTEGER NOT NULL, revenue FLOAT NOT NULL, computed_at DATETIME NOT NULL,
+       CONSTRAINT uq_atp_prod_window UNIQUE (product_id, "window"))""",
+]
+
+
+@pytest.fixture
+def legacy_db(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    con = sqlite3.connect(path)
+    for ddl in FIRST_RELEASE_DDL:
+        con.execute(ddl)
+    con.execute("INSERT INTO users (id, first_name, email, password_hash, role) "
+                "VALUES (1, 'c', 'c@example.com', 'x', 'customer')")
+    con.execute("INSERT INTO products (id, name, price, stock) VALUES (1, 'Mug', 5.0, 100)")
+    con.executemany("INSERT INTO orders (id, user_id, status, created_at) VALUES (?, 1, ?, ?)",
+                    [(1, "paid", "2026-01-05 10:00:00"), (2, "pending", "2026-01-06 11:00:00")])
+    con.executemany("INSERT INTO order_items (order_id, product_id, quantity, price) VALUES (?, 1, ?, 5.0)",
+                    [(1, 2), (2, 3)])
+    con.execute("INSERT INTO analytics_top_products (product_id, \"window\", rank, quantity, revenue, computed_at) "
+                "VALUES (1, '30d', 1, 2, 10.0, '2026-01-05 12:00:00')")
+    con.commit()
+    con.close()
+    return path
+
+
+@pytest.fixture
+def ensure(legacy_db, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "sqlite:///" + legacy_db)
+    from app import create_app
+    app = create_app()
+
+    def run():
+        result = app.test_cli_runner().invoke(args=["schema", "ensure"])
+        assert result.exit_code == 0, result.output
+        return result.output
+    return run
+
+
+def test_ensure_adds_orders_updated_at_and_is_idempotent(legacy_db, ensure):
+    assert "orders.updated_at" in ensure()
+    assert ensure() == "schema up to date\n"
+
+    con = sqlite3.connect(legacy_db)
+    assert con.execute("SELECT id, updated_at FROM orders ORDER BY id").fetchall() == [
+        (1, "2026-01-05 10:00:00"), (2, "2026-01-06 11:00:00")]
+    indexes = {r[1] for r in con.execute("PRAGMA index_list(orders)")}
+    tables = {r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    con.close()
+    assert "ix_orders_updated_at" in indexes
+    assert {"analytics_watermarks", "analytics_product_daily", "analytics_daily_funnel",
+            "order_events", "stock_reservations", "idempotency_keys",
+            "order_report_days", "order_daily_reports"} <= tables
+
+
+def test_upgraded_database_serves_analytics(legacy_db, ensure, in_service):
+    # data_version() reads orders.updated_at and order_events: both come from ensure
+    assert "order_events" in ensure()
+    in_service("order-service", legacy_db, "app.test_cli_runner().invoke(args=['orders', 'backfill-totals'])")
+    status, body = json.loads(in_service("analytics-service", legacy_db, "\n".join([
+        "import json",
+        "r = app.test_client().get('/analytics/sales-summary?from=2026-01-01&to=2026-01-31')",
+        "print(json.dumps([r.status_code, r.get_json()]))",
+    ])))
+    assert status == 200
+    assert body["source"] == "rollup"
+    assert body["totals"] == {"orders": 2, "items": 5, "revenue": 25.0}
+
+
+def test_upgraded_database_holds_stock(legacy_db, ensure, in_service):
+    added = ensure()
+    assert "products.reserved" in added and "stock_reservations" in added
+    out = in_service("order-service", legacy_db, "\n".join([
+        "from datetime import datetime",
+        "from app import reservations",
+        "reservations.hold(1, {1: 4}, datetime.utcnow())",
+        "db.session.commit()",
+        "print(app.test_cli_runner().invoke(args=['reservations', 'sweep']).output, end='')",
+    ]))
+    assert out == "0 expired order(s) released\n"
+    con = sqlite3.connect(legacy_db)
+    assert con.execute("SELECT stock, reserved FROM products WHERE id = 1").fetchone() == (96, 4)
+    assert con.execute("SELECT order_id, quantity, status FROM stock_reservations").fetchall() == [(1, 4, "held")]
+    con.close()
+
+
+def test_upgraded_database_takes_orders_and_offline_uploads(legacy_db, ensure, in_service):
+    assert "orders.client_ref" in ensure()
+    out = in_service("order-service", legacy_db, "\n".join([
+        "import json",
+        "from flask_jwt_extended import create_access_token",
+        "app.test_cli_runner().invoke(args=['orders', 'backfill-totals'])",
+        "token = create_access_token(identity='1', additional_claims={'role': 'customer'})",
+        "client = app.test_client()",
+        "client.environ_base['HTTP_AUTHORIZATION'] = 'Bearer ' + token",
+        "checkout = client.post('/orders/', json={'items': [{'product_id': 1, 'quantity': 4}]},",
+        "                       headers={'Idempotency-Key': 'upgrade-1'})",
+        "upload = {'orders': [{'client_ref': 'shop-1', 'items': [{'product_id': 1, 'quantity': 1}]}]}",
+        "first, again = client.post('/orders/bulk', json=upload), client.post('/orders/bulk', json=upload)",
+        "print(json.dumps([checkout.status_code, first.get_json()['accepted'], again.get_json()['duplicate']]))",
+    ]))
+    assert json.loads(out) == [201, 1, 1]
+
+    con = sqlite3.connect(legacy_db)
+    assert con.execute("SELECT COUNT(*) FROM orders WHERE client_ref = 'shop-1'").fetchone() == (1,)
+    with pytest.raises(sqlite3.IntegrityError):
+        con.execute("INSERT INTO orders (user_id, status, client_ref) VALUES (1, 'paid', 'shop-1')")
+    con.close()
+
+
+def test_upgraded_database_caches_top_products_per_metric(legacy_db, ensure, in_service):
+    assert "analytics_top_products (rebuilt)" in ensure()
+    in_service("order-service", legacy_db, "app.test_cli_runner().invoke(args=['orders', 'backfill-totals'])")
+    status, revenue, quantity = json.loads(in_service("analytics-service", legacy_db, "\n".join([
+        "import json",
+        "r = app.test_cli_runner().invoke(args=['analytics', 'ensure-indexes'])",
+        "assert r.exit_code == 0, r.output",
+        "client = app.test_client()",
+        "status = client.post('/analytics/top-products/refresh').status_code",
+        "top = [client.get(f'/analytics/top-products?window=all&metric={m}').get_json() for m in ('revenue', 'quantity')]",
+        "print(json.dumps([status] + top))",
+    ])))
+    assert status == 200
+    # order 1 is paid (2 mugs); the pending order is not a sale
+    for body in (revenue, quantity):
+        assert body["source"] == "cache"
+        assert [(t["product_id"], t["quantity"], t["revenue"]) for t in body["top"]] == [(1, 2, 10.0)]
+    con = sqlite3.connect(legacy_db)
+    assert con.execute('SELECT "window", metric FROM analytics_top_products ORDER BY metric').fetchall() == [
+        ("all", "quantity"), ("all", "revenue")]
+    con.close()
+
+
+def test_ensure_on_a_current_database_changes_nothing(db_path, monkeypatch):
+    con = sqlite3.connect(db_path)
+    schema = con.execute("SELECT type, name, sql FROM sqlite_master ORDER BY name").fetchall()
+    monkeypatch.setenv("DATABASE_URL", "sqlite:///" + db_path)
+    from app import create_app
+    result = create_app().test_cli_runner().invoke(args=["schema", "ensure"])
+    assert result.output == "schema up to date\n"
+    assert con.execute("SELECT type, name, sql FROM sqlite_master ORDER BY name").fetchall() == schema
+    con.close()
@@ -0,0 +1,193 @@
+"""
+Wall-clock timings of every /analytics/* endpoint at growing data sizes.
+
+    python benchmarks/bench_analytics.py --scales 10k,1m,10m --out results.json
+    python benchmarks/bench_analytics.py --scales 1m --compare results.json
+
+A scale is the number of order_items rows. Each database is built once by
+generate_data.py under --data-dir and reused on later runs. The analytics
+rollups are then backfilled, every POST endpoint is timed once, and every
+GET endpoint is timed with stdlib timeit. "uncached_ms" clears the response
+cache before each call, so it measures the SQL and Python work. "cached_ms"
+is a repeat hit on the same key. Results carry the git commit, so two JSON
+files from different commits can be diffed with --compare.
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+from datetime import date, datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+from generate_data import create_schema, generate  # noqa: E402
+
+
+# (method, url template); {d90}/{d365} are filled with dates relative to
+# today, and results are keyed on the template so runs on different days compare
+ENDPOINTS = [
+    ("POST", "/analytics/rollups/refresh"),
+    ("POST", "/analytics/top-products/refresh"),
+    ("POST", "/analytics/forecast/rebuild"),
+    ("GET", "/analytics/sales-summary"),
+    ("GET", "/analytics/sales-summary?from={d365}"),
+    ("GET", "/analytics/top-products"),
+    ("GET", "/analytics/top-products?window=45"),
+    ("GET", "/analytics/top-products?window=all&metric=quantity"),
+    ("GET", "/analytics/conversion-funnel"),
+    ("GET", "/analytics/conversion-funnel?group=day&from={d90}"),
+    ("GET", "/analytics/conversion-funnel?group=week&from={d365}"),
+    ("GET", "/analytics/forecast"),
+    ("GET", "/analytics/reports/sales?group=day"),
+    ("GET", "/analytics/reports/sales?group=month&from={d365}"),
+    ("GET", "/analytics/reports/sales.csv?from={d90}"),
+    ("GET", "/analytics/reports/sales/export?format=parquet&level=lines&from={d90}"),
+    ("GET", "/analytics/stock/status"),
+    ("GET", "/analytics/stock/reorder"),
+    ("GET", "/analytics/cache/stats"),
+]
+
+
+def parse_scale(s):
+    s = s.strip().lower()
+    mult = {"k": 1_000, "m": 1_000_000}.get(s[-1])
+    return int(float(s[:-1]) * mult) if mult else int(s)
+
+
+def git_commit():
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain"))}
+
+
+def build(path, lines, regenerate):
+    if os.path.exists(path) and not regenerate:
+        return None
+    if os.path.exists(path):
+        os.remove(path)
+    t0 = time.perf_counter()
+    create_schema(path)
+    counts = generate(path, lines)
+    counts["seconds"] = round(time.perf_counter() - t0, 1)
+    return counts
+
+
+def _call(client, method, url):
+    resp = client.open(url, method=method, buffered=False)
+    size = sum(len(chunk) for chunk in resp.response)  # drain streamed bodies
+    resp.close()
+    return resp.status_code, size
+
+
+def bench_scale(label, db_path, repeat):
+    os.environ["DATABASE_URL"] = "sqlite:///" + db_path
+    from app import create_app
+    from app.cache import response_cache
+
+    app = create_app()
+    client = app.test_client()
+    results = []
+
+    t0 = time.perf_counter()
+    out = app.test_cli_runner().invoke(args=["analytics", "backfill"])
+    if out.exit_code:
+        raise RuntimeError(out.output)
+    results.append({"scale": label, "endpoint": "cli analytics backfill", "method": "CLI",
+                    "status": 0, "ms": round((time.perf_counter() - t0) * 1000, 2)})
+
+    today = date.today()
+    dates = {"d90": today - timedelta(days=90), "d365": today - timedelta(days=365)}
+    for method, endpoint in ENDPOINTS:
+        url = endpoint.format(**dates)
+        if method == "POST":
+            t0 = time.perf_counter()
+            status, size = _call(client, method, url)
+            results.append({"scale": label, "endpoint": endpoint, "method": method, "status": status,
+                            "bytes": size, "ms": round((time.perf_counter() - t0) * 1000, 2)})
+            continue
+
+        def cold():
+            response_cache.invalidate()
+            return _call(client, method, url)
+
+        status, size = cold()
+        uncached = timeit.repeat(cold, number=1, repeat=repeat)
+        cached = timeit.repeat(lambda: _call(client, method, url), number=1, repeat=repeat)
+        results.append({
+            "scale": label, "endpoint": endpoint, "method": method, "status": status, "bytes": size,
+            "uncached_ms": round(statistics.median(uncached) * 1000, 2),
+            "uncached_min_ms": round(min(uncached) * 1000, 2),
+            "cached_ms": round(statistics.median(cached) * 1000, 2),
+        })
+    return results
+
+
+def _key(r):
+    return r["scale"], r["method"], r["endpoint"]
+
+
+def compare(old_path, results):
+    with open(old_path) as f:
+        old = json.load(f)
+    before = {_key(r): r for r in old["results"]}
+    print(f"\nvs {old.get('commit')} ({old_path})")
+    for r in results:
+        prev = before.get(_key(r))
+        field = "ms" if "ms" in r else "uncached_ms"
+        if not prev or not prev.get(field):
+            continue
+        ratio = r[field] / prev[field]
+        flag = "  SLOWER" if ratio > 1.2 else ("  faster" if ratio < 0.8 else "")
+        print(f"{r['scale']:>6} {r['method']:4} {r['endpoint'][:70]:70} "
+              f"{prev[field]:10.1f} -> {r[field]:10.1f} ms  x{ratio:.2f}{flag}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scales", default="10k,1m", help="order_items rows per run, e.g. 10k,1m,10m")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--data-dir", default=os.path.join(HERE, "data"))
+    ap.add_argument("--regenerate", action="store_true", help="rebuild databases that already exist")
+    ap.add_argument("--out", help="write results as JSON here")
+    ap.add_argument("--compare", help="earlier --out file to diff against")
+    args = ap.parse_args()
+
+    sys.path.insert(0, os.path.join(ROOT, "analytics-service"))
+    os.makedirs(args.data_dir, exist_ok=True)
+
+    report = {
+        **git_commit(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "repeat": args.repeat,
+        "datasets": {},
+        "results": [],
+    }
+    for label in args.scales.split(","):
+        lines = parse_scale(label)
+        db_path = os.path.abspath(os.path.join(args.data_dir, f"bench_{label}.db"))
+        counts = build(db_path, lines, args.regenerate)
+        if counts:
+            print(json.dumps({"generated": label, **counts}))
+            report["datasets"][label] = counts
+        for r in bench_scale(label, db_path, args.repeat):
+            report["results"].append(r)
+            print(json.dumps(r))
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        compare(args.compare, report["results"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+POST /orders/bulk against the same orders sent one by one to POST /orders/.
+
+    python benchmarks/bench_bulk_orders.py --orders 5000 --products 200
+
+Builds two throwaway SQLite DBs with the same products and plenty of stock.
+It times `--orders` single checkouts through the test client against one
+DB, then the same orders as bulk uploads of `--batch` orders against the
+other. It prints orders/second for both and checks that both runs left the
+same number of orders, order lines and units of stock.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+from generate_data import create_schema  # noqa: E402
+
+
+def make_db(path, products):
+    create_schema(path)
+    con = sqlite3.connect(path)
+    con.execute("INSERT INTO users (id, first_name, email, password_hash, role) "
+                "VALUES (1, 'bench', 'bench@example.com', 'x', 'customer')")
+    con.executemany("INSERT INTO products (id, name, price, stock) VALUES (?, ?, ?, ?)",
+                    [(i, f"Product {i}", 9.99, 10_000_000) for i in range(1, products + 1)])
+    con.commit()
+    con.close()
+
+
+def make_orders(n, products, seed):
+    rng = random.Random(seed)
+    return [{
+        "client_ref": f"shop-1-{i}",
+        "items": [{"product_id": rng.randint(1, products), "quantity": rng.randint(1, 3)}
+                  for _ in range(rng.randint(1, 5))],
+    } for i in range(n)]
+
+
+def totals(path):
+    con = sqlite3.connect(path)
+    row = con.execute(
+        "SELECT (SELECT COUNT(*) FROM orders), (SELECT COUNT(*) FROM order_items), "
+        "(SELECT SUM(stock) FROM products)"
+    ).fetchone()
+    con.close()
+    return {"orders": row[0], "order_items": row[1], "stock": row[2]}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--orders", type=int, default=5000)
+    ap.add_argument("--products", type=int, default=200)
+    ap.add_argument("--batch", type=int, default=5000, help="orders per bulk request")
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    sys.path.insert(0, os.path.join(ROOT, "order-service"))
+    from app import create_app
+    from flask_jwt_extended import create_access_token
+
+    orders = make_orders(args.orders, args.products, args.seed)
+    result = {"orders": args.orders, "products": args.products, "batch": args.batch}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("single", "bulk"):
+            db_path = os.path.join(tmp, f"{mode}.db")
+            make_db(db_path, args.products)
+            os.environ["DATABASE_URL"] = "sqlite:///" + db_path
+            app = create_app()
+            app.config["BULK_MAX_ORDERS"] = max(args.batch, app.config["BULK_MAX_ORDERS"])
+            with app.app_context():
+                token = create_access_token(identity="1", additional_claims={"role": "customer"})
+            client = app.test_client()
+            headers = {"Authorization": f"Bearer {token}"}
+
+            t0 = time.perf_counter()
+            if mode == "single":
+                for o in orders:
+                    resp = client.post("/orders/", json={"items": o["items"]}, headers=headers)
+                    assert resp.status_code == 201, resp.get_json()
+            else:
+                for lo in range(0, len(orders), args.batch):
+                    resp = client.post("/orders/bulk", json={"orders": orders[lo:lo + args.batch]},
+                                       headers=headers)
+                    assert resp.get_json()["accepted"] == len(orders[lo:lo + args.batch]), resp.get_json()
+            elapsed = time.perf_counter() - t0
+            result[mode] = {"seconds": round(elapsed, 3),
+                            "orders_per_sec": round(args.orders / elapsed, 1),
+                            **totals(db_path)}
+
+    result["speedup"] = round(result["single"]["seconds"] / result["bulk"]["seconds"], 1)
+    print(json.dumps(result, indent=2))
+    if any(result["single"][k] != result["bulk"][k] for k in ("orders", "order_items", "stock")):
+        print("FAIL: the two runs left different data behind")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
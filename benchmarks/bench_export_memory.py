@@ -0,0 +1,99 @@
+"""
+Peak Python memory of the streaming sales exports at growing row counts.
+
+    python benchmarks/bench_export_memory.py --rows 100000,1000000,10000000
+
+Builds a throwaway SQLite DB with the given number of order lines, streams
+/analytics/reports/sales/export (level=lines) through the Flask test client
+without buffering, and reports tracemalloc peak per format. With streaming,
+the peak should stay flat as rows grow by orders of magnitude.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCHEMA = """
+CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT, price REAL, stock INTEGER);
+CREATE TABLE orders (id INTEGER PRIMARY KEY, user_id INTEGER, status TEXT,
+                     created_at DATETIME, updated_at DATETIME);
+CREATE TABLE order_items (id INTEGER PRIMARY KEY, order_id INTEGER, product_id INTEGER,
+                          quantity INTEGER, price REAL);
+CREATE INDEX ix_orders_created_status_id ON orders (created_at, status, id);
+CREATE INDEX ix_order_items_order_prod_qty_price ON order_items (order_id, product_id, quantity, price);
+"""
+
+
+def build_db(path, n_lines, lines_per_order=3, chunk=50_000):
+    con = sqlite3.connect(path)
+    con.executescript(SCHEMA)
+    con.executemany("INSERT INTO products VALUES (?, ?, ?, ?)",
+                    [(i, f"P{i}", 1.0 + i % 50, 100) for i in range(1, 1001)])
+    start = datetime(2020, 1, 1)
+    span = 5 * 365 * 86400
+    n_orders = n_lines // lines_per_order
+    rnd = random.Random(7)
+    for lo in range(1, n_orders + 1, chunk):
+        hi = min(lo + chunk, n_orders + 1)
+        orders, items = [], []
+        for oid in range(lo, hi):
+            ts = str(start + timedelta(seconds=span * oid // n_orders))
+            orders.append((oid, 1, "paid", ts, ts))
+            for _ in range(lines_per_order):
+                items.append((oid, rnd.randint(1, 1000), rnd.randint(1, 3), 9.99))
+        con.executemany("INSERT INTO orders VALUES (?, ?, ?, ?, ?)", orders)
+        con.executemany("INSERT INTO order_items (order_id, product_id, quantity, price) VALUES (?, ?, ?, ?)", items)
+        con.commit()
+    con.close()
+
+
+def measure(client, fmt):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    resp = client.get(f"/analytics/reports/sales/export?format={fmt}&level=lines"
+                      "&from=2019-01-01&to=2030-01-01", buffered=False)
+    size = sum(len(chunk) for chunk in resp.response)
+    resp.close()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"format": fmt, "bytes": size, "seconds": round(elapsed, 2), "peak_mb": round(peak / 2**20, 2)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", default="100000,1000000")
+    ap.add_argument("--formats", default="csv,parquet,arrow")
+    ap.add_argument("--out", help="write results as JSON here")
+    args = ap.parse_args()
+
+    sys.path.insert(0, os.path.join(ROOT, "analytics-service"))
+    from app import create_app
+
+    results = []
+    for n in (int(x) for x in args.rows.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "bench.db")
+            build_db(db_path, n)
+            os.environ["DATABASE_URL"] = "sqlite:///" + db_path
+            client = create_app().test_client()
+            for fmt in args.formats.split(","):
+                r = dict(measure(client, fmt), rows=n)
+                results.append(r)
+                print(json.dumps(r))
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
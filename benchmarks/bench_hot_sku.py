@@ -0,0 +1,162 @@
+"""
+Checkout throughput on one hot SKU (flash sale), two ways.
+
+    python benchmarks/bench_hot_sku.py --clients 32 --orders 3000
+
+app: POST /orders/ from `--clients` threads against a threaded local
+order-service. Every order buys one unit of the same product. It runs once
+with SQLITE_WAL=0 (rollback journal) and once with SQLITE_WAL=1, the
+default, and reports checkouts/s and the status codes.
+
+sql: the checkout transaction alone, in raw sqlite3, with the stock kept on
+the single products row or split over `--shards` sub-counters, where each
+checkout decrements a random shard. This is the layout a sharded-counter
+mode would use. It runs under both journal modes. Under SQLite the lock
+covers the whole file, not the row, so shards only add statements;
+compare the two columns before reaching for them.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+from generate_data import create_schema  # noqa: E402
+
+
+def _seed(db_path, stock):
+    create_schema(db_path)
+    con = sqlite3.connect(db_path)
+    con.execute("INSERT INTO users (id, first_name, email, password_hash, role) "
+                "VALUES (1, 'bench', 'bench@example.com', 'x', 'customer')")
+    con.execute("INSERT INTO products (id, name, price, stock) VALUES (1, 'Hot item', 9.99, ?)", (stock,))
+    con.commit()
+    con.close()
+
+
+def _checkout(url, token):
+    req = urllib.request.Request(
+        url, data=b'{"items": [{"product_id": 1, "quantity": 1}]}', method="POST",
+        headers={"Content-Type": "application/json", "Authorization": f"Bearer {token}"},
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=120) as resp:
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def bench_app(tmp, wal, clients, orders):
+    db_path = os.path.join(tmp, f"app-{'wal' if wal else 'journal'}.db")
+    _seed(db_path, orders)
+    os.environ["DATABASE_URL"] = "sqlite:///" + db_path
+    os.environ["SQLITE_WAL"] = "1" if wal else "0"
+    from app import create_app
+    from flask_jwt_extended import create_access_token
+    from werkzeug.serving import make_server
+
+    app = create_app()
+    with app.app_context():
+        token = create_access_token(identity="1", additional_claims={"role": "customer"})
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/orders/"
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        codes = list(pool.map(lambda _: _checkout(url, token), range(orders)))
+    elapsed = time.perf_counter() - t0
+    server.shutdown()
+    return {
+        "checkouts_per_sec": round(codes.count(201) / elapsed, 1),
+        "status_codes": {str(c): codes.count(c) for c in sorted(set(codes))},
+        "seconds": round(elapsed, 2),
+    }
+
+
+def bench_sql(tmp, wal, shards, clients, orders):
+    db_path = os.path.join(tmp, f"sql-{'wal' if wal else 'journal'}-{shards}.db")
+    con = sqlite3.connect(db_path)
+    if wal:
+        con.execute("PRAGMA journal_mode=WAL")
+    con.executescript("""
+        CREATE TABLE products (id INTEGER PRIMARY KEY, stock INTEGER, reserved INTEGER DEFAULT 0);
+        CREATE TABLE product_stock_shards (product_id INTEGER, shard INTEGER, stock INTEGER,
+                                           PRIMARY KEY (product_id, shard));
+        CREATE TABLE orders (id INTEGER PRIMARY KEY, user_id INTEGER, status TEXT);
+        CREATE TABLE order_items (id INTEGER PRIMARY KEY, order_id INTEGER, product_id INTEGER, quantity INTEGER);
+    """)
+    con.execute("INSERT INTO products (id, stock) VALUES (1, ?)", (orders * 2,))
+    con.executemany("INSERT INTO product_stock_shards VALUES (1, ?, ?)",
+                    [(s, orders * 2 // max(shards, 1)) for s in range(max(shards, 1))])
+    con.commit()
+    con.close()
+
+    def worker(n):
+        c = sqlite3.connect(db_path, timeout=60)
+        for _ in range(n):
+            c.execute("SELECT stock FROM products WHERE id = 1").fetchone()
+            order_id = c.execute("INSERT INTO orders (user_id, status) VALUES (1, 'reserved')").lastrowid
+            if shards:
+                # random shard first, the others as fallback when it runs dry
+                order = random.sample(range(shards), shards)
+                for s in order:
+                    if c.execute("UPDATE product_stock_shards SET stock = stock - 1 "
+                                 "WHERE product_id = 1 AND shard = ? AND stock >= 1", (s,)).rowcount:
+                        break
+                c.execute("UPDATE products SET reserved = reserved + 1 WHERE id = 1")
+            else:
+                c.execute("UPDATE products SET stock = stock - 1, reserved = reserved + 1 "
+                          "WHERE id = 1 AND stock >= 1")
+            c.execute("INSERT INTO order_items (order_id, product_id, quantity) VALUES (?, 1, 1)", (order_id,))
+            c.commit()
+        c.close()
+
+    per = orders // clients
+    threads = [threading.Thread(target=worker, args=(per,)) for _ in range(clients)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return round(per * clients / (time.perf_counter() - t0), 1)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clients", type=int, default=32)
+    ap.add_argument("--orders", type=int, default=3000)
+    ap.add_argument("--shards", type=int, default=8)
+    ap.add_argument("--layer", choices=["app", "sql", "both"], default="both")
+    args = ap.parse_args()
+
+    sys.path.insert(0, os.path.join(ROOT, "order-service"))
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    result = {"clients": args.clients, "orders": args.orders}
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.layer in ("app", "both"):
+            result["app"] = {mode: bench_app(tmp, mode == "wal", args.clients, args.orders)
+                             for mode in ("journal", "wal")}
+        if args.layer in ("sql", "both"):
+            result["sql_tx_per_sec"] = {
+                mode: {"single_row": bench_sql(tmp, mode == "wal", 0, args.clients, args.orders),
+                       f"{args.shards}_shards": bench_sql(tmp, mode == "wal", args.shards,
+                                                          args.clients, args.orders)}
+                for mode in ("journal", "wal")
+            }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
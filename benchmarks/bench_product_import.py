@@ -0,0 +1,94 @@
+"""
+Supplier-feed import throughput and memory (product-service importer.py).
+
+    python benchmarks/bench_product_import.py --skus 200000
+
+Writes a CSV and an NDJSON feed of `--skus` products to a temp dir, then
+imports into a fresh database (auth-service schema, so the search and
+catalog triggers fire on every row):
+
+  csv create    every sku new
+  csv update    the same file again: every sku updated
+  ndjson stock  a stock-only feed (sku, stock) of the same skus
+
+For each it reports rows/s and the peak Python memory allocated during the
+import (tracemalloc), once at --skus/10 and once at --skus rows: constant
+memory means the two peaks match whatever the feed size. 1% of the rows
+are broken on purpose and must show up as failed, not stop the run.
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+from generate_data import create_schema  # noqa: E402
+
+NOUNS = ["chair", "table", "lamp", "sofa", "desk", "shelf", "mug", "kettle", "blanket", "rug"]
+
+
+def _write_feeds(tmp, n, seed=7):
+    rng = random.Random(seed)
+    csv_path, ndjson_path = os.path.join(tmp, f"feed-{n}.csv"), os.path.join(tmp, f"stock-{n}.ndjson")
+    with open(csv_path, "w", newline="") as f, open(ndjson_path, "w") as g:
+        w = csv.writer(f)
+        w.writerow(["sku", "name", "description", "price", "stock", "image_url"])
+        for i in range(n):
+            sku = f"SUP-{i:07d}"
+            price = "n/a" if i % 100 == 99 else f"{rng.uniform(1, 500):.2f}"   # 1% broken rows
+            w.writerow([sku, f"Supplier {rng.choice(NOUNS)} {i}", "imported from the nightly feed",
+                        price, rng.randint(0, 500), ""])
+            g.write(json.dumps({"sku": sku, "stock": rng.randint(0, 500)}) + "\n")
+    return csv_path, ndjson_path
+
+
+def _run(app, path, fmt, chunk_size):
+    from app import importer
+    with app.app_context(), open(path, "rb") as f:
+        tracemalloc.start()
+        report = importer.import_products(f, fmt, chunk_size)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {
+        "rows": report["rows"], "created": report["created"], "updated": report["updated"],
+        "failed": report["failed"], "rows_per_sec": report["rows_per_sec"],
+        "peak_mb": round(peak / 2**20, 1),
+    }
+
+
+def bench(tmp, n, chunk_size):
+    db_path = os.path.join(tmp, f"import-{n}.db")
+    create_schema(db_path)
+    csv_path, ndjson_path = _write_feeds(tmp, n)
+    os.environ["DATABASE_URL"] = "sqlite:///" + db_path
+    from app import create_app
+    app = create_app()
+    return {
+        "csv_create": _run(app, csv_path, "csv", chunk_size),
+        "csv_update": _run(app, csv_path, "csv", chunk_size),
+        "ndjson_stock": _run(app, ndjson_path, "ndjson", chunk_size),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--skus", type=int, default=200_000)
+    ap.add_argument("--chunk-size", type=int, default=1000)
+    args = ap.parse_args()
+
+    sys.path.insert(0, os.path.join(ROOT, "product-service"))
+    with tempfile.TemporaryDirectory() as tmp:
+        result = {"chunk_size": args.chunk_size}
+        for n in (args.skus // 10, args.skus):
+            result[str(n)] = bench(tmp, n, args.chunk_size)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
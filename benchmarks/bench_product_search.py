@@ -0,0 +1,138 @@
+"""
+Product search latency: FTS5 (product-service search.py) vs the old
+Product.name.ilike('%term%') scan, on a generated catalog.
+
+    python benchmarks/bench_product_search.py --products 500000
+
+The catalog is created with auth-service's schema, so the search tables are
+filled by their triggers while the products are inserted (the load time is
+reported too). Every query runs `--repeat` times through each path, with the
+same price filters; the report gives the median milliseconds and the number
+of hits of each. ilike returns every substring match, so it also runs with
+the LIMIT the search uses, which is its best case. The typo queries find
+nothing by substring; FTS answers them through the trigram fallback.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+from generate_data import create_schema  # noqa: E402
+
+ADJECTIVES = ["classic", "modern", "compact", "premium", "rustic", "vintage", "portable", "deluxe",
+              "ergonomic", "foldable", "wireless", "organic", "heavy", "slim", "smart", "outdoor"]
+MATERIALS = ["steel", "oak", "bamboo", "leather", "cotton", "ceramic", "glass", "aluminium",
+             "walnut", "linen", "marble", "copper", "wool", "plastic", "silicone", "velvet"]
+NOUNS = ["chair", "table", "lamp", "sofa", "desk", "shelf", "mug", "kettle", "blanket", "rug",
+         "speaker", "backpack", "jacket", "bottle", "pillow", "mirror", "stool", "cabinet",
+         "headphones", "toaster", "umbrella", "wallet", "vase", "clock"]
+BRANDS = ["Nordhaus", "Kivu", "Atelier", "Sahel", "Lumo", "Brava", "Tembo", "Orin"]
+FILLER = ["durable", "finish", "easy", "clean", "perfect", "home", "office", "gift", "design",
+          "quality", "lightweight", "handmade", "warranty", "everyday", "stylish", "comfort"]
+
+# (query, min_price, max_price)
+QUERIES = [
+    ("chair", None, None),
+    ("steel", 20, 200),
+    ("walnut desk", None, None),
+    ("nordhaus lamp", None, 150),
+    ("ergo", None, None),
+    ("headph", 50, None),
+    ("handmade lamp", None, None),
+    ("stel chiar", None, None),
+    ("hedphones", None, None),
+]
+
+ILIKE_SQL = """
+SELECT id FROM products
+WHERE lower(name) LIKE lower(:pattern)
+  AND (:min_price IS NULL OR price >= :min_price)
+  AND (:max_price IS NULL OR price <= :max_price)
+"""
+
+
+def _seed(db_path, n):
+    create_schema(db_path)
+    rng = random.Random(42)
+    con = sqlite3.connect(db_path)
+    rows = []
+    for i in range(1, n + 1):
+        brand, adjective, material, noun = (rng.choice(BRANDS), rng.choice(ADJECTIVES),
+                                            rng.choice(MATERIALS), rng.choice(NOUNS))
+        name = f"{brand} {adjective} {material} {noun}"
+        # descriptions talk about the product itself, now and then another one
+        words = rng.choices(FILLER, k=rng.randint(8, 20)) + [material, noun]
+        if rng.random() < 0.2:
+            words.append(rng.choice(MATERIALS + NOUNS))
+        rng.shuffle(words)
+        description = " ".join(words)
+        rows.append((i, name.title(), description, round(rng.uniform(2, 500), 2), rng.randint(0, 200)))
+    t0 = time.perf_counter()
+    con.executemany("INSERT INTO products (id, name, description, price, stock) VALUES (?, ?, ?, ?, ?)", rows)
+    con.commit()
+    con.close()
+    return time.perf_counter() - t0
+
+
+def _median_ms(fn, repeat):
+    times, result = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return round(statistics.median(times), 2), result
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--products", type=int, default=500_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--limit", type=int, default=50)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "search.db")
+        load_seconds = _seed(db_path, args.products)
+
+        os.environ["DATABASE_URL"] = "sqlite:///" + db_path
+        sys.path.insert(0, os.path.join(ROOT, "product-service"))
+        from app import create_app, db, search
+        from sqlalchemy import text
+
+        app = create_app()
+        rows = []
+        with app.app_context():
+            for term, lo, hi in QUERIES:
+                params = {"pattern": f"%{term}%", "min_price": lo, "max_price": hi}
+                like_ms, like_ids = _median_ms(
+                    lambda: db.session.execute(text(ILIKE_SQL), params).scalars().all(), args.repeat)
+                like_limit_ms, _ = _median_ms(
+                    lambda: db.session.execute(text(ILIKE_SQL + " LIMIT :limit"),
+                                               {**params, "limit": args.limit}).scalars().all(), args.repeat)
+                fts_ms, (fts_ids, mode) = _median_ms(
+                    lambda: search.search_ids(term, lo, hi, args.limit), args.repeat)
+                rows.append({
+                    "query": term, "min_price": lo, "max_price": hi,
+                    "ilike_ms": like_ms, "ilike_hits": len(like_ids),
+                    "ilike_limit_ms": like_limit_ms,
+                    "fts_ms": fts_ms, "fts_hits": len(fts_ids), "fts_mode": mode,
+                })
+
+    print(json.dumps({
+        "products": args.products,
+        "load_seconds_with_index_triggers": round(load_seconds, 1),
+        "limit": args.limit,
+        "queries": rows,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
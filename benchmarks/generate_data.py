@@ -0,0 +1,174 @@
+"""
+Synthetic retail data for benchmarking, written straight into the shared
+schema (auth-service/app/models.py).
+
+    python benchmarks/generate_data.py /tmp/bench.db --lines 10000000
+
+Creates the tables through auth-service's models, then bulk loads users,
+products, orders and order_items with sqlite3 executemany in chunks.
+Product popularity is Zipf-distributed (a few best sellers, a long tail),
+and order dates follow a growth trend with weekly and yearly seasonality.
+Order status depends on order age: old orders are mostly delivered, the
+last two weeks hold the pending, reserved, paid and shipped ones.
+Counts default from --lines:
+  orders = lines / lines-per-order, users = orders / 20, products = lines / 200
+"""
+import argparse
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import datetime
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# status mix by order age: (max age in days, statuses, probabilities)
+STATUS_BY_AGE = [
+    (2, ("pending", "reserved", "paid", "cancelled"), (0.35, 0.25, 0.3, 0.1)),
+    (14, ("paid", "shipped", "delivered", "cancelled"), (0.15, 0.35, 0.4, 0.1)),
+    (None, ("delivered", "cancelled", "shipped"), (0.88, 0.1, 0.02)),
+]
+
+
+def create_schema(db_path):
+    """Create every table from auth-service's models (run in a subprocess:
+    both services name their package `app`)."""
+    code = (
+        "import sys; sys.path.insert(0, sys.argv[1]);"
+        "from app import create_app, db; app = create_app();"
+        "ctx = app.app_context(); ctx.push(); db.create_all()"
+    )
+    env = dict(os.environ, DATABASE_URL="sqlite:///" + os.path.abspath(db_path))
+    subprocess.run([sys.executable, "-c", code, os.path.join(ROOT, "auth-service")],
+                   check=True, env=env)
+
+
+def _timestamps(rng, n, days, end):
+    """n order timestamps over the `days` before `end`, sorted ascending."""
+    age = np.arange(days)[::-1]                         # days before end, oldest first
+    dates = np.datetime64(end.date()) - age.astype("timedelta64[D]")
+    weekday = (dates.astype("datetime64[D]").view("int64") + 3) % 7   # 0 = Monday
+    month = dates.astype("datetime64[M]").astype(int) % 12 + 1
+    weight = (
+        np.linspace(0.6, 1.0, days)                                   # growth trend
+        * np.where(weekday >= 5, 1.35, 1.0)                           # weekend peak
+        * (1.0 + 0.6 * np.isin(month, (11, 12)) - 0.15 * np.isin(month, (1, 2)))
+    )
+    picked = rng.choice(days, size=n, p=weight / weight.sum())
+    seconds = rng.integers(0, 86400, size=n)
+    ts = dates[picked].astype("datetime64[s]") + seconds.astype("timedelta64[s]")
+    ts.sort()
+    # never in the future: today's orders stop at `end`
+    return np.minimum(ts, np.datetime64(end.replace(microsecond=0)))
+
+
+def _statuses(rng, ts, end):
+    age = (np.datetime64(end.replace(microsecond=0)) - ts).astype("timedelta64[D]").astype(int)
+    out = np.empty(len(ts), dtype=object)
+    lower = -1
+    for max_age, names, probs in STATUS_BY_AGE:
+        mask = age > lower if max_age is None else (age > lower) & (age <= max_age)
+        out[mask] = rng.choice(names, size=int(mask.sum()), p=probs)
+        lower = max_age if max_age is not None else lower
+    return out
+
+
+def generate(db_path, lines, users=None, products=None, lines_per_order=3.0,
+             days=730, zipf=1.1, seed=42, chunk=200_000):
+    """Fill db_path (schema must exist) and return the row counts written."""
+    rng = np.random.default_rng(seed)
+    n_orders = max(1, int(lines / lines_per_order))
+    n_users = users or max(10, n_orders // 20)
+    n_products = products or max(50, lines // 200)
+    end = datetime.utcnow()
+    now = str(end)
+
+    con = sqlite3.connect(db_path)
+    con.execute("PRAGMA journal_mode = OFF")
+    con.execute("PRAGMA synchronous = OFF")
+
+    con.executemany(
+        "INSERT INTO users (first_name, email, password_hash, role, created_at) VALUES (?, ?, ?, ?, ?)",
+        ((f"user{i}", f"user{i}@example.com", "x", "customer", now) for i in range(1, n_users + 1)),
+    )
+    user_ids = np.arange(1, n_users + 1)
+
+    prices = np.round(rng.lognormal(mean=3.0, sigma=0.8, size=n_products), 2) + 0.99
+    con.executemany(
+        "INSERT INTO products (name, description, price, stock, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+        ((f"Product {i + 1}", None, float(prices[i]), int(s), now, now)
+         for i, s in enumerate(rng.integers(0, 500, size=n_products))),
+    )
+
+    # Zipf popularity over a shuffled rank so ids are not ordered by demand
+    popularity = 1.0 / np.arange(1, n_products + 1) ** zipf
+    popularity = popularity[rng.permutation(n_products)]
+    cdf = np.cumsum(popularity / popularity.sum())
+
+    ts = _timestamps(rng, n_orders, days, end)
+    statuses = _statuses(rng, ts, end)
+    per_order = 1 + rng.poisson(max(lines_per_order - 1.0, 0.0), size=n_orders)
+
+    order_id = 0
+    written_lines = 0
+    for lo in range(0, n_orders, chunk):
+        hi = min(lo + chunk, n_orders)
+        stamps = np.char.replace(np.datetime_as_string(ts[lo:hi]), "T", " ")
+        buyers = rng.choice(user_ids, size=hi - lo)
+        counts = per_order[lo:hi]
+        n = int(counts.sum())
+        line_orders = np.repeat(np.arange(order_id + 1, order_id + 1 + hi - lo), counts)
+        line_products = np.minimum(np.searchsorted(cdf, rng.random(n)), n_products - 1)
+        qty = rng.geometric(0.6, size=n)                     # 1, sometimes 2-3
+        # per-order totals, as order-service stores them
+        slot = line_orders - (order_id + 1)
+        totals = np.round(np.bincount(slot, weights=qty * prices[line_products], minlength=hi - lo), 2)
+        items = np.bincount(slot, weights=qty, minlength=hi - lo).astype(np.int64)
+        con.executemany(
+            "INSERT INTO orders (id, user_id, status, total_amount, item_count, line_count, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            zip(range(order_id + 1, order_id + 1 + hi - lo), buyers.tolist(), statuses[lo:hi].tolist(),
+                totals.tolist(), items.tolist(), counts.tolist(), stamps.tolist(), stamps.tolist()),
+        )
+        con.executemany(
+            "INSERT INTO order_items (order_id, product_id, quantity, price) VALUES (?, ?, ?, ?)",
+            zip(line_orders.tolist(), (line_products + 1).tolist(), qty.tolist(),
+                prices[line_products].tolist()),
+        )
+        con.commit()
+        order_id += hi - lo
+        written_lines += n
+
+    con.execute("ANALYZE")
+    con.commit()
+    con.close()
+    return {"users": n_users, "products": n_products, "orders": n_orders, "order_items": written_lines}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("db", help="SQLite file to create (replaced if it exists)")
+    ap.add_argument("--lines", type=int, default=10_000, help="approximate order_items rows")
+    ap.add_argument("--users", type=int)
+    ap.add_argument("--products", type=int)
+    ap.add_argument("--lines-per-order", type=float, default=3.0)
+    ap.add_argument("--days", type=int, default=730, help="history length")
+    ap.add_argument("--zipf", type=float, default=1.1, help="popularity skew exponent")
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    t0 = time.perf_counter()
+    create_schema(args.db)
+    counts = generate(args.db, args.lines, args.users, args.products,
+                      args.lines_per_order, args.days, args.zipf, args.seed)
+    counts["seconds"] = round(time.perf_counter() - t0, 1)
+    print(json.dumps(counts))
+
+
+if __name__ == "__main__":
+    main()
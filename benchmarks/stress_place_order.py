@@ -0,0 +1,108 @@
+"""
+Oversell check for POST /orders/: many simultaneous checkouts against a
+small stock.
+
+    python benchmarks/stress_place_order.py --clients 200 --stock 50
+
+Runs order-service on a threaded local server over a throwaway SQLite DB
+holding one product with `--stock` units. It fires `--clients` single-unit
+checkouts at once and then checks that exactly `--stock` of them
+succeeded, that the stock ended at 0 and that the database holds one order
+and one order line per success. Exits 1 otherwise.
+"""
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+from generate_data import create_schema  # noqa: E402
+
+
+def checkout(url, token, barrier, payload):
+    req = urllib.request.Request(
+        url, data=json.dumps(payload).encode(), method="POST",
+        headers={"Content-Type": "application/json", "Authorization": f"Bearer {token}"},
+    )
+    barrier.wait()
+    try:
+        with urllib.request.urlopen(req, timeout=60) as resp:
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clients", type=int, default=200)
+    ap.add_argument("--stock", type=int, default=50)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "stress.db")
+        create_schema(db_path)
+        con = sqlite3.connect(db_path)
+        con.execute("INSERT INTO users (id, first_name, email, password_hash, role) "
+                    "VALUES (1, 'stress', 'stress@example.com', 'x', 'customer')")
+        con.execute("INSERT INTO products (id, name, price, stock) VALUES (1, 'Hot item', 9.99, ?)",
+                    (args.stock,))
+        con.commit()
+
+        os.environ["DATABASE_URL"] = "sqlite:///" + db_path
+        sys.path.insert(0, os.path.join(ROOT, "order-service"))
+        from app import create_app
+        from flask_jwt_extended import create_access_token
+        from werkzeug.serving import make_server
+
+        app = create_app()
+        with app.app_context():
+            token = create_access_token(identity="1", additional_claims={"role": "customer"})
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/orders/"
+
+        barrier = threading.Barrier(args.clients)
+        payload = {"items": [{"product_id": 1, "quantity": 1}]}
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.clients) as pool:
+            codes = list(pool.map(lambda _: checkout(url, token, barrier, payload), range(args.clients)))
+        elapsed = time.perf_counter() - t0
+        server.shutdown()
+
+        stock = con.execute("SELECT stock FROM products WHERE id = 1").fetchone()[0]
+        orders = con.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+        lines = con.execute("SELECT COALESCE(SUM(quantity), 0) FROM order_items").fetchone()[0]
+        con.close()
+
+    ok = codes.count(201)
+    summary = {
+        "clients": args.clients,
+        "stock": args.stock,
+        "succeeded": ok,
+        "status_codes": {str(c): codes.count(c) for c in sorted(set(codes))},
+        "final_stock": stock,
+        "orders": orders,
+        "units_sold": lines,
+        "seconds": round(elapsed, 2),
+    }
+    print(json.dumps(summary))
+    expected = min(args.stock, args.clients)
+    if not (ok == orders == lines == expected and stock == args.stock - expected):
+        print("FAIL: oversold, undersold or left partial orders behind")
+        raise SystemExit(1)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
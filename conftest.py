@@ -0,0 +1,59 @@
+"""
+Fixtures for the services' tests (<service>/tests/).
+
+Every service names its package `app`, so one pytest run over several
+services would otherwise import whichever `app` came first: each test
+module gets its own service's package (import it inside fixtures and
+tests, not at module level). `db_path` is a fresh SQLite file whose
+schema comes from auth-service's models, the schema's source of truth;
+`in_service` runs code against a database with another service's `app`.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def _drop_app_modules():
+    for name in [m for m in sys.modules if m == "app" or m.startswith("app.")]:
+        del sys.modules[name]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def service_package(request):
+    """Import `app` from the test module's service for the duration of the module."""
+    service = os.path.join(ROOT, os.path.relpath(str(request.path), ROOT).split(os.sep)[0])
+    _drop_app_modules()
+    sys.path.insert(0, service)
+    yield service
+    sys.path.remove(service)
+    _drop_app_modules()
+
+
+def _in_service(service, path, code):
+    """Run `code` in a fresh interpreter where `app = create_app()` is `service`'s app on `path`; returns stdout."""
+    return subprocess.run(
+        [sys.executable, "-c",
+         "import sys; sys.path.insert(0, sys.argv[1]);"
+         "from app import create_app, db; app = create_app();"
+         "ctx = app.app_context(); ctx.push()\n" + code,
+         os.path.join(ROOT, service)],
+        check=True, stdout=subprocess.PIPE, text=True, env=dict(os.environ, DATABASE_URL="sqlite:///" + path),
+    ).stdout
+
+
+@pytest.fixture(scope="session")
+def in_service():
+    """in_service("order-service", db_path, code) runs `code` with that service's `app` (see _in_service)."""
+    return _in_service
+
+
+@pytest.fixture(scope="module")
+def db_path(tmp_path_factory):
+    """A SQLite file holding the full schema (built in a subprocess: auth-service's package is `app` too)."""
+    path = str(tmp_path_factory.mktemp("db") / "smartretail.db")
+    _in_service("auth-service", path, "db.create_all()")
+    return path
@@ -4,6 +4,7 @@ from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from dotenv import load_dotenv
+from sqlalchemy import event
 import os
 
 # Load environment variables
@@ -14,6 +15,28 @@ db = SQLAlchemy()
 migrate = Migrate()
 jwt = JWTManager()
 
+
+def _tune_sqlite(app):
+    """
+    Every checkout writes the same hot products rows, and SQLite lets one
+    writer in at a time for the whole file, so splitting a product's stock
+    over several rows would not let two checkouts write at once. What does
+    help is holding that lock for less time: WAL commits append to a log
+    instead of rewriting pages through a rollback journal, and readers no
+    longer block the writer (see benchmarks/bench_hot_sku.py). journal_mode
+    is stored in the DB file, so the other services pick it up too.
+    """
+    def on_connect(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        if app.config["SQLITE_WAL"]:
+            cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute(f"PRAGMA synchronous={app.config['SQLITE_SYNCHRONOUS']}")
+        cur.close()
+
+    with app.app_context():
+        event.listen(db.engine, "connect", on_connect)
+
+
 def create_app():
     """Factory function for Order-Service"""
     app = Flask(__name__)
@@ -24,18 +47,60 @@ def create_app():
 
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "supersecret")
+    # Shared secret for service-to-service calls (payment-service -> /orders/internal/*)
+    app.config["INTERNAL_TOKEN"] = os.getenv("INTERNAL_TOKEN", "change-me")
+    # Seconds a placed order holds its stock while awaiting payment
+    app.config["ORDER_RESERVATION_TTL"] = int(os.getenv("ORDER_RESERVATION_TTL", "900"))
+    # Background expiry sweep: seconds between runs, 0 = off. create_app()
+    # never starts it (CLI commands, tests and every WSGI worker call it):
+    # `python main.py` does, and `flask reservations sweep --every N` runs
+    # it as a process of its own. Nothing else expires holds.
+    app.config["RESERVATION_SWEEP_INTERVAL"] = int(os.getenv("RESERVATION_SWEEP_INTERVAL", "0"))
+    app.config["RESERVATION_SWEEP_BATCH"] = int(os.getenv("RESERVATION_SWEEP_BATCH", "500"))
+    # Idempotency-Key: how long responses are kept, how long a duplicate waits
+    app.config["IDEMPOTENCY_TTL"] = int(os.getenv("IDEMPOTENCY_TTL", "86400"))
+    app.config["IDEMPOTENCY_WAIT"] = float(os.getenv("IDEMPOTENCY_WAIT", "10"))
+    # POST /orders/bulk: orders per transaction, orders per request
+    app.config["BULK_CHUNK_SIZE"] = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+    app.config["BULK_MAX_ORDERS"] = int(os.getenv("BULK_MAX_ORDERS", "5000"))
+    # Products whose name and price checkout keeps in memory (product_cache.py)
+    app.config["PRODUCT_CACHE_SIZE"] = int(os.getenv("PRODUCT_CACHE_SIZE", "10000"))
+    # Seconds after midnight (UTC) before a day's order report is frozen
+    app.config["ORDER_REPORT_CLOSE_DELAY"] = int(os.getenv("ORDER_REPORT_CLOSE_DELAY", "3600"))
+    # SQLite write concurrency (_tune_sqlite). synchronous=NORMAL is much
+    # faster still under WAL, but a power cut can lose the last commits.
+    app.config["SQLITE_WAL"] = os.getenv("SQLITE_WAL", "1") == "1"
+    app.config["SQLITE_SYNCHRONOUS"] = os.getenv("SQLITE_SYNCHRONOUS", "FULL")
+    # seconds a writer waits for the lock before "database is locked"
+    app.config["SQLITE_BUSY_TIMEOUT"] = float(os.getenv("SQLITE_BUSY_TIMEOUT", "30"))
+    if app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+            "connect_args": {"timeout": app.config["SQLITE_BUSY_TIMEOUT"]},
+        }
 
     # Initialize extensions
     db.init_app(app)
+    if app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+        _tune_sqlite(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
-    CORS(app)
+    # Let browsers read the pagination headers of the order listings
+    CORS(app, expose_headers=["X-Next-Cursor", "Link"])
 
     # Import models
     from . import models
 
+    from .lru import ProductCache
+    app.extensions["product_cache"] = ProductCache(app.config["PRODUCT_CACHE_SIZE"])
+
     # Import and register routes
     from .routes import order_bp
     app.register_blueprint(order_bp)
 
+    from .commands import idempotency_cli, orders_cli, reports_cli, reservations_cli
+    app.cli.add_command(reservations_cli)
+    app.cli.add_command(idempotency_cli)
+    app.cli.add_command(orders_cli)
+    app.cli.add_command(reports_cli)
+
     return app
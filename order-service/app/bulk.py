@@ -0,0 +1,223 @@
+# order-service/app/bulk.py
+"""
+Bulk upload of orders already completed offline (POST /orders/bulk).
+
+Orders are processed in chunks of BULK_CHUNK_SIZE, one transaction per
+chunk. A chunk needs a constant number of statements however many orders
+it holds:
+  1. one IN query for the products it touches, one for client_refs that
+     were already synced
+  2. stock allocated in Python against that snapshot, in upload order
+  3. one executemany of guarded UPDATEs, one per product with the chunk's
+     total quantity; if a concurrent checkout got there first, the chunk
+     is rolled back, re-read and allocated again
+  4. one executemany for the orders, one indexed SELECT to map client_ref
+     to the new ids, and one executemany each for the items and for the
+     'placed' events (see events.py)
+If a concurrent upload of the same client_ref commits between steps 1
+and 4, the orders' unique (client_ref, user_id) constraint refuses the
+insert; the chunk is rolled back and run again, and step 1 then reports
+those orders as duplicates.
+"""
+from datetime import datetime
+from sqlalchemy import DateTime, bindparam, text
+from sqlalchemy.exc import IntegrityError
+from flask import current_app
+from . import db, events
+from .totals import order_totals
+from .utils import aggregate_items
+
+OFFLINE_STATUSES = ("paid", "delivered")
+ALLOCATION_RETRIES = 3
+
+TAKE_STOCK_SQL = """
+UPDATE products SET stock = stock - :q, updated_at = :now
+WHERE id = :id AND stock >= :q
+"""
+
+INSERT_ORDER_SQL = """
+INSERT INTO orders (user_id, status, client_ref, total_amount, item_count, line_count, created_at, updated_at)
+VALUES (:user_id, :status, :client_ref, :total_amount, :item_count, :line_count, :created_at, :now)
+"""
+
+INSERT_ITEM_SQL = """
+INSERT INTO order_items (order_id, product_id, quantity, price)
+VALUES (:order_id, :product_id, :quantity, :price)
+"""
+
+
+def _expanding(sql, *names):
+    return text(sql).bindparams(*(bindparam(n, expanding=True) for n in names))
+
+
+def _parse_order(raw, caller_id, admin, now):
+    """(parsed order, None) or (None, rejection reason)."""
+    if not isinstance(raw, dict):
+        return None, "order must be an object"
+    client_ref = raw.get("client_ref")
+    if not isinstance(client_ref, str) or not client_ref or len(client_ref) > 64:
+        return None, "client_ref (string, max 64 chars) is required"
+    wanted, error = aggregate_items(raw.get("items"))
+    if error:
+        return None, error
+    status = raw.get("status", "paid")
+    if status not in OFFLINE_STATUSES:
+        return None, f"status must be one of {', '.join(OFFLINE_STATUSES)}"
+    user_id = raw.get("user_id", caller_id) if admin else caller_id
+    if not isinstance(user_id, int):
+        return None, "user_id must be an integer"
+    created_at = now
+    if raw.get("created_at"):
+        try:
+            created_at = datetime.fromisoformat(str(raw["created_at"]).replace("Z", "")).replace(tzinfo=None)
+        except ValueError:
+            return None, "created_at must be an ISO timestamp"
+        if created_at > now:
+            return None, "created_at is in the future"
+    return {"client_ref": client_ref, "user_id": user_id, "status": status,
+            "created_at": created_at, "wanted": wanted}, None
+
+
+def _allocate(orders, products):
+    """Split orders into (accepted, {index: reason}) against a stock snapshot."""
+    remaining = {pid: (p["stock"] or 0) for pid, p in products.items()}
+    accepted, rejected = [], {}
+    for i, o in orders:
+        missing = [pid for pid in o["wanted"] if pid not in products]
+        if missing:
+            rejected[i] = f"Product {missing[0]} not found"
+            continue
+        short = [pid for pid, q in o["wanted"].items() if remaining[pid] < q]
+        if short:
+            rejected[i] = f"Not enough stock for {products[short[0]]['name']}"
+            continue
+        for pid, q in o["wanted"].items():
+            remaining[pid] -= q
+        accepted.append((i, o))
+    return accepted, rejected
+
+
+def _sync_chunk(orders, results, now):
+    """Write one chunk of parsed (index, order) pairs; fills `results` in place."""
+    refs = sorted({o["client_ref"] for _, o in orders})
+    synced = {
+        (r.user_id, r.client_ref): r.id
+        for r in db.session.execute(
+            _expanding("SELECT id, user_id, client_ref FROM orders WHERE client_ref IN :refs", "refs"),
+            {"refs": refs},
+        )
+    }
+    fresh = []
+    for i, o in orders:
+        order_id = synced.get((o["user_id"], o["client_ref"]))
+        if order_id is not None:
+            results[i] = {"client_ref": o["client_ref"], "status": "duplicate", "order_id": order_id}
+        else:
+            fresh.append((i, o))
+
+    product_ids = sorted({pid for _, o in fresh for pid in o["wanted"]})
+    for _ in range(ALLOCATION_RETRIES):
+        products = {
+            r.id: {"name": r.name, "price": r.price, "stock": r.stock}
+            for r in db.session.execute(
+                _expanding("SELECT id, name, price, stock FROM products WHERE id IN :ids", "ids"),
+                {"ids": product_ids or [0]},
+            )
+        }
+        accepted, rejected = _allocate(fresh, products)
+
+        totals = {}
+        for _, o in accepted:
+            for pid, q in o["wanted"].items():
+                totals[pid] = totals.get(pid, 0) + q
+        taken = db.session.execute(
+            text(TAKE_STOCK_SQL), [{"id": pid, "q": q, "now": now} for pid, q in totals.items()]
+        ).rowcount if totals else 0
+        if taken == len(totals):
+            break
+        # stock moved under us; re-read and allocate again
+        db.session.rollback()
+    else:
+        for i, o in fresh:
+            results[i] = {"client_ref": o["client_ref"], "status": "rejected",
+                          "reason": "Stock changed concurrently, retry"}
+        return
+
+    if accepted:
+        # typed binds so the timestamps are stored in the ORM's format, which
+        # the listing cursors compare against
+        insert_orders = text(INSERT_ORDER_SQL).bindparams(
+            bindparam("created_at", type_=DateTime), bindparam("now", type_=DateTime))
+        db.session.execute(insert_orders, [{
+            "user_id": o["user_id"], "status": o["status"], "client_ref": o["client_ref"],
+            "created_at": o["created_at"], "now": now,
+            **order_totals([(q, products[pid]["price"]) for pid, q in o["wanted"].items()]),
+        } for _, o in accepted])
+        new_ids = {
+            (r.user_id, r.client_ref): r.id
+            for r in db.session.execute(
+                _expanding("SELECT id, user_id, client_ref FROM orders WHERE client_ref IN :refs", "refs"),
+                {"refs": sorted({o["client_ref"] for _, o in accepted})},
+            )
+        }
+        db.session.execute(text(INSERT_ITEM_SQL), [
+            {"order_id": new_ids[(o["user_id"], o["client_ref"])], "product_id": pid,
+             "quantity": q, "price": products[pid]["price"]}
+            for _, o in accepted for pid, q in o["wanted"].items()
+        ])
+        events.record([
+            events.placed(new_ids[(o["user_id"], o["client_ref"])], o["user_id"], o["status"],
+                          [{"product_id": pid, "quantity": q, "price": products[pid]["price"]}
+                           for pid, q in o["wanted"].items()],
+                          source="bulk", client_ref=o["client_ref"])
+            for _, o in accepted
+        ], now)
+    db.session.commit()
+
+    for i, o in accepted:
+        results[i] = {"client_ref": o["client_ref"], "status": "accepted",
+                      "order_id": new_ids[(o["user_id"], o["client_ref"])]}
+    refs = {i: o["client_ref"] for i, o in fresh}
+    for i, reason in rejected.items():
+        results[i] = {"client_ref": refs[i], "status": "rejected", "reason": reason}
+
+
+def sync_orders(raw_orders, caller_id, admin):
+    """
+    Validate and write offline orders; returns one result per input order,
+    in input order: accepted (with order_id), duplicate (already synced,
+    with its order_id) or rejected (with a reason).
+    """
+    now = datetime.utcnow()
+    chunk_size = current_app.config["BULK_CHUNK_SIZE"]
+    results = [None] * len(raw_orders)
+
+    parsed, seen = [], set()
+    for i, raw in enumerate(raw_orders):
+        order, error = _parse_order(raw, caller_id, admin, now)
+        if error:
+            results[i] = {"client_ref": raw.get("client_ref") if isinstance(raw, dict) else None,
+                          "status": "rejected", "reason": error}
+        elif (order["user_id"], order["client_ref"]) in seen:
+            results[i] = {"client_ref": order["client_ref"], "status": "rejected",
+                          "reason": "client_ref repeated in this upload"}
+        else:
+            seen.add((order["user_id"], order["client_ref"]))
+            parsed.append((i, order))
+
+    for lo in range(0, len(parsed), chunk_size):
+        chunk = parsed[lo:lo + chunk_size]
+        for attempt in range(ALLOCATION_RETRIES):
+            try:
+                _sync_chunk(chunk, results, now)
+                break
+            except IntegrityError:
+                # another upload synced one of these client_refs after our
+                # duplicate check; the next pass re-reads them as duplicates
+                db.session.rollback()
+                if attempt == ALLOCATION_RETRIES - 1:
+                    raise
+            except Exception:
+                db.session.rollback()
+                raise
+    return results
@@ -0,0 +1,80 @@
+# order-service/app/commands.py
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from . import reports, totals
+from .reservations import sweep_expired, sweep_forever
+from .idempotency import purge_expired_keys
+
+reservations_cli = AppGroup("reservations", help="Maintain stock reservations.")
+idempotency_cli = AppGroup("idempotency", help="Maintain stored Idempotency-Key responses.")
+orders_cli = AppGroup("orders", help="Maintain denormalized order data.")
+reports_cli = AppGroup("reports", help="Build the end-of-day order reports.")
+
+
+@reservations_cli.command("sweep")
+@click.option("--batch-size", type=int, help="orders per transaction (default RESERVATION_SWEEP_BATCH)")
+@click.option("--every", type=int, default=None,
+              help="keep running, one sweep every N seconds (default RESERVATION_SWEEP_INTERVAL; 0 = once)")
+def sweep_command(batch_size, every):
+    """Release expired holds and cancel their orders, once or every N seconds."""
+    every = current_app.config["RESERVATION_SWEEP_INTERVAL"] if every is None else every
+    if every <= 0:
+        click.echo(f"{sweep_expired(batch_size)} expired order(s) released")
+        return
+    click.echo(f"sweeping expired holds every {every}s")
+    sweep_forever(current_app._get_current_object(), every)
+
+
+@idempotency_cli.command("purge")
+def purge_command():
+    """Delete expired idempotency keys (order- and payment-service share the table)."""
+    click.echo(f"{purge_expired_keys()} expired key(s) deleted")
+
+
+@orders_cli.command("backfill-totals")
+@click.option("--batch-size", type=int, default=10_000, show_default=True, help="orders per transaction")
+def backfill_totals_command(batch_size):
+    """Add total_amount/item_count/line_count to orders if missing and fill them from order_items."""
+    added = totals.add_missing_columns()
+    if added:
+        click.echo(f"added column(s): {', '.join(added)}")
+    click.echo(f"{totals.backfill(batch_size)} order(s) backfilled")
+
+
+@orders_cli.command("check-totals")
+@click.option("--batch-size", type=int, default=10_000, show_default=True, help="orders per query")
+@click.option("--limit", type=int, default=20, show_default=True, help="drifted orders to list")
+def check_totals_command(batch_size, limit):
+    """Report orders whose stored totals differ from their lines; exit 1 if any do."""
+    if totals.missing_columns():
+        raise click.ClickException("orders has no total columns yet; run `flask orders backfill-totals`")
+    drift = totals.find_drift(batch_size)
+    for row in drift[:limit]:
+        click.echo(
+            f"order {row['id']}: total_amount {row['total_amount']} != {row['expected_total_amount']}, "
+            f"item_count {row['item_count']} != {row['expected_item_count']}, "
+            f"line_count {row['line_count']} != {row['expected_line_count']}"
+        )
+    if drift:
+        click.echo(f"{len(drift)} order(s) drifted; run `flask orders backfill-totals` to repair")
+        raise SystemExit(1)
+    click.echo("ok: all order totals match their lines")
+
+
+@reports_cli.command("close")
+@click.option("--day", type=click.DateTime(formats=["%Y-%m-%d"]), help="only this day (default: all pending)")
+@click.option("--force", is_flag=True, help="recompute --day even if it is already frozen")
+def close_reports_command(day, force):
+    """Freeze the reports of closed days and refresh the current day's (run from cron)."""
+    if day is not None:
+        day = day.date()
+        if force:
+            rows = reports.compute_day(day, freeze=reports.is_closed(day))
+            click.echo(f"{day}: recomputed, {rows} row(s)")
+            return
+        row = reports.ensure_day(day)
+        click.echo(f"{day}: {'frozen' if row['frozen'] else 'open'}")
+        return
+    frozen = reports.close_pending_days()
+    click.echo(f"{len(frozen)} day(s) frozen" + (f", {frozen[0]} .. {frozen[-1]}" if frozen else ""))
@@ -0,0 +1,58 @@
+# order-service/app/events.py
+"""
+Transactional outbox for order changes (order_events).
+
+Every code path that creates an order or changes its status appends an
+event through record() before it commits, so an event exists if and only
+if its change was committed. SQLite runs one writer at a time, so `seq`
+order is commit order: a consumer that remembers the last seq it handled
+and asks for `after=<that seq>` sees every change exactly once, in order,
+without rescanning orders.
+
+Event types:
+  placed          a new order (checkout or bulk upload); payload has the items
+  status_changed  old_status -> new_status; payload has the reason
+"""
+from datetime import datetime
+from sqlalchemy import JSON, DateTime, bindparam, text
+from . import db
+
+INSERT_EVENT_SQL = """
+INSERT INTO order_events (order_id, user_id, event_type, old_status, new_status, payload, created_at)
+VALUES (:order_id, :user_id, :event_type, :old_status, :new_status, :payload, :created_at)
+"""
+
+EVENTS_AFTER_SQL = """
+SELECT seq, order_id, user_id, event_type, old_status, new_status, payload, created_at
+FROM order_events
+WHERE seq > :after
+ORDER BY seq
+LIMIT :limit
+"""
+
+
+def placed(order_id, user_id, status, items, **payload):
+    """Event for a new order; `items` is [{product_id, quantity, price}]."""
+    return {"order_id": order_id, "user_id": user_id, "event_type": "placed",
+            "old_status": None, "new_status": status, "payload": {"items": items, **payload}}
+
+
+def status_changed(order_id, user_id, old_status, new_status, reason):
+    return {"order_id": order_id, "user_id": user_id, "event_type": "status_changed",
+            "old_status": old_status, "new_status": new_status, "payload": {"reason": reason}}
+
+
+def record(events, now=None):
+    """Append events built by placed()/status_changed() in one executemany. Does not commit."""
+    if not events:
+        return
+    now = now or datetime.utcnow()
+    stmt = text(INSERT_EVENT_SQL).bindparams(
+        bindparam("payload", type_=JSON), bindparam("created_at", type_=DateTime))
+    db.session.execute(stmt, [{**e, "created_at": now} for e in events])
+
+
+def read_after(after, limit):
+    """Up to `limit` events with seq > `after`, oldest first."""
+    stmt = text(EVENTS_AFTER_SQL).columns(payload=JSON, created_at=DateTime)
+    return db.session.execute(stmt, {"after": after, "limit": limit}).all()
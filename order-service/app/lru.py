@@ -0,0 +1,84 @@
+# lru.py
+#
+# Kept byte-identical in product-service/app/ and order-service/app/ (the
+# services share no package); change both together:
+# product-service/tests/test_cache.py fails while they differ.
+"""
+The per-process product cache both services read through: product-service
+for listings and lookups (cache.py), order-service for the name and price
+checkout needs (product_cache.py). Each fills it from the database and
+passes catalog_version.static_version along, so an entry never outlives a
+change made by either service.
+"""
+import threading
+from collections import OrderedDict
+
+
+class ProductCache:
+    """
+    LRU of the rarely changing fields of at most `max_size` products, keyed
+    by id and dropped whenever the catalog's static_version moves; safe to
+    share between request threads.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()   # id -> {field: value}, the fields loaded so far
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def get_many(self, ids, fields, version):
+        """
+        ({id: entry} of the ids cached with all of `fields`, [ids to load]).
+        Everything is dropped first if `version` moved since the last call.
+        """
+        with self._lock:
+            if version != self._version:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._version = version
+            found, missing = {}, []
+            for pid in ids:
+                entry = self._entries.get(pid)
+                if entry is not None and all(f in entry for f in fields):
+                    found[pid] = entry
+                    self._entries.move_to_end(pid)
+                else:
+                    missing.append(pid)
+            self.hits += len(found)
+            self.misses += len(missing)
+            return found, missing
+
+    def put_many(self, entries, version):
+        """Store {id: {field: value}} loaded while static_version was `version`."""
+        with self._lock:
+            if version != self._version:
+                return
+            for pid, entry in entries.items():
+                self._entries[pid] = {**self._entries.get(pid, {}), **entry}
+                self._entries.move_to_end(pid)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, ids):
+        """Drop `ids` after this process wrote them (other processes see static_version move)."""
+        with self._lock:
+            for pid in ids:
+                self._entries.pop(pid, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "static_version": self._version,
+            }
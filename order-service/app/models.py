@@ -16,11 +16,25 @@ class Order(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, nullable=False)  # from auth-service
-    status = db.Column(db.String(20), default="pending")  # pending, paid, shipped
+    status = db.Column(db.String(20), default="pending")  # reserved, pending, paid, shipped
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    client_ref = db.Column(db.String(64))  # offline-shop id, set by POST /orders/bulk
+    # Denormalized from order_items when the order is written (totals.py)
+    total_amount = db.Column(db.Float, nullable=False, default=0.0, server_default="0")
+    item_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")  # sum of quantities
+    line_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")  # order_items rows
 
     items = db.relationship("OrderItem", backref="order", lazy=True)
 
+    # Keyset pagination of the order listings (newest first)
+    __table_args__ = (
+        db.Index("ix_orders_created_id", "created_at", "id"),
+        db.Index("ix_orders_user_created_id", "user_id", "created_at", "id"),
+        # Re-uploads of an offline order are detected by (client_ref, user_id)
+        db.UniqueConstraint("client_ref", "user_id", name="uq_orders_client_ref_user"),
+    )
+
     def __repr__(self):
         return f"<Order {self.id} for User {self.user_id}>"
     
@@ -31,8 +45,85 @@ class Product(db.Model):
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
     price = db.Column(db.Float, nullable=False)
-    stock = db.Column(db.Integer, default=0)
+    stock = db.Column(db.Integer, default=0)        # available to promise
+    reserved = db.Column(db.Integer, nullable=False, default=0, server_default="0")  # held by unpaid orders
     image_url = db.Column(db.String(255), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow)
-    
+
+
+class StockReservation(db.Model):
+    """Units of one product held for an unpaid order until expires_at."""
+    __tablename__ = "stock_reservations"
+
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey("orders.id"), nullable=False, index=True)
+    product_id = db.Column(db.Integer, nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(10), nullable=False, default="held")  # held, committed, released, expired
+    expires_at = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index("ix_stock_reservations_status_expires", "status", "expires_at"),
+    )
+
+
+class IdempotencyKey(db.Model):
+    __tablename__ = "idempotency_keys"
+
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(120), nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.String(12), nullable=False, default="in_progress")  # in_progress, done
+    response_code = db.Column(db.Integer)
+    response_body = db.Column(db.Text)
+    response_mimetype = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        db.UniqueConstraint("scope", "key", name="uq_idempotency_scope_key"),
+    )
+
+
+class OrderEvent(db.Model):
+    __tablename__ = "order_events"
+
+    seq = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, nullable=False, index=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    event_type = db.Column(db.String(20), nullable=False)   # placed, status_changed
+    old_status = db.Column(db.String(20))
+    new_status = db.Column(db.String(20), nullable=False)
+    payload = db.Column(db.JSON, default=dict)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+class OrderReportDay(db.Model):
+    __tablename__ = "order_report_days"
+
+    day = db.Column(db.Date, primary_key=True)
+    frozen = db.Column(db.Boolean, nullable=False, default=False)
+    events_seq = db.Column(db.Integer)
+    computed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class OrderDailyReport(db.Model):
+    __tablename__ = "order_daily_reports"
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    dimension = db.Column(db.String(10), nullable=False)   # total, status, channel, product
+    key = db.Column(db.String(32), nullable=False)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    items = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        db.UniqueConstraint("day", "dimension", "key", name="uq_order_daily_reports_day_dim_key"),
+    )
@@ -0,0 +1,66 @@
+# order-service/app/product_cache.py
+"""
+In-process cache of the product fields checkout needs, the same scheme as
+product-service's cache.py and the same ProductCache (lru.py): stock is
+read from the database on every lookup, name and price are kept in a
+bounded LRU keyed by product id.
+
+The query that reads stock also reads catalog_version.static_version,
+which triggers bump whenever a product is added, removed or changes a
+field other than stock, from any service; when it moves, the cache drops
+all its entries. Price changes made in product-service are therefore
+seen by the next checkout of every order-service process. Stock writes
+(holds, releases) never touch cached fields.
+"""
+from flask import current_app
+from sqlalchemy import bindparam, select, text
+from sqlalchemy.exc import OperationalError
+from . import db
+from .models import Product
+
+COLD_FIELDS = ("name", "price")
+
+HOT_SQL = text("""
+SELECT p.id, p.stock, v.static_version
+FROM products p
+LEFT JOIN catalog_version v ON v.id = 1
+WHERE p.id IN :ids
+""").bindparams(bindparam("ids", expanding=True))
+
+COLD_SQL = select(Product.id, Product.name, Product.price)
+
+
+def product_cache():
+    return current_app.extensions["product_cache"]
+
+
+def _load_cold(ids):
+    return {r.id: {"name": r.name, "price": r.price} for r in db.session.execute(COLD_SQL.where(Product.id.in_(ids)))}
+
+
+def load(ids):
+    """
+    {id: {"name", "price", "stock"}} of the products among `ids` that
+    exist: one query for stock and the version, plus one for the name and
+    price of cache misses, if any.
+    """
+    if not ids:
+        return {}
+    try:
+        rows = db.session.execute(HOT_SQL, {"ids": list(ids)}).all()
+    except OperationalError:
+        # no catalog_version.static_version yet (product-service: `flask catalog ensure`)
+        db.session.rollback()
+        rows = db.session.execute(select(Product.id, Product.stock).where(Product.id.in_(ids))).all()
+        cold = _load_cold([r.id for r in rows])
+    else:
+        version = rows[0].static_version if rows else None
+        if version is None:
+            cold = _load_cold([r.id for r in rows])
+        else:
+            cold, to_load = product_cache().get_many([r.id for r in rows], COLD_FIELDS, version)
+            if to_load:
+                loaded = _load_cold(to_load)
+                product_cache().put_many(loaded, version)
+                cold.update(loaded)
+    return {r.id: {**cold[r.id], "stock": r.stock} for r in rows if r.id in cold}
@@ -0,0 +1,181 @@
+# order-service/app/reports.py
+"""
+End-of-day order report.
+
+For one day (by order created_at, UTC), a single pass over the day's order
+lines gives totals (orders, items, revenue) by four dimensions: total,
+order status, payment channel (that of the order's successful payment,
+'unpaid' if none) and product. They are stored in order_daily_reports.
+
+A day closes ORDER_REPORT_CLOSE_DELAY seconds after its midnight, to let
+late offline uploads land. After that its report is computed one last time
+and frozen; later changes to its orders no longer touch it unless it is
+closed again with force. The current day is recomputed only when
+order_events has moved since its last computation, which costs one index
+probe to check.
+"""
+from datetime import date, datetime, time, timedelta
+from flask import current_app
+from sqlalchemy import text
+from . import db
+
+DIMENSIONS = ("total", "status", "channel", "product")
+
+# Every order line of [start, end), with its order's payment channel
+DAY_LINES_SQL = """
+SELECT o.id AS order_id, o.status, COALESCE(p.channel, 'unpaid') AS channel,
+       oi.product_id, COALESCE(oi.quantity, 0) AS quantity, COALESCE(oi.price, 0) AS price
+FROM orders o
+LEFT JOIN order_items oi ON oi.order_id = o.id
+LEFT JOIN (
+  SELECT order_id, MIN(channel) AS channel
+  FROM payments
+  WHERE status = 'success'
+    AND order_id IN (SELECT id FROM orders WHERE created_at >= :start AND created_at < :end)
+  GROUP BY order_id
+) p ON p.order_id = o.id
+WHERE o.created_at >= :start AND o.created_at < :end
+"""
+
+INSERT_ROW_SQL = """
+INSERT INTO order_daily_reports (day, dimension, key, orders, items, revenue)
+VALUES (:day, :dimension, :key, :orders, :items, :revenue)
+"""
+
+UPSERT_DAY_SQL = """
+INSERT INTO order_report_days (day, frozen, events_seq, computed_at)
+VALUES (:day, :frozen, :events_seq, :now)
+ON CONFLICT (day) DO UPDATE SET
+  frozen = excluded.frozen, events_seq = excluded.events_seq, computed_at = excluded.computed_at
+"""
+
+REPORT_ROWS_SQL = """
+SELECT dimension, key, orders, items, revenue
+FROM order_daily_reports
+WHERE day = :day
+ORDER BY dimension, revenue DESC, key
+"""
+
+
+def _day_bounds(day):
+    start = datetime.combine(day, time.min)
+    return str(start), str(start + timedelta(days=1))
+
+
+def _events_seq():
+    return db.session.execute(text("SELECT MAX(seq) FROM order_events")).scalar()
+
+
+def get_day(day):
+    return db.session.execute(
+        text("SELECT day, frozen, events_seq, computed_at FROM order_report_days WHERE day = :day"),
+        {"day": str(day)},
+    ).mappings().first()
+
+
+def is_closed(day, now=None):
+    """True once `day` is over and ORDER_REPORT_CLOSE_DELAY has passed."""
+    now = now or datetime.utcnow()
+    closes_at = datetime.combine(day + timedelta(days=1), time.min) \
+        + timedelta(seconds=current_app.config["ORDER_REPORT_CLOSE_DELAY"])
+    return now >= closes_at
+
+
+def aggregate(rows):
+    """{(dimension, key): [orders, items, revenue]} from DAY_LINES_SQL rows."""
+    orders, products = {}, {}
+    for r in rows:
+        o = orders.setdefault(r.order_id, [r.status, r.channel, 0, 0.0])
+        line_total = r.quantity * r.price
+        o[2] += r.quantity
+        o[3] += line_total
+        if r.product_id is not None:
+            p = products.setdefault(str(r.product_id), [set(), 0, 0.0])
+            p[0].add(r.order_id)
+            p[1] += r.quantity
+            p[2] += line_total
+
+    totals = {}
+    for status, channel, items, revenue in orders.values():
+        for key in (("total", "all"), ("status", status), ("channel", channel)):
+            t = totals.setdefault(key, [0, 0, 0.0])
+            t[0] += 1
+            t[1] += items
+            t[2] += revenue
+    for pid, (order_ids, items, revenue) in products.items():
+        totals[("product", pid)] = [len(order_ids), items, revenue]
+    return totals
+
+
+def compute_day(day, freeze):
+    """Recompute and store the report of `day` in one transaction; returns its row count."""
+    now = datetime.utcnow()
+    seq = _events_seq()
+    start, end = _day_bounds(day)
+    totals = aggregate(db.session.execute(text(DAY_LINES_SQL), {"start": start, "end": end}))
+    try:
+        db.session.execute(text("DELETE FROM order_daily_reports WHERE day = :day"), {"day": str(day)})
+        if totals:
+            db.session.execute(text(INSERT_ROW_SQL), [
+                {"day": str(day), "dimension": dim, "key": key,
+                 "orders": n, "items": items, "revenue": round(revenue, 2)}
+                for (dim, key), (n, items, revenue) in totals.items()
+            ])
+        db.session.execute(text(UPSERT_DAY_SQL),
+                           {"day": str(day), "frozen": freeze, "events_seq": seq, "now": str(now)})
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(totals)
+
+
+def ensure_day(day):
+    """
+    Bring the report of `day` up to date: close and freeze it if the day
+    has closed, recompute it if still open and orders changed since, leave
+    it alone if frozen. Returns the order_report_days row.
+    """
+    row = get_day(day)
+    if row is None or not row["frozen"]:
+        if is_closed(day):
+            compute_day(day, freeze=True)
+        elif row is None or row["events_seq"] != _events_seq():
+            compute_day(day, freeze=False)
+        row = get_day(day)
+    return row
+
+
+def close_pending_days(today=None):
+    """
+    The daily close job: freeze every closed day after the last frozen one
+    (from the first order on the first run), then refresh the current day.
+    Returns the days that were frozen.
+    """
+    today = today or datetime.utcnow().date()
+    last = db.session.execute(text("SELECT MAX(day) FROM order_report_days WHERE frozen")).scalar()
+    if last is not None:
+        day = date.fromisoformat(str(last)) + timedelta(days=1)
+    else:
+        first = db.session.execute(text("SELECT MIN(created_at) FROM orders")).scalar()
+        day = datetime.fromisoformat(str(first)).date() if first else today
+
+    frozen = []
+    while day <= today:
+        if not is_closed(day):
+            ensure_day(day)
+        else:
+            row = get_day(day)
+            if row is None or not row["frozen"]:
+                compute_day(day, freeze=True)
+                frozen.append(day)
+        day += timedelta(days=1)
+    return frozen
+
+
+def read_day(day):
+    """{dimension: [{key, orders, items, revenue}, ...]} for a stored report."""
+    report = {dim: [] for dim in DIMENSIONS}
+    for r in db.session.execute(text(REPORT_ROWS_SQL), {"day": str(day)}).mappings():
+        report[r["dimension"]].append({k: r[k] for k in ("key", "orders", "items", "revenue")})
+    return report
@@ -0,0 +1,210 @@
+# order-service/app/reservations.py
+"""
+Stock holds for orders awaiting payment.
+
+products.stock is the available-to-promise counter and products.reserved
+counts units held by unpaid orders. Placing an order moves units from stock
+to reserved, with one held stock_reservations row per product that expires
+after ORDER_RESERVATION_TTL. Then one of three things happens:
+  commit   payment succeeded: reserved -= q, the order becomes 'paid'
+  release  cancelled by the customer: stock += q, reserved -= q
+  sweep    the hold expired: released like a cancel but marked 'expired',
+           order 'cancelled' (a late payment may still take the stock again)
+Every transition claims its rows with a status-guarded UPDATE, so a commit
+racing the sweeper can only ever win once.
+"""
+from datetime import datetime, timedelta
+import threading
+import time
+from flask import current_app
+from sqlalchemy import bindparam, text
+from . import db, events
+from .models import StockReservation
+
+TAKE_STOCK_SQL = """
+UPDATE products SET stock = stock - :q, reserved = reserved + :q, updated_at = :now
+WHERE id = :id AND stock >= :q
+"""
+
+COMMIT_STOCK_SQL = """
+UPDATE products SET reserved = reserved - :q, updated_at = :now
+WHERE id = :id
+"""
+
+RELEASE_STOCK_SQL = """
+UPDATE products SET stock = stock + :q, reserved = reserved - :q, updated_at = :now
+WHERE id = :id
+"""
+
+CLAIM_HOLD_SQL = """
+UPDATE stock_reservations SET status = :status, updated_at = :now
+WHERE id = :id AND status = 'held'
+"""
+
+HELD_FOR_ORDERS_SQL = """
+SELECT id, order_id, product_id, quantity
+FROM stock_reservations
+WHERE status = 'held' AND order_id IN :order_ids
+"""
+
+class ReservationConflict(Exception):
+    """Some of the holds being settled were committed/released concurrently."""
+
+
+EXPIRED_ORDERS_SQL = """
+SELECT DISTINCT order_id
+FROM stock_reservations
+WHERE status = 'held' AND expires_at <= :now
+LIMIT :limit
+"""
+
+RESERVED_ORDERS_SQL = """
+SELECT id, user_id FROM orders
+WHERE id IN :ids AND status = 'reserved'
+"""
+
+EXPIRE_ORDERS_SQL = """
+UPDATE orders SET status = 'cancelled', updated_at = :now
+WHERE id IN :ids
+"""
+
+
+def hold(order_id, wanted, now=None):
+    """
+    Reserve {product_id: quantity} for a freshly flushed order. Returns the
+    expiry, or None if some product no longer has the stock; the caller
+    must roll back then. Does not commit.
+    """
+    now = now or datetime.utcnow()
+    taken = db.session.execute(
+        text(TAKE_STOCK_SQL),
+        [{"id": pid, "q": q, "now": now} for pid, q in wanted.items()],
+    ).rowcount
+    if taken != len(wanted):
+        return None
+    expires_at = now + timedelta(seconds=current_app.config["ORDER_RESERVATION_TTL"])
+    db.session.add_all([
+        StockReservation(order_id=order_id, product_id=pid, quantity=q,
+                         status="held", expires_at=expires_at, created_at=now, updated_at=now)
+        for pid, q in wanted.items()
+    ])
+    return expires_at
+
+
+def _settle(order_ids, status, stock_sql, now):
+    """
+    Move the held rows of `order_ids` to `status` and apply `stock_sql`
+    per product. Returns the order ids whose holds were claimed. Does not commit.
+    """
+    if not order_ids:
+        return set()
+    rows = db.session.execute(
+        text(HELD_FOR_ORDERS_SQL).bindparams(bindparam("order_ids", expanding=True)),
+        {"order_ids": list(order_ids)},
+    ).all()
+    if not rows:
+        return set()
+    claimed = db.session.execute(
+        text(CLAIM_HOLD_SQL), [{"id": r.id, "status": status, "now": now} for r in rows]
+    ).rowcount
+    if claimed != len(rows):
+        # a concurrent commit/release got some of them first; let it win
+        raise ReservationConflict(f"holds for orders {sorted(order_ids)} changed concurrently")
+
+    per_product = {}
+    for r in rows:
+        per_product[r.product_id] = per_product.get(r.product_id, 0) + r.quantity
+    db.session.execute(text(stock_sql), [{"id": pid, "q": q, "now": now} for pid, q in per_product.items()])
+    return {r.order_id for r in rows}
+
+
+def commit(order_id, now=None):
+    """Turn an order's holds into a sale. True if there was a hold to commit."""
+    return bool(commit_orders([order_id], now))
+
+
+def release(order_id, now=None):
+    """Give an order's held units back to stock. True if anything was released."""
+    return bool(release_orders([order_id], now))
+
+
+def commit_orders(order_ids, now=None):
+    """commit() for many orders in one batch; returns the order ids that had holds."""
+    return _settle(order_ids, "committed", COMMIT_STOCK_SQL, now or datetime.utcnow())
+
+
+def release_orders(order_ids, now=None):
+    """release() for many orders in one batch; returns the order ids that had holds."""
+    return _settle(order_ids, "released", RELEASE_STOCK_SQL, now or datetime.utcnow())
+
+
+def expired_hold(order_id):
+    """True if the order was cancelled by the sweeper rather than by someone."""
+    return db.session.execute(
+        text("SELECT 1 FROM stock_reservations WHERE order_id = :id AND status = 'expired' LIMIT 1"),
+        {"id": order_id},
+    ).first() is not None
+
+
+def sweep_expired(batch_size=None):
+    """
+    Release expired holds batch by batch and cancel their orders, one
+    transaction per batch. Returns the number of orders expired.
+    """
+    batch_size = batch_size or current_app.config["RESERVATION_SWEEP_BATCH"]
+    expired = 0
+    while True:
+        now = datetime.utcnow()
+        order_ids = db.session.execute(
+            text(EXPIRED_ORDERS_SQL), {"now": now, "limit": batch_size}
+        ).scalars().all()
+        if not order_ids:
+            return expired
+        try:
+            released = _settle(order_ids, "expired", RELEASE_STOCK_SQL, now)
+            if released:
+                # _settle's UPDATEs opened the write transaction, so these
+                # rows stay 'reserved' until the UPDATE below
+                orders = db.session.execute(
+                    text(RESERVED_ORDERS_SQL).bindparams(bindparam("ids", expanding=True)),
+                    {"ids": list(released)},
+                ).all()
+                if orders:
+                    db.session.execute(
+                        text(EXPIRE_ORDERS_SQL).bindparams(bindparam("ids", expanding=True)),
+                        {"now": now, "ids": [o.id for o in orders]},
+                    )
+                    events.record([events.status_changed(o.id, o.user_id, "reserved", "cancelled",
+                                                         "reservation expired") for o in orders], now)
+            db.session.commit()
+        except ReservationConflict:
+            # raced a payment commit; the next pass re-reads what is still held
+            db.session.rollback()
+            continue
+        expired += len(released)
+        if len(order_ids) < batch_size:
+            return expired
+
+
+def sweep_forever(app, interval):
+    """Run sweep_expired() every `interval` seconds until the process exits."""
+    while True:
+        time.sleep(interval)
+        with app.app_context():
+            try:
+                n = sweep_expired()
+                if n:
+                    app.logger.info("reservation sweeper expired %d order(s)", n)
+            except Exception:
+                db.session.rollback()
+                app.logger.exception("reservation sweep failed")
+            finally:
+                db.session.remove()
+
+
+def start_sweeper(app, interval=None):
+    """sweep_forever() in a daemon thread, every `interval` (default RESERVATION_SWEEP_INTERVAL) seconds."""
+    interval = interval or app.config["RESERVATION_SWEEP_INTERVAL"]
+    thread = threading.Thread(target=sweep_forever, args=(app, interval), name="reservation-sweeper", daemon=True)
+    thread.start()
+    return thread
@@ -1,7 +1,21 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-from . import db
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+import base64
+import csv
+import hmac
+import io
+from flask import Blueprint, Response, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt, verify_jwt_in_request
+from sqlalchemy import and_, or_, select, text
+from sqlalchemy.orm import selectinload
+from . import db, events, product_cache, reports, reservations
 from .models import Order, OrderItem, Product   # ✅ use Product directly
+from .reservations import ReservationConflict
+from .bulk import sync_orders
+from .totals import order_totals
+from .transitions import ALLOWED_TRANSITIONS, MOVE_ORDER_SQL, ORDER_STATUSES, transition
+from .idempotency import idempotent
+from .utils import aggregate_items
 
 order_bp = Blueprint("orders", __name__, url_prefix="/orders")
 
@@ -13,47 +27,152 @@ def is_admin():
     return claims.get("role") == "admin"
 
 
+# ---------------------------------
+# Helper: service-to-service calls
+# ---------------------------------
+def is_internal():
+    token = request.headers.get("X-Internal-Token", "")
+    return hmac.compare_digest(token, current_app.config["INTERNAL_TOKEN"])
+
+
+# Guarded decrement used when a payment lands after its hold expired
+RETAKE_STOCK_SQL = """
+UPDATE products SET stock = stock - :q, updated_at = :now
+WHERE id = :id AND stock >= :q
+"""
+
+
 # ---------------------------------
 # Place Order (Customer)
 # ---------------------------------
 @order_bp.route("/", methods=["POST"])
 @jwt_required()
+@idempotent(lambda: f"user:{get_jwt_identity()}:POST /orders/")
 def place_order():
-    """Customer places an order, stock reduces directly from DB"""
+    """
+    Customer places an order. Stock is read with one IN query, names and
+    prices come from the product cache (product_cache.py), and the stock
+    is held for ORDER_RESERVATION_TTL seconds with one batch of guarded
+    UPDATEs (see reservations.py), in the same transaction as the order:
+    either every line is held or nothing is. The order stays 'reserved'
+    until payment commits the hold or it expires. Retries that carry the
+    same Idempotency-Key get the first response back.
+    """
     user_id = int(get_jwt_identity())
-    data = request.get_json()
+    data = request.get_json(silent=True)
 
     if not data or "items" not in data:
         return jsonify({"error": "Items are required"}), 400
+    wanted, error = aggregate_items(data["items"])
+    if error:
+        return jsonify({"error": error}), 400
+
+    products = product_cache.load(list(wanted))
+    missing = [pid for pid in wanted if pid not in products]
+    if missing:
+        return jsonify({"error": f"Product {missing[0]} not found"}), 404
+    short = [products[pid] for pid, q in wanted.items() if (products[pid]["stock"] or 0) < q]
+    if short:
+        return jsonify({"error": f"Not enough stock for {short[0]['name']}"}), 400
+
+    try:
+        order = Order(user_id=user_id, status="reserved",
+                      **order_totals([(q, products[pid]["price"]) for pid, q in wanted.items()]))
+        db.session.add(order)
+        db.session.flush()
+        expires_at = reservations.hold(order.id, wanted)
+        if expires_at is None:
+            # another checkout took the stock between our read and the UPDATE
+            db.session.rollback()
+            return jsonify({"error": "Not enough stock for one or more items"}), 409
+        db.session.add_all([
+            OrderItem(order_id=order.id, product_id=pid, quantity=q, price=products[pid]["price"])
+            for pid, q in wanted.items()
+        ])
+        events.record([events.placed(
+            order.id, user_id, order.status,
+            [{"product_id": pid, "quantity": q, "price": products[pid]["price"]} for pid, q in wanted.items()],
+            source="checkout", reserved_until=expires_at.isoformat(),
+        )])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
 
-    order = Order(user_id=user_id)
-    db.session.add(order)
-    db.session.flush()
+    return jsonify({
+        "message": f"Order {order.id} placed successfully",
+        "order_id": order.id,
+        "status": order.status,
+        "reserved_until": expires_at.isoformat(),
+    }), 201
 
-    for item in data["items"]:
-        product_id = item.get("product_id")
-        quantity = item.get("quantity", 1)
 
-        product = Product.query.get(product_id)
-        if not product:
-            return jsonify({"error": f"Product {product_id} not found"}), 404
-        if product.stock < quantity:
-            return jsonify({"error": f"Not enough stock for {product.name}"}), 400
+def _items_per_product(order):
+    per_product = {}
+    for item in order.items:
+        per_product[item.product_id] = per_product.get(item.product_id, 0) + item.quantity
+    return per_product
 
-        # Reduce stock directly
-        product.stock -= quantity
 
-        # Add item with snapshot price
-        order_item = OrderItem(
-            order_id=order.id,
-            product_id=product.id,
-            quantity=quantity,
-            price=product.price
-        )
-        db.session.add(order_item)
+# ---------------------------------
+# Commit Reservation (payment-service, internal)
+# ---------------------------------
+@order_bp.route("/internal/<int:order_id>/commit", methods=["POST"])
+def commit_reservation(order_id):
+    """
+    Payment succeeded: turn the order's stock hold into a sale and mark it
+    paid. The order is claimed with a status-guarded UPDATE first, so a
+    cancel or the sweeper getting to it after our read leaves it alone. If
+    the hold already expired, the stock is taken again if it is still
+    there; otherwise (or if someone cancelled it) 409 and the order stays
+    cancelled.
+    """
+    if not is_internal():
+        return jsonify({"error": "Internal endpoint"}), 403
 
+    order = Order.query.get(order_id)
+    if not order:
+        return jsonify({"error": "Order not found"}), 404
+
+    now = datetime.utcnow()
+    try:
+        if order.status == "reserved":
+            if _claim_order(order.id, "reserved", now) and reservations.commit(order.id, now):
+                return _committed(order, "reserved", now)
+            # moved out of 'reserved' (or its hold settled) since we read it
+            db.session.rollback()
+            db.session.refresh(order)
+
+        if order.status == "paid":
+            return jsonify({"message": "already committed", "order_id": order.id, "status": order.status}), 200
+        if order.status != "cancelled" or not reservations.expired_hold(order.id):
+            return jsonify({"error": f"Cannot commit an order with status {order.status}"}), 409
+
+        per_product = _items_per_product(order)
+        taken = db.session.execute(
+            text(RETAKE_STOCK_SQL), [{"id": pid, "q": q, "now": now} for pid, q in per_product.items()]
+        ).rowcount
+        if taken != len(per_product) or not _claim_order(order.id, "cancelled", now):
+            db.session.rollback()
+            return jsonify({"error": "Reservation expired and stock is no longer available",
+                            "order_id": order.id, "status": "cancelled"}), 409
+        return _committed(order, "cancelled", now)
+    except ReservationConflict:
+        db.session.rollback()
+        return jsonify({"error": "Reservation changed concurrently, retry"}), 409
+
+
+def _claim_order(order_id, old_status, now):
+    """Move the order from `old_status` to 'paid'; False if it was no longer there."""
+    return db.session.execute(
+        text(MOVE_ORDER_SQL), {"id": order_id, "old_status": old_status, "new_status": "paid", "now": now}
+    ).rowcount == 1
+
+
+def _committed(order, old_status, now):
+    events.record([events.status_changed(order.id, order.user_id, old_status, "paid", "payment")], now)
     db.session.commit()
-    return jsonify({"message": f"Order {order.id} placed successfully"}), 201
+    return jsonify({"message": "reservation committed", "order_id": order.id, "status": "paid"}), 200
 
 
 # ---------------------------------
@@ -62,7 +181,7 @@ def place_order():
 @order_bp.route("/<int:order_id>/cancel", methods=["PUT"])
 @jwt_required()
 def cancel_order(order_id):
-    """Cancel an order, restore stock if pending/paid"""
+    """Cancel an order: release its hold if reserved, restore stock if pending/paid"""
     user_id = int(get_jwt_identity())
     order = Order.query.get(order_id)
 
@@ -70,48 +189,151 @@ def cancel_order(order_id):
         return jsonify({"error": "Order not found"}), 404
     if not is_admin() and order.user_id != user_id:
         return jsonify({"error": "Not authorized to cancel this order"}), 403
-    if order.status not in ["pending", "paid"]:
+    if "cancelled" not in ALLOWED_TRANSITIONS.get(order.status, ()):
         return jsonify({"error": f"Cannot cancel an order with status {order.status}"}), 400
 
-    # Restore stock directly
-    for item in order.items:
-        product = Product.query.get(item.product_id)
-        if product:
-            product.stock += item.quantity
-
-    order.status = "cancelled"
-    db.session.commit()
+    reason = "cancelled by admin" if is_admin() else "cancelled by customer"
+    result = transition([order.id], "cancelled", reason)[order.id]
+    if result["result"] == "conflict":
+        return jsonify({"error": result["error"]}), 409
+    if result["result"] == "rejected":
+        return jsonify({"error": f"Cannot cancel an order with status {result['status']}"}), 400
 
     return jsonify({
         "message": f"Order {order.id} has been cancelled and stock restored",
         "order_id": order.id,
-        "status": order.status
+        "status": "cancelled"
     }), 200
 
 
 # ---------------------------------
-# View My Orders (Customer)
+# Bulk Sync Offline Orders
 # ---------------------------------
-@order_bp.route("/", methods=["GET"])
+@order_bp.route("/bulk", methods=["POST"])
 @jwt_required()
-def my_orders():
-    """Customer views their own orders"""
-    user_id = int(get_jwt_identity())
-    orders = Order.query.filter_by(user_id=user_id).all()
+@idempotent(lambda: f"user:{get_jwt_identity()}:POST /orders/bulk")
+def bulk_orders():
+    """
+    Upload orders completed in an offline shop: {"orders": [{"client_ref",
+    "items", "status"?, "created_at"?, "user_id"? (admin only)}, ...]}.
+    Each order is accepted, reported as a duplicate of an earlier upload
+    (same client_ref) or rejected on its own; stock is taken for good since
+    the sale already happened. See bulk.py for how the writes are batched.
+    """
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get("orders"), list) or not data["orders"]:
+        return jsonify({"error": "orders (a non-empty list) is required"}), 400
+    limit = current_app.config["BULK_MAX_ORDERS"]
+    if len(data["orders"]) > limit:
+        return jsonify({"error": f"At most {limit} orders per request"}), 400
+
+    results = sync_orders(data["orders"], int(get_jwt_identity()), is_admin())
+    summary = {s: sum(1 for r in results if r["status"] == s) for s in ("accepted", "duplicate", "rejected")}
+    return jsonify({**summary, "results": results}), 200
+
+
+# ---------------------------------
+# Helper: keyset-paginated order listing
+# ---------------------------------
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(order):
+    raw = f"{order.created_at.isoformat()}|{order.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """(created_at, id) from encode_cursor(); raises ValueError if malformed."""
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    created_at, order_id = raw.rsplit("|", 1)
+    return datetime.fromisoformat(created_at), int(order_id)
+
+
+def _parse_day(s):
+    return datetime.strptime(s, "%Y-%m-%d") if s else None
+
+
+def list_orders(query, include_user):
+    """
+    Orders of `query`, newest first. Query args: status (comma separated),
+    from / to (YYYY-MM-DD, inclusive), and limit / cursor. Without limit or
+    cursor every matching order is returned, as before; passing either
+    pages the listing on (created_at, id), and the cursor for the next page
+    is sent in X-Next-Cursor and a Link rel="next" header. Items are loaded
+    in one extra SELECT.
+    """
+    try:
+        limit = None
+        if "limit" in request.args or "cursor" in request.args:
+            limit = min(max(int(request.args.get("limit", DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        start = _parse_day(request.args.get("from"))
+        end = _parse_day(request.args.get("to"))
+        cursor = request.args.get("cursor")
+        after = decode_cursor(cursor) if cursor else None
+    except (ValueError, UnicodeDecodeError):
+        return jsonify({"error": "Invalid limit, cursor or date (YYYY-MM-DD)"}), 400
+
+    statuses = [s for s in (request.args.get("status") or "").split(",") if s]
+    if statuses:
+        query = query.filter(Order.status.in_(statuses))
+    if start:
+        query = query.filter(Order.created_at >= start)
+    if end:
+        query = query.filter(Order.created_at < end + timedelta(days=1))
+    if after:
+        created_at, order_id = after
+        query = query.filter(or_(
+            Order.created_at < created_at,
+            and_(Order.created_at == created_at, Order.id < order_id),
+        ))
+
+    query = query.options(selectinload(Order.items)).order_by(Order.created_at.desc(), Order.id.desc())
+    if limit is None:
+        orders, has_more = query.all(), False
+    else:
+        orders = query.limit(limit + 1).all()
+        has_more = len(orders) > limit
+        orders = orders[:limit]
 
     result = []
     for o in orders:
-        result.append({
-            "order_id": o.id,
+        row = {"order_id": o.id}
+        if include_user:
+            row["user_id"] = o.user_id
+        row.update({
             "status": o.status,
             "created_at": o.created_at,
+            "total_amount": o.total_amount,
+            "item_count": o.item_count,
+            "line_count": o.line_count,
             "items": [
                 {"product_id": i.product_id, "quantity": i.quantity, "price": i.price}
                 for i in o.items
             ]
         })
+        result.append(row)
 
-    return jsonify(result), 200
+    resp = jsonify(result)
+    if has_more:
+        next_cursor = encode_cursor(orders[-1])
+        args = request.args.to_dict()
+        args["cursor"] = next_cursor
+        resp.headers["X-Next-Cursor"] = next_cursor
+        resp.headers["Link"] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+    return resp, 200
+
+
+# ---------------------------------
+# View My Orders (Customer)
+# ---------------------------------
+@order_bp.route("/", methods=["GET"])
+@jwt_required()
+def my_orders():
+    """Customer views their own orders; paged if limit or cursor is given (see list_orders)"""
+    user_id = int(get_jwt_identity())
+    return list_orders(Order.query.filter_by(user_id=user_id), include_user=False)
 
 
 # ---------------------------------
@@ -120,25 +342,15 @@ def my_orders():
 @order_bp.route("/all", methods=["GET"])
 @jwt_required()
 def all_orders():
-    """Admin: view all orders"""
+    """Admin: view all orders (paged on request, see list_orders); ?user_id= narrows to one customer"""
     if not is_admin():
         return jsonify({"error": "Admins only"}), 403
 
-    orders = Order.query.all()
-    result = []
-    for o in orders:
-        result.append({
-            "order_id": o.id,
-            "user_id": o.user_id,
-            "status": o.status,
-            "created_at": o.created_at,
-            "items": [
-                {"product_id": i.product_id, "quantity": i.quantity, "price": i.price}
-                for i in o.items
-            ]
-        })
-
-    return jsonify(result), 200
+    query = Order.query
+    user_filter = request.args.get("user_id", type=int)
+    if user_filter is not None:
+        query = query.filter(Order.user_id == user_filter)
+    return list_orders(query, include_user=True)
 
 
 # ---------------------------------
@@ -162,6 +374,9 @@ def get_order(order_id):
         "user_id": order.user_id,
         "status": order.status,
         "created_at": order.created_at,
+        "total_amount": order.total_amount,
+        "item_count": order.item_count,
+        "line_count": order.line_count,
         "items": [
             {"product_id": i.product_id, "quantity": i.quantity, "price": i.price}
             for i in order.items
@@ -177,25 +392,173 @@ def get_order(order_id):
 @order_bp.route("/<int:order_id>/status", methods=["PUT"])
 @jwt_required()
 def update_order_status(order_id):
-    """Admin updates order status"""
+    """Admin updates order status (moves allowed by ALLOWED_TRANSITIONS only)"""
     if not is_admin():
         return jsonify({"error": "Admins only"}), 403
 
-    order = Order.query.get(order_id)
-    if not order:
+    data = request.get_json(silent=True) or {}
+    new_status = data.get("status")
+    if new_status not in ORDER_STATUSES:
+        return jsonify({"error": "Invalid status"}), 400
+
+    result = transition([order_id], new_status, "admin update")[order_id]
+    if result["result"] == "not_found":
         return jsonify({"error": "Order not found"}), 404
+    if result["result"] == "rejected":
+        return jsonify({"error": result["error"]}), 400
+    if result["result"] == "conflict":
+        return jsonify({"error": result["error"]}), 409
 
-    data = request.get_json()
-    new_status = data.get("status")
+    return jsonify({
+        "message": f"Order {order_id} status updated to {new_status}",
+        "order_id": order_id,
+        "status": new_status
+    }), 200
 
-    if new_status not in ["pending", "paid", "shipped", "delivered", "cancelled"]:
+
+# ---------------------------------
+# Bulk Update Order Status (Admin)
+# ---------------------------------
+@order_bp.route("/status/bulk", methods=["PUT"])
+@jwt_required()
+def bulk_update_status():
+    """
+    Admin moves many orders at once: {"order_ids": [...], "status": "shipped"}.
+    Orders are processed BULK_CHUNK_SIZE per transaction and every id gets
+    its own result (see transitions.transition); repeated ids count once.
+    """
+    if not is_admin():
+        return jsonify({"error": "Admins only"}), 403
+
+    data = request.get_json(silent=True) or {}
+    new_status = data.get("status")
+    order_ids = data.get("order_ids")
+    if new_status not in ORDER_STATUSES:
         return jsonify({"error": "Invalid status"}), 400
+    if not isinstance(order_ids, list) or not order_ids or not all(isinstance(i, int) for i in order_ids):
+        return jsonify({"error": "order_ids (a non-empty list of integers) is required"}), 400
+    limit = current_app.config["BULK_MAX_ORDERS"]
+    if len(order_ids) > limit:
+        return jsonify({"error": f"At most {limit} orders per request"}), 400
+
+    order_ids = list(dict.fromkeys(order_ids))
+    chunk_size = current_app.config["BULK_CHUNK_SIZE"]
+    results = {}
+    for lo in range(0, len(order_ids), chunk_size):
+        results.update(transition(order_ids[lo:lo + chunk_size], new_status, "bulk update"))
+
+    ordered = [results[oid] for oid in order_ids]
+    summary = {k: sum(1 for r in ordered if r["result"] == k)
+               for k in ("updated", "unchanged", "rejected", "not_found", "conflict")}
+    return jsonify({**summary, "status": new_status, "results": ordered}), 200
 
-    order.status = new_status
-    db.session.commit()
 
+# ---------------------------------
+# Order Event Feed (consumers: analytics, notifications)
+# ---------------------------------
+DEFAULT_EVENT_BATCH = 500
+MAX_EVENT_BATCH = 5000
+
+
+@order_bp.route("/events", methods=["GET"])
+def order_events():
+    """
+    Order changes in commit order: ?after=<last seq handled>&limit=.
+    Call again with after=next_after while has_more is true; an empty
+    batch means the consumer is caught up. Other services authenticate
+    with X-Internal-Token, people with an admin JWT.
+    """
+    verify_jwt_in_request(optional=True)
+    if not is_internal() and not (get_jwt_identity() and is_admin()):
+        return jsonify({"error": "Admins or internal callers only"}), 403
+
+    try:
+        after = int(request.args.get("after", 0))
+        limit = int(request.args.get("limit", DEFAULT_EVENT_BATCH))
+    except ValueError:
+        return jsonify({"error": "after and limit must be integers"}), 400
+    if after < 0 or not 1 <= limit <= MAX_EVENT_BATCH:
+        return jsonify({"error": f"after must be >= 0 and limit between 1 and {MAX_EVENT_BATCH}"}), 400
+
+    rows = events.read_after(after, limit)
     return jsonify({
-        "message": f"Order {order.id} status updated to {new_status}",
-        "order_id": order.id,
-        "status": order.status
+        "events": [{
+            "seq": r.seq,
+            "order_id": r.order_id,
+            "user_id": r.user_id,
+            "type": r.event_type,
+            "old_status": r.old_status,
+            "new_status": r.new_status,
+            "payload": r.payload,
+            "created_at": r.created_at.isoformat(),
+        } for r in rows],
+        "next_after": rows[-1].seq if rows else after,
+        "has_more": len(rows) == limit,
+    }), 200
+
+
+# ---------------------------------
+# Daily Order Report (Admin)
+# ---------------------------------
+REPORT_CSV_COLUMNS = ("dimension", "key", "name", "orders", "items", "revenue")
+
+
+@order_bp.route("/reports/daily", methods=["GET"])
+@jwt_required()
+def daily_report():
+    """
+    End-of-day report for ?day=YYYY-MM-DD (default today, UTC): totals by
+    status, payment channel and product (see reports.py). Closed days are
+    served frozen; ?format=csv downloads the same rows.
+    """
+    if not is_admin():
+        return jsonify({"error": "Admins only"}), 403
+
+    today = datetime.utcnow().date()
+    try:
+        day = datetime.strptime(request.args["day"], "%Y-%m-%d").date() if request.args.get("day") else today
+    except ValueError:
+        return jsonify({"error": "day must be YYYY-MM-DD"}), 400
+    if day > today:
+        return jsonify({"error": "day is in the future"}), 400
+
+    meta = reports.ensure_day(day)
+    report = reports.read_day(day)
+    names = dict(db.session.execute(
+        select(Product.id, Product.name).where(Product.id.in_([int(r["key"]) for r in report["product"]]))
+    ).all())
+    for r in report["product"]:
+        r["name"] = names.get(int(r["key"]))
+
+    if request.args.get("format") == "csv":
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(REPORT_CSV_COLUMNS)
+        for dim in reports.DIMENSIONS:
+            for r in report[dim]:
+                writer.writerow([dim, r["key"], r.get("name", ""), r["orders"], r["items"], f"{r['revenue']:.2f}"])
+        return Response(out.getvalue(), mimetype="text/csv",
+                        headers={"Content-Disposition": f"attachment; filename=orders-{day}.csv"})
+
+    totals = report.pop("total")
+    return jsonify({
+        "day": str(day),
+        "frozen": bool(meta["frozen"]),
+        "computed_at": str(meta["computed_at"]),
+        "totals": totals[0] if totals else {"key": "all", "orders": 0, "items": 0, "revenue": 0.0},
+        "by_status": report["status"],
+        "by_channel": report["channel"],
+        "by_product": report["product"],
     }), 200
+
+
+# ---------------------------------
+# Product Cache Stats (Admin)
+# ---------------------------------
+@order_bp.route("/product-cache/stats", methods=["GET"])
+@jwt_required()
+def product_cache_stats():
+    """Hit rate and size of this worker process's checkout product cache."""
+    if not is_admin():
+        return jsonify({"error": "Admins only"}), 403
+    return jsonify(product_cache.product_cache().stats()), 200
@@ -0,0 +1,102 @@
+# order-service/app/totals.py
+"""
+Per-order totals kept on the orders row: total_amount (sum of quantity *
+price, rounded to cents), item_count (sum of quantities) and line_count
+(order_items rows).
+
+Order lines never change after an order is written, so the totals are
+computed once, by whoever inserts the lines (place_order, bulk upload),
+with order_totals(). That lets listings and analytics read them without
+joining order_items. For databases created before the columns existed,
+`flask orders backfill-totals` adds the columns and fills them in id
+ranges; `flask orders check-totals` reports any order whose stored totals
+no longer match its lines.
+"""
+from sqlalchemy import inspect, text
+from . import db
+
+TOTAL_COLUMNS = {
+    "total_amount": "FLOAT NOT NULL DEFAULT 0",
+    "item_count": "INTEGER NOT NULL DEFAULT 0",
+    "line_count": "INTEGER NOT NULL DEFAULT 0",
+}
+
+# Totals of every order in (lo, hi], straight from order_items
+LINE_TOTALS_SQL = """
+SELECT order_id,
+       ROUND(SUM(quantity * price), 2) AS total_amount,
+       SUM(quantity) AS item_count,
+       COUNT(*) AS line_count
+FROM order_items
+WHERE order_id > :lo AND order_id <= :hi
+GROUP BY order_id
+"""
+
+BACKFILL_SQL = f"""
+UPDATE orders
+SET total_amount = t.total_amount, item_count = t.item_count, line_count = t.line_count
+FROM ({LINE_TOTALS_SQL}) AS t
+WHERE orders.id = t.order_id
+"""
+
+DRIFT_SQL = f"""
+SELECT o.id, o.total_amount, o.item_count, o.line_count,
+       COALESCE(t.total_amount, 0) AS expected_total_amount,
+       COALESCE(t.item_count, 0) AS expected_item_count,
+       COALESCE(t.line_count, 0) AS expected_line_count
+FROM orders o
+LEFT JOIN ({LINE_TOTALS_SQL}) AS t ON t.order_id = o.id
+WHERE o.id > :lo AND o.id <= :hi
+  AND (ABS(o.total_amount - COALESCE(t.total_amount, 0)) >= 0.005
+       OR o.item_count != COALESCE(t.item_count, 0)
+       OR o.line_count != COALESCE(t.line_count, 0))
+ORDER BY o.id
+"""
+
+
+def order_totals(lines):
+    """{total_amount, item_count, line_count} for [(quantity, price), ...]."""
+    return {
+        "total_amount": round(sum(q * p for q, p in lines), 2),
+        "item_count": sum(q for q, _ in lines),
+        "line_count": len(lines),
+    }
+
+
+def missing_columns():
+    present = {c["name"] for c in inspect(db.engine).get_columns("orders")}
+    return [name for name in TOTAL_COLUMNS if name not in present]
+
+
+def add_missing_columns():
+    """ALTER TABLE orders for whichever total columns it lacks; returns their names."""
+    missing = missing_columns()
+    for name in missing:
+        db.session.execute(text(f"ALTER TABLE orders ADD COLUMN {name} {TOTAL_COLUMNS[name]}"))
+    db.session.commit()
+    return missing
+
+
+def _id_ranges(batch_size):
+    max_id = db.session.execute(text("SELECT MAX(id) FROM orders")).scalar() or 0
+    for lo in range(0, max_id, batch_size):
+        yield lo, min(lo + batch_size, max_id)
+
+
+def backfill(batch_size):
+    """Recompute the totals of every order, one transaction per id range; returns rows updated."""
+    updated = 0
+    for lo, hi in _id_ranges(batch_size):
+        updated += db.session.execute(text(BACKFILL_SQL), {"lo": lo, "hi": hi}).rowcount
+        db.session.commit()
+    return updated
+
+
+def find_drift(batch_size, limit=None):
+    """Orders whose stored totals differ from their lines, up to `limit` of them."""
+    drift = []
+    for lo, hi in _id_ranges(batch_size):
+        drift += db.session.execute(text(DRIFT_SQL), {"lo": lo, "hi": hi}).mappings().all()
+        if limit and len(drift) >= limit:
+            return drift[:limit]
+    return drift
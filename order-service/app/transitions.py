@@ -0,0 +1,132 @@
+# order-service/app/transitions.py
+"""
+Order status changes, one order or hundreds at a time.
+
+ALLOWED_TRANSITIONS is the only place that decides which moves are legal.
+A batch of orders is moved in one transaction with a constant number of
+statements, whatever its size:
+  1. one IN query for the current statuses
+  2. one executemany of status-guarded UPDATEs (WHERE status = old), so an
+     order changed concurrently makes the batch roll back and re-read
+  3. stock: holds of 'reserved' orders are committed or released in one
+     batch (reservations.py); orders whose stock was already taken for good
+     give it back with a single UPDATE ... CASE over the products involved
+  4. one executemany of status_changed events (events.py)
+"""
+from datetime import datetime
+from sqlalchemy import bindparam, case, text, update
+from . import db, events, reservations
+from .models import Product
+from .reservations import ReservationConflict
+
+ALLOWED_TRANSITIONS = {
+    "reserved": {"paid", "cancelled"},
+    "pending": {"paid", "cancelled"},
+    "paid": {"shipped", "delivered", "cancelled"},
+    "shipped": {"delivered"},
+    "delivered": set(),
+    "cancelled": set(),
+}
+ORDER_STATUSES = tuple(ALLOWED_TRANSITIONS)
+TRANSITION_RETRIES = 3
+
+CURRENT_STATUS_SQL = """
+SELECT id, user_id, status FROM orders WHERE id IN :ids
+"""
+
+MOVE_ORDER_SQL = """
+UPDATE orders SET status = :new_status, updated_at = :now
+WHERE id = :id AND status = :old_status
+"""
+
+ITEMS_PER_PRODUCT_SQL = """
+SELECT product_id, SUM(quantity) AS quantity
+FROM order_items
+WHERE order_id IN :ids
+GROUP BY product_id
+"""
+
+
+def restore_stock(order_ids, now):
+    """Give the items of `order_ids` back to products.stock in one UPDATE ... CASE."""
+    if not order_ids:
+        return
+    per_product = dict(db.session.execute(
+        text(ITEMS_PER_PRODUCT_SQL).bindparams(bindparam("ids", expanding=True)),
+        {"ids": list(order_ids)},
+    ).all())
+    if not per_product:
+        return
+    db.session.execute(
+        update(Product)
+        .where(Product.id.in_(list(per_product)))
+        .values(stock=Product.stock + case(per_product, value=Product.id, else_=0), updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _move(order_ids, new_status, reason, now):
+    """
+    One attempt at moving `order_ids`; returns {id: result}. Raises
+    ReservationConflict (after rolling back) if an order changed under us.
+    """
+    current = {
+        r.id: r for r in db.session.execute(
+            text(CURRENT_STATUS_SQL).bindparams(bindparam("ids", expanding=True)), {"ids": list(order_ids)}
+        )
+    }
+    results, moving = {}, []
+    for oid in order_ids:
+        row = current.get(oid)
+        if row is None:
+            results[oid] = {"order_id": oid, "result": "not_found", "error": "Order not found"}
+        elif row.status == new_status:
+            results[oid] = {"order_id": oid, "result": "unchanged", "status": row.status}
+        elif new_status not in ALLOWED_TRANSITIONS.get(row.status, ()):
+            results[oid] = {"order_id": oid, "result": "rejected", "status": row.status,
+                            "error": f"Cannot move an order from {row.status} to {new_status}"}
+        else:
+            moving.append(row)
+    if not moving:
+        return results
+
+    try:
+        moved = db.session.execute(text(MOVE_ORDER_SQL), [
+            {"id": r.id, "old_status": r.status, "new_status": new_status, "now": now} for r in moving
+        ]).rowcount
+        if moved != len(moving):
+            raise ReservationConflict("orders changed status concurrently")
+
+        held = [r.id for r in moving if r.status == "reserved"]
+        if new_status == "cancelled":
+            reservations.release_orders(held, now)
+            restore_stock([r.id for r in moving if r.status != "reserved"], now)
+        else:
+            reservations.commit_orders(held, now)
+
+        events.record([events.status_changed(r.id, r.user_id, r.status, new_status, reason) for r in moving], now)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    for r in moving:
+        results[r.id] = {"order_id": r.id, "result": "updated", "old_status": r.status, "status": new_status}
+    return results
+
+
+def transition(order_ids, new_status, reason, now=None):
+    """
+    Move every order in `order_ids` to `new_status` in one transaction.
+    Returns {order_id: result} where result is updated, unchanged,
+    rejected (not allowed from its status), not_found or conflict (kept
+    changing under us for TRANSITION_RETRIES attempts).
+    """
+    now = now or datetime.utcnow()
+    for _ in range(TRANSITION_RETRIES):
+        try:
+            return _move(order_ids, new_status, reason, now)
+        except ReservationConflict:
+            continue
+    return {oid: {"order_id": oid, "result": "conflict", "error": "Order changed concurrently, retry"}
+            for oid in order_ids}
@@ -0,0 +1,19 @@
+# order-service/app/utils.py
+"""Request helpers: order item validation (Idempotency-Key support is in idempotency.py)."""
+
+
+def aggregate_items(items):
+    """
+    {product_id: total quantity} for an order's items, in first-seen order,
+    or (None, error) if any item is malformed.
+    """
+    if not isinstance(items, list) or not items:
+        return None, "Items are required"
+    wanted = {}
+    for item in items:
+        product_id = item.get("product_id") if isinstance(item, dict) else None
+        quantity = item.get("quantity", 1) if isinstance(item, dict) else None
+        if not isinstance(product_id, int) or not isinstance(quantity, int) or quantity <= 0:
+            return None, "Each item needs an integer product_id and a positive integer quantity"
+        wanted[product_id] = wanted.get(product_id, 0) + quantity
+    return wanted, None
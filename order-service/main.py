@@ -1,4 +1,6 @@
+import os
 from app import create_app
+from app.reservations import start_sweeper
 
 # Initialize Flask app
 app = create_app()
@@ -8,4 +10,11 @@ def home():
     return {"message": "Order Service Running 🚀"}
 
 if __name__ == "__main__":
+    # The served process expires unpaid holds in the background (every 60 s
+    # unless RESERVATION_SWEEP_INTERVAL says otherwise, 0 = off); under a
+    # WSGI server run `flask reservations sweep --every 60` beside it. The
+    # debug reloader runs this file twice: sweep in the serving child only.
+    interval = int(os.getenv("RESERVATION_SWEEP_INTERVAL", "60"))
+    if interval > 0 and os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_sweeper(app, interval)
     app.run(debug=True, port=5002)  # Order-Service on 5002
@@ -0,0 +1,53 @@
+# order-service/tests/test_bulk.py
+"""POST /orders/bulk when another upload syncs the same client_ref concurrently."""
+import sqlite3
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def client_and_token(db_path):
+    con = sqlite3.connect(db_path)
+    con.execute("INSERT INTO users (id, first_name, email, password_hash, role) "
+                "VALUES (1, 'shop', 'shop@example.com', 'x', 'customer')")
+    con.execute("INSERT INTO products (id, name, price, stock) VALUES (1, 'Mug', 5.0, 100)")
+    con.commit()
+    con.close()
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("DATABASE_URL", "sqlite:///" + db_path)
+        mp.setenv("RESERVATION_SWEEP_INTERVAL", "0")
+        from app import create_app
+        from flask_jwt_extended import create_access_token
+        app = create_app()
+    with app.app_context():
+        token = create_access_token(identity="1", additional_claims={"role": "customer"})
+    return app.test_client(), {"Authorization": f"Bearer {token}"}
+
+
+def test_ref_synced_concurrently_is_reported_as_duplicate(client_and_token, db_path, monkeypatch):
+    from app import bulk
+    client, headers = client_and_token
+    allocate = bulk._allocate
+
+    def racing_allocate(orders, products):
+        # the other upload commits "r1" after this one's duplicate check
+        monkeypatch.setattr(bulk, "_allocate", allocate)
+        con = sqlite3.connect(db_path, timeout=30)
+        con.execute("INSERT INTO orders (user_id, status, client_ref, created_at, updated_at) "
+                    "VALUES (1, 'paid', 'r1', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)")
+        con.commit()
+        con.close()
+        return allocate(orders, products)
+
+    monkeypatch.setattr(bulk, "_allocate", racing_allocate)
+    resp = client.post("/orders/bulk", headers=headers, json={"orders": [
+        {"client_ref": "r1", "items": [{"product_id": 1, "quantity": 2}]},
+        {"client_ref": "r2", "items": [{"product_id": 1, "quantity": 3}]},
+    ]})
+
+    assert resp.status_code == 200
+    assert [r["status"] for r in resp.get_json()["results"]] == ["duplicate", "accepted"]
+    con = sqlite3.connect(db_path)
+    assert con.execute("SELECT stock FROM products WHERE id = 1").fetchone()[0] == 97
+    assert con.execute("SELECT COUNT(*) FROM orders WHERE client_ref = 'r1'").fetchone()[0] == 1
+    con.close()
@@ -0,0 +1,100 @@
+# order-service/tests/test_events.py
+"""The order_events outbox (events.py) and its feed, GET /orders/events?after=."""
+import sqlite3
+
+import pytest
+
+INTERNAL = {"X-Internal-Token": "change-me"}
+
+
+@pytest.fixture(scope="module")
+def app(db_path):
+    con = sqlite3.connect(db_path)
+    con.execute("INSERT INTO users (id, first_name, email, password_hash, role) "
+                "VALUES (1, 'c', 'c@example.com', 'x', 'customer')")
+    con.execute("INSERT INTO products (id, name, price, stock) VALUES (1, 'Mug', 5.0, 100)")
+    con.commit()
+    con.close()
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("DATABASE_URL", "sqlite:///" + db_path)
+        from app import create_app
+        app = create_app()
+    return app
+
+
+@pytest.fixture(scope="module")
+def clients(app):
+    from flask_jwt_extended import create_access_token
+    headers = {}
+    with app.app_context():
+        for role in ("customer", "admin"):
+            token = create_access_token(identity="1", additional_claims={"role": role})
+            headers[role] = {"Authorization": f"Bearer {token}"}
+    return app.test_client(), headers
+
+
+@pytest.fixture(scope="module")
+def history(clients):
+    """Two orders: the first placed, paid and cancelled, the second placed in between and paid."""
+    client, headers = clients
+
+    def place():
+        resp = client.post("/orders/", json={"items": [{"product_id": 1, "quantity": 2}]},
+                           headers=headers["customer"])
+        assert resp.status_code == 201
+        return resp.get_json()["order_id"]
+
+    def set_status(order_id, status):
+        resp = client.put(f"/orders/{order_id}/status", json={"status": status}, headers=headers["admin"])
+        assert resp.status_code == 200
+
+    first = place()
+    set_status(first, "paid")
+    second = place()
+    assert client.put(f"/orders/{first}/cancel", headers=headers["customer"]).status_code == 200
+    set_status(second, "paid")
+    return [
+        (first, "placed", None, "reserved"),
+        (first, "status_changed", "reserved", "paid"),
+        (second, "placed", None, "reserved"),
+        (first, "status_changed", "paid", "cancelled"),
+        (second, "status_changed", "reserved", "paid"),
+    ]
+
+
+def _page(client, after, limit, headers=INTERNAL):
+    resp = client.get(f"/orders/events?after={after}&limit={limit}", headers=headers)
+    assert resp.status_code == 200
+    return resp.get_json()
+
+
+def test_changes_are_recorded_in_commit_order(clients, history):
+    client, _ = clients
+    feed = _page(client, 0, 100)
+    assert [(e["order_id"], e["type"], e["old_status"], e["new_status"]) for e in feed["events"]] == history
+    seqs = [e["seq"] for e in feed["events"]]
+    assert seqs == sorted(set(seqs))
+    assert feed["events"][0]["payload"]["items"] == [{"product_id": 1, "quantity": 2, "price": 5.0}]
+    assert feed["next_after"] == seqs[-1] and not feed["has_more"]
+
+
+def test_paging_with_after_sees_every_event_once(clients, history):
+    client, _ = clients
+    seen, after = [], 0
+    while True:
+        page = _page(client, after, 2)
+        seen += [e["seq"] for e in page["events"]]
+        after = page["next_after"]
+        if not page["has_more"]:
+            break
+    assert seen == [e["seq"] for e in _page(client, 0, 100)["events"]]
+    assert len(seen) == len(history)
+    # caught up: an empty batch that keeps the cursor where it was
+    assert _page(client, after, 2) == {"events": [], "next_after": after, "has_more": False}
+
+
+def test_feed_is_for_admins_and_internal_callers_only(clients, history):
+    client, headers = clients
+    assert _page(client, 0, 1, headers["admin"])["events"]
+    assert client.get("/orders/events", headers=headers["customer"]).status_code == 403
+    assert client.get("/orders/events?limit=0", headers=INTERNAL).status_code == 400
@@ -0,0 +1,110 @@
+# order-service/tests/test_idempotency.py
+"""Idempotency-Key on POST /orders/ (idempotency.py)."""
+import filecmp
+import os
+import sqlite3
+import threading
+
+import pytest
+
+ORDER = {"items": [{"product_id": 1, "quantity": 2}]}
+
+
+@pytest.fixture(scope="module")
+def app(db_path):
+    con = sqlite3.connect(db_path)
+    con.execute("INSERT INTO users (id, first_name, email, password_hash, role) "
+                "VALUES (1, 'c', 'c@example.com', 'x', 'customer')")
+    con.execute("INSERT INTO products (id, name, price, stock) VALUES (1, 'Mug', 5.0, 100)")
+    con.commit()
+    con.close()
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("DATABASE_URL", "sqlite:///" + db_path)
+        from app import create_app
+        app = create_app()
+    return app
+
+
+@pytest.fixture(scope="module")
+def auth(app):
+    from flask_jwt_extended import create_access_token
+    with app.app_context():
+        return {"Authorization": "Bearer " + create_access_token(identity="1", additional_claims={"role": "customer"})}
+
+
+@pytest.fixture
+def db(db_path):
+    con = sqlite3.connect(db_path, timeout=30)
+    yield con
+    con.close()
+
+
+def _post(app, auth, key, body=ORDER):
+    return app.test_client().post("/orders/", json=body, headers={**auth, "Idempotency-Key": key})
+
+
+def _orders(db):
+    return db.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+
+
+def test_same_key_same_body_replays_the_first_response(app, auth, db):
+    first = _post(app, auth, "k-replay")
+    assert first.status_code == 201 and "Idempotent-Replayed" not in first.headers
+    count, stock = _orders(db), db.execute("SELECT stock FROM products WHERE id = 1").fetchone()
+
+    again = _post(app, auth, "k-replay")
+    assert again.status_code == 201
+    assert again.headers["Idempotent-Replayed"] == "true"
+    assert again.get_json() == first.get_json()
+    assert _orders(db) == count
+    assert db.execute("SELECT stock FROM products WHERE id = 1").fetchone() == stock
+
+
+def test_same_key_different_body_is_refused(app, auth, db):
+    assert _post(app, auth, "k-body").status_code == 201
+    count = _orders(db)
+    resp = _post(app, auth, "k-body", {"items": [{"product_id": 1, "quantity": 3}]})
+    assert resp.status_code == 422
+    assert _orders(db) == count
+
+
+def test_concurrent_first_requests_create_one_order(app, auth, db, monkeypatch):
+    """The second request arrives while the first is still inside the view: it waits and replays."""
+    from app import routes
+    in_view, release, calls = threading.Event(), threading.Event(), []
+    aggregate_items = routes.aggregate_items
+
+    def slow_aggregate_items(items):
+        calls.append(1)
+        in_view.set()
+        release.wait(10)
+        return aggregate_items(items)
+
+    monkeypatch.setattr(routes, "aggregate_items", slow_aggregate_items)
+    count = _orders(db)
+    responses = [None, None]
+
+    def post(i):
+        responses[i] = _post(app, auth, "k-race")
+
+    first = threading.Thread(target=post, args=(0,))
+    first.start()
+    assert in_view.wait(10)
+    second = threading.Thread(target=post, args=(1,))
+    second.start()
+    second.join(0.5)          # still waiting for the first to finish
+    assert second.is_alive()
+    release.set()
+    first.join(10)
+    second.join(10)
+
+    assert len(calls) == 1
+    assert _orders(db) == count + 1
+    assert [r.status_code for r in responses] == [201, 201]
+    assert responses[1].headers["Idempotent-Replayed"] == "true"
+    assert responses[1].get_json() == responses[0].get_json()
+
+
+def test_payment_service_copy_has_not_drifted(service_package):
+    payment = os.path.join(os.path.dirname(service_package), "payment-service", "app", "idempotency.py")
+    assert filecmp.cmp(os.path.join(service_package, "app", "idempotency.py"), payment, shallow=False)
@@ -0,0 +1,62 @@
+# order-service/tests/test_order_listing.py
+"""Keyset pages of GET /orders/all on (created_at, id) when many orders share one created_at."""
+import sqlite3
+
+import pytest
+
+TIED = "2026-01-05T10:00:00"
+
+
+@pytest.fixture(scope="module")
+def client(db_path):
+    con = sqlite3.connect(db_path)
+    con.execute("INSERT INTO users (id, first_name, email, password_hash, role) "
+                "VALUES (1, 'a', 'a@example.com', 'x', 'admin')")
+    con.execute("INSERT INTO products (id, name, price, stock) VALUES (1, 'Mug', 5.0, 1000)")
+    con.commit()
+    con.close()
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("DATABASE_URL", "sqlite:///" + db_path)
+        from app import create_app
+        app = create_app()
+    from flask_jwt_extended import create_access_token
+    with app.app_context():
+        token = create_access_token(identity="1", additional_claims={"role": "admin"})
+    client = app.test_client()
+    client.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+
+    # an offline shop uploads a batch stamped with one second; a few orders around it
+    created = ["2026-01-05T09:59:59"] * 2 + [TIED] * 13 + ["2026-01-05T10:00:01"] * 2
+    upload = [{"client_ref": f"shop-{i}", "created_at": ts, "items": [{"product_id": 1, "quantity": 1}]}
+              for i, ts in enumerate(created)]
+    resp = client.post("/orders/bulk", json={"orders": upload})
+    assert resp.get_json()["accepted"] == len(created)
+    return client
+
+
+def _pages(client, limit, **args):
+    pages, cursor = [], None
+    while True:
+        query = dict(args, limit=limit, **({"cursor": cursor} if cursor else {}))
+        resp = client.get("/orders/all", query_string=query)
+        assert resp.status_code == 200
+        pages.append([o["order_id"] for o in resp.get_json()])
+        cursor = resp.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages
+
+
+@pytest.mark.parametrize("limit", [1, 4, 5, 13, 16, 17])
+def test_pages_have_no_duplicates_or_gaps_across_ties(client, limit):
+    everything = [o["order_id"] for o in client.get("/orders/all").get_json()]
+    assert len(everything) == 17
+    pages = _pages(client, limit)
+    assert [oid for page in pages for oid in page] == everything
+    assert all(len(page) == limit for page in pages[:-1])
+
+
+def test_ties_are_ordered_newest_id_first(client):
+    tied = [o for o in client.get("/orders/all").get_json() if o["created_at"].endswith("10:00:00 GMT")]
+    assert len(tied) == 13
+    assert [o["order_id"] for o in tied] == sorted((o["order_id"] for o in tied), reverse=True)
+
@@ -0,0 +1,68 @@
+# order-service/tests/test_place_order_concurrency.py
+"""
+No overselling under concurrent checkouts: 200 simultaneous single-unit
+orders against a stock of 50 on a threaded server must give exactly 50
+orders (benchmarks/stress_place_order.py is the tunable version).
+"""
+import json
+import logging
+import sqlite3
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+CLIENTS = 200
+STOCK = 50
+
+
+def _checkout(url, token, barrier):
+    req = urllib.request.Request(
+        url, data=json.dumps({"items": [{"product_id": 1, "quantity": 1}]}).encode(), method="POST",
+        headers={"Content-Type": "application/json", "Authorization": f"Bearer {token}"},
+    )
+    barrier.wait()
+    try:
+        with urllib.request.urlopen(req, timeout=60) as resp:
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def test_concurrent_checkouts_never_oversell(db_path, monkeypatch):
+    con = sqlite3.connect(db_path)
+    con.execute("INSERT INTO users (id, first_name, email, password_hash, role) "
+                "VALUES (1, 'stress', 'stress@example.com', 'x', 'customer')")
+    con.execute("INSERT INTO products (id, name, price, stock) VALUES (1, 'Hot item', 9.99, ?)", (STOCK,))
+    con.commit()
+    con.close()
+    monkeypatch.setenv("DATABASE_URL", "sqlite:///" + db_path)
+    monkeypatch.setenv("RESERVATION_SWEEP_INTERVAL", "0")
+    from app import create_app
+    from flask_jwt_extended import create_access_token
+    from werkzeug.serving import make_server
+
+    app = create_app()
+    with app.app_context():
+        token = create_access_token(identity="1", additional_claims={"role": "customer"})
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/orders/"
+    try:
+        barrier = threading.Barrier(CLIENTS)
+        with ThreadPoolExecutor(max_workers=CLIENTS) as pool:
+            codes = list(pool.map(lambda _: _checkout(url, token, barrier), range(CLIENTS)))
+    finally:
+        server.shutdown()
+
+    con = sqlite3.connect(db_path)
+    stock, reserved = con.execute("SELECT stock, reserved FROM products WHERE id = 1").fetchone()
+    orders = con.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+    units = con.execute("SELECT COALESCE(SUM(quantity), 0) FROM order_items").fetchone()[0]
+    con.close()
+
+    assert codes.count(201) == STOCK
+    assert set(codes) <= {201, 400, 409}
+    assert orders == units == STOCK
+    assert (stock, reserved) == (0, STOCK)
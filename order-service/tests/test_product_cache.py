@@ -0,0 +1,89 @@
+# order-service/tests/test_product_cache.py
+"""
+Checkout's product cache (product_cache.py) stays coherent with writes
+made by product-service, another process: a price change is seen by the
+next checkout, a stock change leaves the cached name and price alone.
+"""
+import sqlite3
+
+import pytest
+
+# product-service writes, run in its own interpreter (its package is `app` too)
+PRODUCT_SERVICE_REQUEST = """
+from flask_jwt_extended import create_access_token
+token = create_access_token(identity="9", additional_claims={{"role": "admin"}})
+r = app.test_client().put({url!r}, json={body!r}, headers={{"Authorization": "Bearer " + token}})
+assert r.status_code == 200, r.get_json()
+"""
+
+
+@pytest.fixture(scope="module")
+def app(db_path):
+    con = sqlite3.connect(db_path)
+    con.execute("INSERT INTO users (id, first_name, email, password_hash, role) "
+                "VALUES (1, 'c', 'c@example.com', 'x', 'customer')")
+    con.execute("INSERT INTO products (id, name, price, stock) VALUES (1, 'Mug', 5.0, 100)")
+    con.commit()
+    con.close()
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("DATABASE_URL", "sqlite:///" + db_path)
+        from app import create_app
+        app = create_app()
+    return app
+
+
+@pytest.fixture(scope="module")
+def checkout(app, db_path):
+    """checkout() places an order for one mug and returns the price it was charged."""
+    from flask_jwt_extended import create_access_token
+    with app.app_context():
+        token = create_access_token(identity="1", additional_claims={"role": "customer"})
+    client = app.test_client()
+
+    def place():
+        resp = client.post("/orders/", json={"items": [{"product_id": 1, "quantity": 1}]},
+                           headers={"Authorization": f"Bearer {token}"})
+        assert resp.status_code == 201
+        con = sqlite3.connect(db_path)
+        try:
+            return con.execute("SELECT price FROM order_items WHERE order_id = ?",
+                               (resp.get_json()["order_id"],)).fetchone()[0]
+        finally:
+            con.close()
+    return place
+
+
+def _product_service_put(in_service, db_path, url, body):
+    in_service("product-service", db_path, PRODUCT_SERVICE_REQUEST.format(url=url, body=body))
+
+
+def _stats(app):
+    return app.extensions["product_cache"].stats()
+
+
+def test_second_checkout_reads_name_and_price_from_the_cache(app, checkout):
+    assert checkout() == 5.0
+    before = _stats(app)
+    assert checkout() == 5.0
+    after = _stats(app)
+    assert (after["hits"], after["misses"]) == (before["hits"] + 1, before["misses"])
+
+
+def test_price_change_in_product_service_invalidates(app, checkout, db_path, in_service):
+    checkout()
+    before = _stats(app)
+    _product_service_put(in_service, db_path, "/products/1", {"price": 6.5})
+    assert checkout() == 6.5
+    after = _stats(app)
+    assert after["invalidations"] == before["invalidations"] + 1
+    assert after["misses"] == before["misses"] + 1
+
+
+def test_stock_change_in_product_service_keeps_the_cache(app, checkout, db_path, in_service):
+    checkout()
+    before = _stats(app)
+    _product_service_put(in_service, db_path, "/products/1/stock", {"quantity": 50})
+    assert checkout() == 6.5
+    after = _stats(app)
+    assert after["invalidations"] == before["invalidations"]
+    assert after["hits"] == before["hits"] + 1
@@ -0,0 +1,81 @@
+# order-service/tests/test_reports.py
+"""GET /orders/reports/daily: the JSON report and its CSV download agree (reports.py)."""
+import csv
+import io
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+DAY = date.today() - timedelta(days=3)
+# (order id, status, payment channel or None, [(product id, quantity, price)])
+ORDERS = [
+    (1, "paid", "online", [(1, 2, 5.0), (2, 1, 30.0)]),
+    (2, "delivered", "offline", [(2, 2, 30.0)]),
+    (3, "pending", None, [(1, 1, 5.0)]),
+    (4, "cancelled", None, [(3, 4, 2.5)]),
+]
+
+
+@pytest.fixture(scope="module")
+def client(db_path):
+    con = sqlite3.connect(db_path)
+    con.execute("INSERT INTO users (id, first_name, email, password_hash, role) "
+                "VALUES (1, 'a', 'a@example.com', 'x', 'admin')")
+    con.executemany("INSERT INTO products (id, name, price, stock) VALUES (?, ?, 1.0, 10)",
+                    [(1, "Mug"), (2, "Kettle, steel"), (3, "Spoon")])
+    created = f"{DAY} 09:30:00"
+    for oid, status, channel, items in ORDERS:
+        con.execute("INSERT INTO orders (id, user_id, status, created_at, updated_at) VALUES (?, 1, ?, ?, ?)",
+                    (oid, status, created, created))
+        con.executemany("INSERT INTO order_items (order_id, product_id, quantity, price) VALUES (?, ?, ?, ?)",
+                        [(oid, pid, q, price) for pid, q, price in items])
+        if channel:
+            con.execute("INSERT INTO payments (order_id, amount, provider, channel, status, payment_ref, "
+                        "created_at, updated_at) VALUES (?, 1, 'mock', ?, 'success', ?, ?, ?)",
+                        (oid, channel, f"ref-{oid}", created, created))
+    # an order of the next day stays out of the report
+    con.execute("INSERT INTO orders (id, user_id, status, created_at) VALUES (5, 1, 'paid', ?)",
+                (f"{DAY + timedelta(days=1)} 00:00:00",))
+    con.execute("INSERT INTO order_items (order_id, product_id, quantity, price) VALUES (5, 1, 7, 5.0)")
+    con.commit()
+    con.close()
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("DATABASE_URL", "sqlite:///" + db_path)
+        from app import create_app
+        app = create_app()
+    from flask_jwt_extended import create_access_token
+    with app.app_context():
+        token = create_access_token(identity="1", additional_claims={"role": "admin"})
+    client = app.test_client()
+    client.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+    return client
+
+
+def test_json_and_csv_agree(client):
+    report = client.get(f"/orders/reports/daily?day={DAY}").get_json()
+    resp = client.get(f"/orders/reports/daily?day={DAY}&format=csv")
+    assert resp.status_code == 200 and resp.mimetype == "text/csv"
+    assert resp.headers["Content-Disposition"] == f"attachment; filename=orders-{DAY}.csv"
+
+    rows = list(csv.DictReader(io.StringIO(resp.get_data(as_text=True))))
+    from_csv = {(r["dimension"], r["key"]): (r["name"], int(r["orders"]), int(r["items"]), float(r["revenue"]))
+                for r in rows}
+    from_json = {("total", "all"): ("", report["totals"]["orders"], report["totals"]["items"],
+                                    report["totals"]["revenue"])}
+    for dimension, section in (("status", "by_status"), ("channel", "by_channel"), ("product", "by_product")):
+        for r in report[section]:
+            from_json[(dimension, r["key"])] = (r.get("name") or "", r["orders"], r["items"], r["revenue"])
+    assert len(rows) == len(from_csv)
+    assert from_csv == from_json
+
+
+def test_report_counts_the_days_orders(client):
+    report = client.get(f"/orders/reports/daily?day={DAY}").get_json()
+    assert report["frozen"] is True
+    assert report["totals"] == {"key": "all", "orders": 4, "items": 10, "revenue": 115.0}
+    assert {r["key"]: r["orders"] for r in report["by_status"]} == {
+        "paid": 1, "delivered": 1, "pending": 1, "cancelled": 1}
+    assert {r["key"]: r["orders"] for r in report["by_channel"]} == {"online": 1, "offline": 1, "unpaid": 2}
+    assert {(r["key"], r["name"]): r["items"] for r in report["by_product"]} == {
+        ("1", "Mug"): 3, ("2", "Kettle, steel"): 3, ("3", "Spoon"): 4}
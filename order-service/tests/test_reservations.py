@@ -0,0 +1,146 @@
+# order-service/tests/test_reservations.py
+"""Stock holds (reservations.py): commit, expiry sweep, cancel, and commit racing the sweeper."""
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+INTERNAL = {"X-Internal-Token": "change-me"}
+
+
+@pytest.fixture(scope="module")
+def app(db_path):
+    con = sqlite3.connect(db_path)
+    con.execute("INSERT INTO users (id, first_name, email, password_hash, role) "
+                "VALUES (1, 'c', 'c@example.com', 'x', 'customer')")
+    con.executemany("INSERT INTO products (id, name, price, stock) VALUES (?, ?, 10.0, 100)",
+                    [(i, f"P{i}") for i in range(1, 6)])
+    con.commit()
+    con.close()
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("DATABASE_URL", "sqlite:///" + db_path)
+        from app import create_app
+        app = create_app()
+    return app
+
+
+@pytest.fixture(scope="module")
+def client(app):
+    from flask_jwt_extended import create_access_token
+    with app.app_context():
+        token = create_access_token(identity="1", additional_claims={"role": "customer"})
+    client = app.test_client()
+    client.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+    return client
+
+
+@pytest.fixture
+def db(db_path):
+    con = sqlite3.connect(db_path, timeout=30)
+    yield con
+    con.close()
+
+
+def _place(client, product_id, quantity):
+    resp = client.post("/orders/", json={"items": [{"product_id": product_id, "quantity": quantity}]})
+    assert resp.status_code == 201
+    return resp.get_json()["order_id"]
+
+
+def _stock(db, product_id):
+    return db.execute("SELECT stock, reserved FROM products WHERE id = ?", (product_id,)).fetchone()
+
+
+def _state(db, order_id):
+    status = db.execute("SELECT status FROM orders WHERE id = ?", (order_id,)).fetchone()[0]
+    holds = [r[0] for r in db.execute("SELECT status FROM stock_reservations WHERE order_id = ?", (order_id,))]
+    return status, holds
+
+
+def _expire(db, order_id):
+    db.execute("UPDATE stock_reservations SET expires_at = ? WHERE order_id = ?",
+               (str(datetime.utcnow() - timedelta(seconds=1)), order_id))
+    db.commit()
+
+
+def test_create_app_starts_no_sweeper(app):
+    import threading
+    assert app.config["RESERVATION_SWEEP_INTERVAL"] == 0
+    assert "reservation-sweeper" not in {t.name for t in threading.enumerate()}
+
+
+def test_reserve_then_commit(client, db):
+    order_id = _place(client, 1, 3)
+    assert _stock(db, 1) == (97, 3)
+    assert _state(db, order_id) == ("reserved", ["held"])
+
+    assert client.post(f"/orders/internal/{order_id}/commit", headers=INTERNAL).status_code == 200
+    assert _stock(db, 1) == (97, 0)
+    assert _state(db, order_id) == ("paid", ["committed"])
+    # a repeated commit (payment retry) changes nothing
+    assert client.post(f"/orders/internal/{order_id}/commit", headers=INTERNAL).get_json()["message"] \
+        == "already committed"
+    assert _stock(db, 1) == (97, 0)
+
+
+def test_reserve_expire_sweep_releases_reserved(app, client, db):
+    from app.reservations import sweep_expired
+    order_id = _place(client, 2, 4)
+    assert _stock(db, 2) == (96, 4)
+    _expire(db, order_id)
+
+    with app.app_context():
+        assert sweep_expired() == 1
+        assert sweep_expired() == 0
+    assert _stock(db, 2) == (100, 0)
+    assert _state(db, order_id) == ("cancelled", ["expired"])
+
+
+def test_cancel_after_commit_restores_stock(client, db):
+    order_id = _place(client, 3, 5)
+    client.post(f"/orders/internal/{order_id}/commit", headers=INTERNAL)
+    assert _stock(db, 3) == (95, 0)
+
+    assert client.put(f"/orders/{order_id}/cancel").status_code == 200
+    assert _stock(db, 3) == (100, 0)
+    assert _state(db, order_id) == ("cancelled", ["committed"])
+
+
+def test_sweep_reading_a_hold_the_commit_then_takes(app, client, db, monkeypatch):
+    """The sweeper picks the order as expired, payment commits it before the sweeper claims it."""
+    from app import reservations
+    order_id = _place(client, 4, 2)
+    _expire(db, order_id)
+    settle = reservations._settle
+
+    def commit_first(order_ids, status, stock_sql, now):
+        monkeypatch.setattr(reservations, "_settle", settle)
+        assert client.post(f"/orders/internal/{order_id}/commit", headers=INTERNAL).status_code == 200
+        return settle(order_ids, status, stock_sql, now)
+
+    monkeypatch.setattr(reservations, "_settle", commit_first)
+    with app.app_context():
+        assert reservations.sweep_expired() == 0
+    assert _stock(db, 4) == (98, 0)
+    assert _state(db, order_id) == ("paid", ["committed"])
+
+
+def test_commit_reading_an_order_the_sweeper_then_expires(app, client, db, monkeypatch):
+    """Payment reads the order as reserved, the sweeper expires it before the commit claims it."""
+    from app import reservations, routes
+    order_id = _place(client, 5, 2)
+    _expire(db, order_id)
+    claim = routes._claim_order
+
+    def sweep_first(oid, old_status, now):
+        monkeypatch.setattr(routes, "_claim_order", claim)
+        with app.app_context():
+            assert reservations.sweep_expired() == 1
+        return claim(oid, old_status, now)
+
+    monkeypatch.setattr(routes, "_claim_order", sweep_first)
+    resp = client.post(f"/orders/internal/{order_id}/commit", headers=INTERNAL)
+    # the expired hold's stock was still there, so the late payment takes it again
+    assert resp.status_code == 200
+    assert _stock(db, 5) == (98, 0)
+    assert _state(db, order_id) == ("paid", ["expired"])
@@ -0,0 +1,76 @@
+# order-service/tests/test_totals.py
+"""The denormalized order totals (totals.py): `flask orders check-totals` finds drift, backfill-totals repairs it."""
+import sqlite3
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def app(db_path):
+    con = sqlite3.connect(db_path)
+    con.execute("INSERT INTO users (id, first_name, email, password_hash, role) "
+                "VALUES (1, 'c', 'c@example.com', 'x', 'customer')")
+    con.executemany("INSERT INTO products (id, name, price, stock) VALUES (?, ?, ?, 100)",
+                    [(1, "Mug", 5.0), (2, "Kettle", 30.0)])
+    con.commit()
+    con.close()
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("DATABASE_URL", "sqlite:///" + db_path)
+        from app import create_app
+        app = create_app()
+    return app
+
+
+@pytest.fixture(scope="module")
+def orders(app):
+    from flask_jwt_extended import create_access_token
+    with app.app_context():
+        token = create_access_token(identity="1", additional_claims={"role": "customer"})
+    client = app.test_client()
+    ids = []
+    for items in ([(1, 2)], [(1, 1), (2, 3)], [(2, 1)]):
+        resp = client.post("/orders/", json={"items": [{"product_id": p, "quantity": q} for p, q in items]},
+                           headers={"Authorization": f"Bearer {token}"})
+        assert resp.status_code == 201
+        ids.append(resp.get_json()["order_id"])
+    return ids
+
+
+@pytest.fixture
+def db(db_path):
+    con = sqlite3.connect(db_path)
+    yield con
+    con.close()
+
+
+def _flask(app, *args):
+    return app.test_cli_runner().invoke(args=list(args))
+
+
+def _totals(db, order_id):
+    return db.execute("SELECT total_amount, item_count, line_count FROM orders WHERE id = ?", (order_id,)).fetchone()
+
+
+def test_checkout_writes_totals_that_match_the_lines(app, orders, db):
+    assert [_totals(db, oid) for oid in orders] == [(10.0, 2, 1), (95.0, 4, 2), (30.0, 1, 1)]
+    result = _flask(app, "orders", "check-totals")
+    assert result.exit_code == 0
+    assert result.output == "ok: all order totals match their lines\n"
+
+
+def test_tampered_total_is_detected_and_repaired(app, orders, db):
+    tampered = orders[1]
+    db.execute("UPDATE orders SET total_amount = 1.0, item_count = 9 WHERE id = ?", (tampered,))
+    db.commit()
+
+    result = _flask(app, "orders", "check-totals", "--batch-size", "2")
+    assert result.exit_code == 1
+    assert result.output.splitlines() == [
+        f"order {tampered}: total_amount 1.0 != 95.0, item_count 9 != 4, line_count 2 != 2",
+        "1 order(s) drifted; run `flask orders backfill-totals` to repair",
+    ]
+
+    result = _flask(app, "orders", "backfill-totals", "--batch-size", "2")
+    assert result.exit_code == 0
+    assert _totals(db, tampered) == (95.0, 4, 2)
+    assert _flask(app, "orders", "check-totals").exit_code == 0
@@ -0,0 +1,124 @@
+# order-service/tests/test_transitions.py
+"""
+Every (old, new) status pair through PUT /orders/<id>/status and
+PUT /orders/status/bulk: allowed moves update the order and its stock,
+the rest are refused and change nothing.
+"""
+import itertools
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+STATUSES = ("reserved", "pending", "paid", "shipped", "delivered", "cancelled")
+ALLOWED = {
+    ("reserved", "paid"), ("reserved", "cancelled"),
+    ("pending", "paid"), ("pending", "cancelled"),
+    ("paid", "shipped"), ("paid", "delivered"), ("paid", "cancelled"),
+    ("shipped", "delivered"),
+}
+PAIRS = list(itertools.product(STATUSES, STATUSES))
+STOCK = 10
+
+
+@pytest.fixture(scope="module")
+def app(db_path):
+    con = sqlite3.connect(db_path)
+    con.execute("INSERT INTO users (id, first_name, email, password_hash, role) "
+                "VALUES (1, 'c', 'c@example.com', 'x', 'customer')")
+    con.commit()
+    con.close()
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("DATABASE_URL", "sqlite:///" + db_path)
+        from app import create_app
+        app = create_app()
+    return app
+
+
+@pytest.fixture(scope="module")
+def client(app):
+    from flask_jwt_extended import create_access_token
+    with app.app_context():
+        token = create_access_token(identity="1", additional_claims={"role": "admin"})
+    client = app.test_client()
+    client.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+    return client
+
+
+@pytest.fixture
+def db(db_path):
+    con = sqlite3.connect(db_path, timeout=30)
+    yield con
+    con.close()
+
+
+def _order(db, status):
+    """An order for one unit of a product of its own, with the stock state its status implies."""
+    now = datetime.utcnow()
+    held = status == "reserved"
+    # reserved orders hold their unit; other live or closed orders took it for good
+    product_id = db.execute("INSERT INTO products (name, price, stock, reserved) VALUES ('P', 2.0, ?, ?)",
+                            (STOCK - 1, int(held))).lastrowid
+    order_id = db.execute("INSERT INTO orders (user_id, status, created_at, updated_at, total_amount, item_count, "
+                          "line_count) VALUES (1, ?, ?, ?, 2.0, 1, 1)", (status, now, now)).lastrowid
+    db.execute("INSERT INTO order_items (order_id, product_id, quantity, price) VALUES (?, ?, 1, 2.0)",
+               (order_id, product_id))
+    if held:
+        db.execute("INSERT INTO stock_reservations (order_id, product_id, quantity, status, expires_at, created_at, "
+                   "updated_at) VALUES (?, ?, 1, 'held', ?, ?, ?)",
+                   (order_id, product_id, now + timedelta(minutes=15), now, now))
+    db.commit()
+    return order_id, product_id
+
+
+def _expected_stock(old, new):
+    """(stock, reserved) of the order's product after the move."""
+    if (old, new) not in ALLOWED:
+        return (STOCK - 1, int(old == "reserved"))
+    if new == "cancelled":
+        return (STOCK, 0)
+    return (STOCK - 1, 0)
+
+
+def _state(db, order_id, product_id):
+    status = db.execute("SELECT status FROM orders WHERE id = ?", (order_id,)).fetchone()[0]
+    stock = db.execute("SELECT stock, reserved FROM products WHERE id = ?", (product_id,)).fetchone()
+    events = db.execute("SELECT old_status, new_status FROM order_events WHERE order_id = ?", (order_id,)).fetchall()
+    return status, stock, events
+
+
+def test_table_matches_allowed_transitions():
+    from app.transitions import ALLOWED_TRANSITIONS
+    assert set(ALLOWED_TRANSITIONS) == set(STATUSES)
+    assert {(old, new) for old, targets in ALLOWED_TRANSITIONS.items() for new in targets} == ALLOWED
+
+
+@pytest.mark.parametrize("old, new", PAIRS)
+def test_single_status_update(client, db, old, new):
+    order_id, product_id = _order(db, old)
+    resp = client.put(f"/orders/{order_id}/status", json={"status": new})
+
+    if (old, new) in ALLOWED:
+        assert resp.status_code == 200
+        assert _state(db, order_id, product_id) == (new, _expected_stock(old, new), [(old, new)])
+    else:
+        # the same status again is a no-op; every other move is refused
+        assert resp.status_code == (200 if old == new else 400)
+        assert _state(db, order_id, product_id) == (old, _expected_stock(old, new), [])
+
+
+@pytest.mark.parametrize("new", STATUSES)
+def test_bulk_status_update(client, db, new):
+    """One order from every status in a single request: each gets its own result."""
+    orders = {old: _order(db, old) for old in STATUSES}
+    resp = client.put("/orders/status/bulk", json={"order_ids": [oid for oid, _ in orders.values()], "status": new})
+    assert resp.status_code == 200
+    body = resp.get_json()
+    results = {r["order_id"]: r["result"] for r in body["results"]}
+
+    for old, (order_id, product_id) in orders.items():
+        moved = (old, new) in ALLOWED
+        assert results[order_id] == ("updated" if moved else "unchanged" if old == new else "rejected")
+        assert _state(db, order_id, product_id) == (
+            new if moved else old, _expected_stock(old, new), [(old, new)] if moved else [])
+    assert body["updated"] == sum((old, new) in ALLOWED for old in STATUSES)
@@ -21,6 +21,9 @@ def create_app():
         "DATABASE_URL", "sqlite:///../smartretail.db"
     )
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    # Idempotency-Key: how long responses are kept, how long a duplicate waits
+    app.config["IDEMPOTENCY_TTL"] = int(os.getenv("IDEMPOTENCY_TTL", "86400"))
+    app.config["IDEMPOTENCY_WAIT"] = float(os.getenv("IDEMPOTENCY_WAIT", "10"))
 
     # Initialize extensions
     db.init_app(app)
@@ -0,0 +1,127 @@
+# idempotency.py
+#
+# Kept byte-identical in order-service/app/ and payment-service/app/ (the
+# services share no package); change both together:
+# order-service/tests/test_idempotency.py fails while they differ.
+"""
+Idempotency-Key support for retried POSTs.
+
+The first request with a given key claims a row in idempotency_keys (unique
+on scope + key) before the view runs, and the finished response is stored
+on that row. A retry with the same key gets the stored response back
+without running the view again. A concurrent duplicate finds the claim and
+waits for it to finish, up to IDEMPOTENCY_WAIT seconds. Keys expire after
+IDEMPOTENCY_TTL.
+"""
+from datetime import datetime, timedelta
+from functools import wraps
+from hashlib import sha256
+import time
+from flask import Response, current_app, make_response, request
+from sqlalchemy.exc import IntegrityError
+from . import db
+from .models import IdempotencyKey
+
+MAX_KEY_LENGTH = 255
+
+
+def _replay(row):
+    return Response(row.response_body, status=row.response_code, mimetype=row.response_mimetype,
+                    headers={"Idempotent-Replayed": "true"})
+
+
+def _error(message, code):
+    return make_response({"error": message}, code)
+
+
+def _claim(scope, key, fingerprint):
+    """The claimed row, or the existing row for (scope, key) if someone else holds it."""
+    now = datetime.utcnow()
+    row = IdempotencyKey(scope=scope, key=key, request_hash=fingerprint, status="in_progress",
+                         created_at=now, expires_at=now + timedelta(seconds=current_app.config["IDEMPOTENCY_TTL"]))
+    db.session.add(row)
+    try:
+        db.session.commit()
+        return row, True
+    except IntegrityError:
+        db.session.rollback()
+    existing = IdempotencyKey.query.filter_by(scope=scope, key=key).first()
+    if existing is not None and existing.expires_at <= now:
+        # stale key: drop it and claim afresh
+        IdempotencyKey.query.filter_by(id=existing.id).delete()
+        db.session.commit()
+        return _claim(scope, key, fingerprint)
+    return existing, False
+
+
+def _wait_for(row_id):
+    """Poll an in-progress key until it finishes or IDEMPOTENCY_WAIT runs out."""
+    deadline = time.monotonic() + current_app.config["IDEMPOTENCY_WAIT"]
+    while True:
+        db.session.rollback()  # end the read so the next poll sees new commits
+        row = db.session.get(IdempotencyKey, row_id)
+        if row is None or row.status == "done" or time.monotonic() >= deadline:
+            return row
+        time.sleep(0.05)
+
+
+def idempotent(scope_fn):
+    """
+    Make a POST view honour the Idempotency-Key header. `scope_fn()` names
+    the key space (e.g. per user and endpoint) so keys from different
+    callers never collide. Requests without the header run as before.
+    Responses are stored unless they are 409 or 5xx; those stay retryable.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request.headers.get("Idempotency-Key")
+            if not key:
+                return view(*args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return _error(f"Idempotency-Key longer than {MAX_KEY_LENGTH} characters", 400)
+
+            scope = scope_fn()
+            fingerprint = sha256(request.get_data()).hexdigest()
+            row, claimed = _claim(scope, key, fingerprint)
+            if not claimed:
+                if row.request_hash != fingerprint:
+                    return _error("Idempotency-Key was already used with a different request", 422)
+                if row.status != "done":
+                    row = _wait_for(row.id)
+                if row is None:
+                    return _error("Previous request with this Idempotency-Key failed, retry", 409)
+                if row.status != "done":
+                    resp = _error("A request with this Idempotency-Key is still in progress", 409)
+                    resp.headers["Retry-After"] = "1"
+                    return resp
+                return _replay(row)
+
+            row_id = row.id
+            try:
+                resp = make_response(view(*args, **kwargs))
+            except Exception:
+                db.session.rollback()
+                IdempotencyKey.query.filter_by(id=row_id).delete()
+                db.session.commit()
+                raise
+            if resp.status_code >= 500 or resp.status_code == 409:
+                IdempotencyKey.query.filter_by(id=row_id).delete()
+            else:
+                IdempotencyKey.query.filter_by(id=row_id).update({
+                    "status": "done",
+                    "response_code": resp.status_code,
+                    "response_body": resp.get_data(as_text=True),
+                    "response_mimetype": resp.mimetype,
+                })
+            db.session.commit()
+            return resp
+        return wrapper
+    return decorator
+
+
+def purge_expired_keys(now=None):
+    """Delete expired idempotency keys; returns how many were removed."""
+    n = IdempotencyKey.query.filter(IdempotencyKey.expires_at <= (now or datetime.utcnow())).delete()
+    db.session.commit()
+    return n
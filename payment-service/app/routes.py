@@ -2,7 +2,8 @@ from flask import Blueprint, request, jsonify, current_app
 from werkzeug.utils import secure_filename
 from . import db
 from .models import Payment, OfflineReceipt
-from .utils import set_order_status, commit_stock
+from .idempotency import idempotent
+from .utils import commit_stock
 import secrets
 import os
 from datetime import datetime
@@ -321,6 +322,7 @@ def get_payment(payment_id: int):
 # Your existing endpoints with minor improvements...
 
 @payment_bp.route("/initiate", methods=["POST"])
+@idempotent(lambda: f"order:{(request.get_json(silent=True) or {}).get('order_id')}:POST /payments/initiate")
 def initiate():
     data = request.get_json() or {}
     order_id = data.get("order_id")
@@ -372,9 +374,11 @@ def webhook():
     db.session.commit()
 
     if p.status == "success":
-        set_order_status(p.order_id, "paid")
-        commit_stock(p.order_id)
-        return {"message": "Payment updated", "order_status": "paid"}, 200
+        # commits the stock hold and moves the order to paid
+        if commit_stock(p.order_id):
+            return {"message": "Payment updated", "order_status": "paid"}, 200
+        current_app.logger.error(f"Payment {p.id} succeeded but order {p.order_id} could not be committed")
+        return {"message": "Payment updated but order commit failed"}, 200
 
     return {"message": "Payment failed"}, 200
 
@@ -396,8 +400,8 @@ def verify(payment_id: int):
 
         if approved:
             try:
-                set_order_status(p.order_id, "paid")
-                commit_stock(p.order_id)
+                if not commit_stock(p.order_id):
+                    raise RuntimeError(f"order {p.order_id} could not be committed")
                 return {
                     "payment_id": p.id, 
                     "status": p.status, 
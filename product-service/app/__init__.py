@@ -23,12 +23,28 @@ def create_app():
     app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL", "sqlite:///../smartretail.db")
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "supersecret")
+    # Product search (search.py): results per page, and the typo fallback's
+    # trigram candidates and minimum name similarity
+    app.config["SEARCH_DEFAULT_LIMIT"] = int(os.getenv("SEARCH_DEFAULT_LIMIT", "50"))
+    app.config["SEARCH_MAX_LIMIT"] = int(os.getenv("SEARCH_MAX_LIMIT", "200"))
+    app.config["SEARCH_FUZZY_CANDIDATES"] = int(os.getenv("SEARCH_FUZZY_CANDIDATES", "200"))
+    app.config["SEARCH_FUZZY_MIN_SIMILARITY"] = float(os.getenv("SEARCH_FUZZY_MIN_SIMILARITY", "0.3"))
+    # Batch lookup (/products/batch): ids per request, products kept in memory
+    app.config["PRODUCT_BATCH_MAX_IDS"] = int(os.getenv("PRODUCT_BATCH_MAX_IDS", "500"))
+    app.config["PRODUCT_CACHE_SIZE"] = int(os.getenv("PRODUCT_CACHE_SIZE", "10000"))
+    # Streaming import (importer.py): rows per transaction, row errors kept in the report
+    app.config["IMPORT_CHUNK_SIZE"] = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+    app.config["IMPORT_MAX_ERRORS"] = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
 
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
-    CORS(app)
+    # Let browsers read the listing's search mode, pagination and version headers
+    CORS(app, expose_headers=["X-Search-Mode", "X-Next-Cursor", "Link", "ETag"])
+
+    from .lru import ProductCache
+    app.extensions["product_cache"] = ProductCache(app.config["PRODUCT_CACHE_SIZE"])
 
     # Import models so migrations detect Product table
     from . import models  
@@ -37,4 +53,9 @@ def create_app():
     from .routes import product_bp
     app.register_blueprint(product_bp)
 
+    from .commands import catalog_cli, products_cli, search_cli
+    app.cli.add_command(search_cli)
+    app.cli.add_command(catalog_cli)
+    app.cli.add_command(products_cli)
+
     return app
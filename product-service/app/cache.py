@@ -0,0 +1,86 @@
+# product-service/app/cache.py
+"""
+In-process product cache.
+
+Product fields are split in two. Hot fields (stock, and updated_at, which
+moves with it) change with every checkout and are always read from the
+database; cold fields (sku, name, description, price, image_url, created_at)
+rarely change and are kept in a bounded LRU keyed by product id (lru.py).
+
+Every lookup reads the hot fields of the wanted ids together with
+catalog_version.static_version, which triggers bump on every insert,
+delete and cold-field update of products, from any process (catalog.py).
+A cache that sees it move drops all its entries, which keeps the caches
+of several worker processes coherent; writes made through this process
+also drop their products at once (invalidate()). products.updated_at
+cannot serve for this: every stock write (checkouts, holds, releases) sets
+it too, so it cannot tell a cold-field change from a sale.
+"""
+from flask import current_app
+from sqlalchemy import DateTime, bindparam, select, text
+from sqlalchemy.exc import OperationalError
+from . import db
+from .models import Product
+
+HOT_FIELDS = ("stock", "updated_at")
+COLD_FIELDS = ("sku", "name", "description", "price", "image_url", "created_at")
+
+HOT_SQL = text("""
+SELECT p.id, p.stock, p.updated_at, v.static_version
+FROM products p
+LEFT JOIN catalog_version v ON v.id = 1
+WHERE p.id IN :ids
+""").bindparams(bindparam("ids", expanding=True)).columns(updated_at=DateTime)
+
+
+def product_cache():
+    return current_app.extensions["product_cache"]
+
+
+def _columns(fields):
+    return [Product.id] + [getattr(Product, f) for f in fields if f != "id"]
+
+
+def load(ids, fields):
+    """
+    {id: {field: value}} of the products among `ids` that exist, with
+    `fields` (names from the listing's PRODUCT_FIELDS). Costs one query for
+    the hot fields and version, plus one IN query for the cold fields of
+    cache misses, if any.
+    """
+    if not ids:
+        return {}
+    try:
+        rows = db.session.execute(HOT_SQL, {"ids": list(ids)}).all()
+    except OperationalError:
+        # no catalog_version.static_version yet (`flask catalog ensure`): no caching
+        db.session.rollback()
+        rows = db.session.execute(select(*_columns(fields)).where(Product.id.in_(ids)))
+        return {r.id: {f: getattr(r, f) for f in fields} for r in rows}
+
+    cold_fields = [f for f in fields if f in COLD_FIELDS]
+    cold = {r.id: {} for r in rows}
+    if cold_fields and rows and rows[0].static_version is not None:
+        version = rows[0].static_version
+        found, to_load = product_cache().get_many(list(cold), cold_fields, version)
+        if to_load:
+            loaded = {
+                r.id: {f: getattr(r, f) for f in cold_fields}
+                for r in db.session.execute(select(*_columns(cold_fields)).where(Product.id.in_(to_load)))
+            }
+            product_cache().put_many(loaded, version)
+            found.update(loaded)
+        cold = found
+    elif cold_fields:
+        cold = {
+            r.id: {f: getattr(r, f) for f in cold_fields}
+            for r in db.session.execute(select(*_columns(cold_fields)).where(Product.id.in_(list(cold))))
+        }
+
+    products = {}
+    for r in rows:
+        if r.id not in cold:
+            continue    # deleted between the two reads
+        product = {"id": r.id, "stock": r.stock, "updated_at": r.updated_at, **cold[r.id]}
+        products[r.id] = {f: product[f] for f in fields}
+    return products
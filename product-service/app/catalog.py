@@ -0,0 +1,87 @@
+# product-service/app/catalog.py
+"""
+Catalog version: one counter row in catalog_version, bumped by triggers on
+every insert, delete and listed-field update of products, by any service
+(checkouts changing stock included). The product listing derives its ETag
+and Last-Modified from it, so a client revalidating an unchanged catalog
+gets 304 after one primary-key lookup, without reading products.
+
+static_version on the same row moves only on inserts, deletes and updates
+of the fields that rarely change (not stock); the product caches
+(cache.py) check it to stay coherent across processes.
+
+auth-service's models create the table, its row and the triggers;
+`flask catalog ensure` adds them, the listing's sort indexes and the
+import's products.sku column to an existing database.
+"""
+from datetime import datetime
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError
+from . import db
+
+BUMP_BOTH = ("UPDATE catalog_version SET version = version + 1, static_version = static_version + 1, "
+             "updated_at = CURRENT_TIMESTAMP WHERE id = 1;")
+
+# Same schema as CatalogVersion, CATALOG_VERSION_DDL and the Product indexes in
+# auth-service/app/models.py; triggers are dropped first so that ensure()
+# replaces older definitions
+CATALOG_DDL = [
+    "CREATE TABLE IF NOT EXISTS catalog_version ("
+    "id INTEGER NOT NULL PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0, "
+    "static_version INTEGER NOT NULL DEFAULT 0, updated_at DATETIME)",
+    "INSERT OR IGNORE INTO catalog_version (id, version, updated_at) VALUES (1, 0, CURRENT_TIMESTAMP)",
+    "DROP TRIGGER IF EXISTS catalog_version_ai",
+    f"""CREATE TRIGGER catalog_version_ai AFTER INSERT ON products BEGIN
+      {BUMP_BOTH}
+    END""",
+    "DROP TRIGGER IF EXISTS catalog_version_ad",
+    f"""CREATE TRIGGER catalog_version_ad AFTER DELETE ON products BEGIN
+      {BUMP_BOTH}
+    END""",
+    "DROP TRIGGER IF EXISTS catalog_version_au",
+    """CREATE TRIGGER catalog_version_au
+    AFTER UPDATE OF sku, name, description, price, stock, image_url ON products BEGIN
+      UPDATE catalog_version SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = 1;
+    END""",
+    "DROP TRIGGER IF EXISTS catalog_version_au_static",
+    """CREATE TRIGGER catalog_version_au_static
+    AFTER UPDATE OF sku, name, description, price, image_url ON products BEGIN
+      UPDATE catalog_version SET static_version = static_version + 1 WHERE id = 1;
+    END""",
+    "CREATE INDEX IF NOT EXISTS ix_products_price ON products (price)",
+    "CREATE INDEX IF NOT EXISTS ix_products_name ON products (name)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_products_sku ON products (sku)",
+]
+
+
+def ensure():
+    """
+    Create or upgrade the version table, its row and triggers, the sort
+    indexes and products.sku with its unique index.
+    """
+    if "sku" not in {c["name"] for c in inspect(db.engine).get_columns("products")}:
+        db.session.execute(text("ALTER TABLE products ADD COLUMN sku VARCHAR(64)"))
+    tables = inspect(db.engine).get_table_names()
+    if "catalog_version" in tables and "static_version" not in {
+        c["name"] for c in inspect(db.engine).get_columns("catalog_version")
+    }:
+        db.session.execute(text(
+            "ALTER TABLE catalog_version ADD COLUMN static_version INTEGER NOT NULL DEFAULT 0"))
+    for ddl in CATALOG_DDL:
+        db.session.execute(text(ddl))
+    db.session.commit()
+
+
+def current_version():
+    """(version, updated_at) of the catalog, or None if catalog_version does not exist yet."""
+    try:
+        row = db.session.execute(text("SELECT version, updated_at FROM catalog_version WHERE id = 1")).first()
+    except OperationalError:
+        db.session.rollback()
+        return None
+    if row is None:
+        return None
+    updated_at = row.updated_at
+    if isinstance(updated_at, str):
+        updated_at = datetime.fromisoformat(updated_at)
+    return row.version, updated_at
@@ -0,0 +1,48 @@
+# product-service/app/commands.py
+import click
+from flask.cli import AppGroup
+import json
+from . import catalog, importer, search
+
+search_cli = AppGroup("search", help="Maintain the product full-text search index.")
+catalog_cli = AppGroup("catalog", help="Maintain the catalog version and listing indexes.")
+products_cli = AppGroup("products", help="Load products in bulk.")
+
+
+@search_cli.command("rebuild")
+def rebuild_command():
+    """Create the search tables and triggers if missing and reindex every product."""
+    search.ensure_index(rebuild=True)
+    click.echo("product search index rebuilt")
+
+
+@catalog_cli.command("ensure")
+def ensure_catalog_command():
+    """Create catalog_version, its triggers and the listing sort indexes if missing."""
+    catalog.ensure()
+    click.echo("catalog version and sort indexes ensured")
+
+
+@products_cli.command("import")
+@click.argument("feed", type=click.File("rb"))
+@click.option("--format", "fmt", type=click.Choice(importer.FORMATS), help="default: from the file extension")
+@click.option("--chunk-size", type=int, help="rows per transaction (default IMPORT_CHUNK_SIZE)")
+@click.option("--report", type=click.Path(dir_okay=False, writable=True), help="write the full JSON report here")
+def import_command(feed, fmt, chunk_size, report):
+    """Upsert products on sku from a CSV or NDJSON FEED ('-' for stdin)."""
+    fmt = fmt or ("csv" if feed.name.endswith(".csv") else "ndjson" if feed.name.endswith((".ndjson", ".jsonl"))
+                  else None)
+    if fmt is None:
+        raise click.ClickException("cannot tell the format from the file name; pass --format")
+
+    def progress(r):
+        click.echo(f"{r.rows} rows: {r.created} created, {r.updated} updated, {r.failed} failed", err=True)
+
+    result = importer.import_products(feed, fmt, chunk_size, on_chunk=progress)
+    for e in result["errors"][:20]:
+        click.echo(f"line {e['line']} ({e['sku']}): {e['error']}")
+    if report:
+        with open(report, "w") as f:
+            json.dump(result, f, indent=2)
+    click.echo(f"{result['rows']} rows in {result['seconds']}s ({result['rows_per_sec']} rows/s): "
+               f"{result['created']} created, {result['updated']} updated, {result['failed']} failed")
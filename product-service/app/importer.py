@@ -0,0 +1,210 @@
+# product-service/app/importer.py
+"""
+Streaming product import (supplier feeds), keyed on sku.
+
+Rows are parsed one at a time from a CSV (header row) or NDJSON (one JSON
+object per line) byte stream and written IMPORT_CHUNK_SIZE at a time: one
+IN query finds which skus already exist, each row is validated against
+that (a new sku needs name, price and stock; an existing one may carry
+any subset, e.g. a stock-only feed), then one executemany upsert
+(INSERT ... ON CONFLICT (sku) DO UPDATE) writes the chunk, which commits
+on its own. Bad rows land in the report with their line number instead of
+stopping the import; a chunk the database refuses is reported row by row
+and the import goes on. Only the current chunk and the first
+IMPORT_MAX_ERRORS errors are held, so memory does not grow with the file.
+
+The search index and catalog version follow through their triggers.
+"""
+import csv
+import io
+import json
+import math
+import time
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import DateTime, bindparam, text
+from sqlalchemy.exc import SQLAlchemyError
+from . import db
+
+FORMATS = ("csv", "ndjson")
+IMPORT_FIELDS = ("sku", "name", "description", "price", "stock", "image_url")
+
+# Absent fields are NULL and keep their value on update. SQLite checks NOT
+# NULL on the VALUES before it sees the conflict, hence the COALESCEs there
+# too; new skus always carry name, price and stock (_write_chunk).
+UPSERT_SQL = text("""
+INSERT INTO products (sku, name, description, price, stock, reserved, image_url, created_at)
+VALUES (:sku, COALESCE(:name, ''), COALESCE(:description, ''), COALESCE(:price, 0), COALESCE(:stock, 0), 0,
+        COALESCE(:image_url, ''), :now)
+ON CONFLICT (sku) DO UPDATE SET
+  name = COALESCE(:name, products.name),
+  description = COALESCE(:description, products.description),
+  price = COALESCE(:price, products.price),
+  stock = COALESCE(:stock, products.stock),
+  image_url = COALESCE(:image_url, products.image_url),
+  updated_at = :now
+""").bindparams(bindparam("now", type_=DateTime))
+
+EXISTING_SKUS_SQL = text("SELECT sku FROM products WHERE sku IN :skus").bindparams(
+    bindparam("skus", expanding=True))
+
+
+def detect_format(fmt, content_type):
+    """'csv' or 'ndjson' from an explicit `fmt` or the Content-Type; None if neither says."""
+    if fmt:
+        return fmt if fmt in FORMATS else None
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type in ("text/csv", "application/csv"):
+        return "csv"
+    if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        return "ndjson"
+    return None
+
+
+def read_rows(stream, fmt):
+    """Yield (line number, row dict or error string) from a binary stream, one row at a time."""
+    lines = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_no, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_no, f"invalid JSON: {e}"
+            continue
+        yield line_no, row if isinstance(row, dict) else "each line must be a JSON object"
+
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def parse_row(row):
+    """Upsert parameters for one input row, or raise ValueError; absent fields are None."""
+    params = {f: None if _blank(row.get(f)) else row.get(f) for f in IMPORT_FIELDS}
+    if params["sku"] is None:
+        raise ValueError("sku is required")
+    params["sku"] = str(params["sku"]).strip()
+    if len(params["sku"]) > 64:
+        raise ValueError("sku is longer than 64 characters")
+    if params["name"] is not None:
+        params["name"] = str(params["name"]).strip()
+        if len(params["name"]) > 100:
+            raise ValueError("name is longer than 100 characters")
+    if params["price"] is not None:
+        try:
+            params["price"] = float(params["price"])
+        except (TypeError, ValueError):
+            raise ValueError("price must be a number") from None
+        if not math.isfinite(params["price"]) or params["price"] < 0:
+            raise ValueError("price must be a non-negative number")
+    if params["stock"] is not None:
+        try:
+            params["stock"] = int(str(params["stock"]).strip())
+        except ValueError:
+            raise ValueError("stock must be an integer") from None
+        if params["stock"] < 0:
+            raise ValueError("stock cannot be negative")
+    return params
+
+
+class ImportReport:
+    """Counts, throughput and the first `max_errors` row errors of one import."""
+
+    def __init__(self, max_errors):
+        self.max_errors = max_errors
+        self.rows = self.created = self.updated = self.failed = self.chunks = 0
+        self.errors = []
+        self.started = time.perf_counter()
+
+    def error(self, line, sku, message):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "sku": sku, "error": message})
+
+    def as_dict(self):
+        seconds = time.perf_counter() - self.started
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "updated": self.updated,
+            "failed": self.failed,
+            "chunks": self.chunks,
+            "seconds": round(seconds, 2),
+            "rows_per_sec": round(self.rows / seconds, 1) if seconds else None,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+def _write_chunk(chunk, report):
+    """Validate and upsert one chunk of (line, row) pairs in its own transaction."""
+    skus = {str(row.get("sku")).strip() for _, row in chunk if isinstance(row, dict) and not _blank(row.get("sku"))}
+    known = set(db.session.execute(EXISTING_SKUS_SQL, {"skus": list(skus)}).scalars()) if skus else set()
+
+    now = datetime.utcnow()
+    batch, created = [], 0
+    for line, row in chunk:
+        if isinstance(row, str):
+            report.error(line, None, row)
+            continue
+        try:
+            params = parse_row(row)
+        except ValueError as e:
+            report.error(line, row.get("sku"), str(e))
+            continue
+        if params["sku"] not in known:
+            absent = [f for f in ("name", "price", "stock") if params[f] is None]
+            if absent:
+                report.error(line, params["sku"], f"new sku needs {', '.join(absent)}")
+                continue
+            known.add(params["sku"])      # a repeat later in the chunk is an update
+            created += 1
+        batch.append((line, {**params, "now": now}))
+
+    if batch:
+        try:
+            db.session.execute(UPSERT_SQL, [params for _, params in batch])
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            message = f"chunk rejected by the database: {getattr(e, 'orig', e)}"
+            for line, params in batch:
+                report.error(line, params["sku"], message)
+            created = 0
+            batch = []
+    report.created += created
+    report.updated += len(batch) - created
+    report.chunks += 1
+
+
+def import_products(stream, fmt, chunk_size=None, on_chunk=None):
+    """
+    Upsert every row of `stream` (bytes, `fmt` 'csv' or 'ndjson'); returns
+    the report as a dict. `on_chunk(report)` is called after each chunk.
+    """
+    chunk_size = chunk_size or current_app.config["IMPORT_CHUNK_SIZE"]
+    report = ImportReport(current_app.config["IMPORT_MAX_ERRORS"])
+    chunk = []
+    for line, row in read_rows(stream, fmt):
+        report.rows += 1
+        chunk.append((line, row))
+        if len(chunk) >= chunk_size:
+            _write_chunk(chunk, report)
+            chunk = []
+            if on_chunk:
+                on_chunk(report)
+    if chunk:
+        _write_chunk(chunk, report)
+        if on_chunk:
+            on_chunk(report)
+    result = report.as_dict()
+    current_app.logger.info(
+        "product import: %(rows)s rows, %(created)s created, %(updated)s updated, "
+        "%(failed)s failed in %(seconds)ss (%(rows_per_sec)s rows/s)", result)
+    return result
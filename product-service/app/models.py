@@ -5,14 +5,23 @@ class Product(db.Model):
     __tablename__ = "products"  # explicit table name for clarity
 
     id = db.Column(db.Integer, primary_key=True)
+    sku = db.Column(db.String(64), nullable=True)     # supplier key, unique when set (importer.py)
     name = db.Column(db.String(100), nullable=False)  # product name
     description = db.Column(db.Text, nullable=True)   # optional description
     price = db.Column(db.Float, nullable=False)       # product price
     stock = db.Column(db.Integer, default=0)          # available stock
+    reserved = db.Column(db.Integer, nullable=False, default=0, server_default="0")  # held by unpaid orders
     image_url = db.Column(db.String(255), nullable=True)  # product image link
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        # keyset-paginated listing sorted by price or name (rowid rides along)
+        db.Index("ix_products_price", "price"),
+        db.Index("ix_products_name", "name"),
+        db.Index("ux_products_sku", "sku", unique=True),
+    )
+
     def __repr__(self):
         return f"<Product {self.name} (Stock: {self.stock})>"
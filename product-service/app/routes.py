@@ -1,7 +1,14 @@
-from flask import Blueprint, request, jsonify
+import base64
+from datetime import timezone
+from urllib.parse import urlencode
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt
+from sqlalchemy import tuple_
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import load_only
 from .models import Product
-from . import db
+from . import catalog, db, importer, search
+from .cache import load, product_cache
 
 # Define blueprint for product routes
 product_bp = Blueprint("products", __name__, url_prefix="/products")
@@ -15,64 +22,258 @@ def is_admin():
     return claims.get("role") == "admin"
 
 
+# -------------------------------
+# Helpers: listing projection, sort and keyset cursor
+# -------------------------------
+PRODUCT_FIELDS = ("id", "sku", "name", "description", "price", "stock", "image_url", "created_at", "updated_at")
+SORT_COLUMNS = ("id", "price", "name")  # sort=<column> ascending, sort=-<column> descending
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def parse_fields(raw):
+    """
+    Fields named in `raw` ("a,b" or a list; id always included), all of
+    them if empty; ValueError if unknown.
+    """
+    if not raw:
+        return list(PRODUCT_FIELDS)
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    if not isinstance(raw, list):
+        raise ValueError("fields must be a comma separated string or a list")
+    wanted = {str(f).strip() for f in raw if str(f).strip()}
+    unknown = wanted - set(PRODUCT_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+    return [f for f in PRODUCT_FIELDS if f in wanted or f == "id"]
+
+
+def projection(fields):
+    """load_only() for `fields`, so e.g. description is not read."""
+    return load_only(*(getattr(Product, f) for f in fields))
+
+
+def parse_ids(raw, max_ids):
+    """Distinct product ids, in order, from "1,2,3" or [1, 2, 3]; ValueError if invalid or too many."""
+    if isinstance(raw, str):
+        raw = [i for i in raw.split(",") if i.strip()]
+    if not isinstance(raw, list) or not raw:
+        raise ValueError("ids is required: a comma separated string or a list of product ids")
+    try:
+        ids = list(dict.fromkeys(int(i) for i in raw))
+    except (TypeError, ValueError):
+        raise ValueError("ids must be integers") from None
+    if len(ids) > max_ids:
+        raise ValueError(f"At most {max_ids} ids per request")
+    return ids
+
+
+def product_dict(p, fields):
+    return {f: getattr(p, f) for f in fields}
+
+
+def encode_cursor(sort, value, product_id):
+    raw = f"{sort}|{value}|{product_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort):
+    """(sort value, id) from encode_cursor(); ValueError if malformed or made for another sort."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        cursor_sort, rest = raw.split("|", 1)
+        value, product_id = rest.rsplit("|", 1)
+        column = cursor_sort.lstrip("-")
+        if column == "price":
+            value = float(value)
+        elif column == "id":
+            value = int(value)
+        product_id = int(product_id)
+    except ValueError:
+        raise ValueError("Invalid cursor") from None
+    if cursor_sort != sort:
+        raise ValueError("cursor was made for another sort")
+    return value, product_id
+
+
+def _not_modified(version):
+    """True if the request's validators match the catalog `version` (ETag first, then date)."""
+    number, updated_at = version
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(f"catalog-{number}")
+    if request.if_modified_since and updated_at:
+        return updated_at.replace(microsecond=0, tzinfo=timezone.utc) <= request.if_modified_since
+    return False
+
+
+def _set_validators(response, version):
+    if version:
+        number, updated_at = version
+        response.set_etag(f"catalog-{number}")
+        if updated_at:
+            response.last_modified = updated_at.replace(tzinfo=timezone.utc)
+        response.headers["Cache-Control"] = "no-cache"  # cache, but revalidate every time
+    return response
+
+
 # -------------------------------
 # PUBLIC ROUTES (no login required)
 # -------------------------------
 
 @product_bp.route("/", methods=["GET"])
 def list_products():
-    """List products with optional filters"""
-    query = Product.query
+    """
+    List products with optional filters.
+
+    Query args: min_price, max_price, fields (comma separated, e.g.
+    fields=id,name,price to skip description), sort (id, price, name; -
+    for descending). Passing limit or cursor pages the listing on (sort,
+    id): the next page's cursor comes in X-Next-Cursor and a Link
+    rel="next" header. Without them the whole catalog is returned.
+
+    `q` (or `name`) is a full-text search over name and description, best
+    matches first (see search.py); `limit` caps its results, which are not
+    paged or sorted otherwise.
+
+    Pages and search results take their product fields from load() (see
+    cache.py); the whole-catalog listing reads them directly.
+
+    Responses carry an ETag / Last-Modified for the catalog version (see
+    catalog.py); a matching If-None-Match / If-Modified-Since gets 304
+    before products is read.
+    """
+    # Read the version before the products, so a concurrent change can
+    # only make the body newer than its ETag, never older.
+    version = catalog.current_version()
+    if version and _not_modified(version):
+        return _set_validators(current_app.response_class(status=304), version)
 
     # Filters
-    name = request.args.get("name")          # search by name
-    min_price = request.args.get("min_price")
-    max_price = request.args.get("max_price")
+    term = request.args.get("q") or request.args.get("name")   # search by name/description
+    min_price = request.args.get("min_price", type=float)
+    max_price = request.args.get("max_price", type=float)
     category = request.args.get("category")  # later we can add category field
+    sort = request.args.get("sort", "id")
+    cursor = request.args.get("cursor")
+    try:
+        fields = parse_fields(request.args.get("fields"))
+        if sort.lstrip("-") not in SORT_COLUMNS:
+            raise ValueError(f"sort must be one of {', '.join(SORT_COLUMNS)} (- for descending)")
+        if term and (cursor or "sort" in request.args):
+            raise ValueError("cursor and sort do not apply to search results (q)")
+        after = decode_cursor(cursor, sort) if cursor else None
+        limit = request.args.get("limit", type=int)
+        if "limit" in request.args and limit is None:
+            raise ValueError("limit must be an integer")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    if name:
-        query = query.filter(Product.name.ilike(f"%{name}%"))  # case-insensitive search
-    if min_price:
-        query = query.filter(Product.price >= float(min_price))
-    if max_price:
-        query = query.filter(Product.price <= float(max_price))
-    # Note: category is not yet in Product model, but can be added later
-
-    products = query.all()
-
-    result = []
-    for p in products:
-        result.append({
-            "id": p.id,
-            "name": p.name,
-            "description": p.description,
-            "price": p.price,
-            "stock": p.stock,
-            "image_url": p.image_url,
-            "created_at": p.created_at,
-            "updated_at": p.updated_at
-        })
-
-    return jsonify(result), 200
+    query = Product.query
+    mode = None
+    if term:
+        limit = min(limit or current_app.config["SEARCH_DEFAULT_LIMIT"], current_app.config["SEARCH_MAX_LIMIT"])
+        try:
+            ids, mode = search.search_ids(term, min_price, max_price, max(limit, 1))
+        except OperationalError:
+            # search tables not created yet (`flask search rebuild`): substring match
+            db.session.rollback()
+            mode = "like"
+            query = query.filter(Product.name.ilike(f"%{term}%"))  # case-insensitive search
+            limit = None
+
+    next_cursor = None
+    if mode in ("fts", "fuzzy"):
+        found = load(ids, fields)
+        products = [found[pid] for pid in ids if pid in found]
+    else:
+        if min_price is not None:
+            query = query.filter(Product.price >= min_price)
+        if max_price is not None:
+            query = query.filter(Product.price <= max_price)
+        # Note: category is not yet in Product model, but can be added later
+
+        column = getattr(Product, sort.lstrip("-"))
+        descending = sort.startswith("-")
+        if after:
+            value, product_id = after
+            key = Product.id if column is Product.id else tuple_(column, Product.id)
+            bound = product_id if column is Product.id else (value, product_id)
+            query = query.filter(key < bound if descending else key > bound)
+        order = [column.desc() if descending else column]
+        if column is not Product.id:
+            order.append(Product.id.desc() if descending else Product.id)
+        query = query.order_by(*order)
+
+        if limit is not None or cursor:
+            # the page's keys from the sort index, then its fields through the cache
+            limit = min(max(limit or DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE)
+            keys = query.with_entities(Product.id, column).limit(limit + 1).all()
+            if len(keys) > limit:
+                keys = keys[:limit]
+                next_cursor = encode_cursor(sort, keys[-1][1], keys[-1][0])
+            found = load([pid for pid, _ in keys], fields)
+            products = [found[pid] for pid, _ in keys if pid in found]
+        else:
+            products = [product_dict(p, fields) for p in query.options(projection(fields)).all()]
+
+    response = jsonify(products)
+    if mode:
+        response.headers["X-Search-Mode"] = mode
+    if next_cursor:
+        args = request.args.to_dict()
+        args["cursor"] = next_cursor
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+    return _set_validators(response, version), 200
+
+
+@product_bp.route("/batch", methods=["GET", "POST"])
+def batch_products():
+    """
+    Look up many products at once: GET ?ids=1,2,3&fields=name,price or
+    POST {"ids": [1, 2, 3], "fields": ["name", "price"]}, at most
+    PRODUCT_BATCH_MAX_IDS ids. Answers {"products": {id: {...}},
+    "missing": [ids with no product]}.
+
+    Stock is read for every id in one IN query, the other fields come from
+    the product cache or, for misses, one more IN query of the requested
+    fields (see cache.py). GET carries the listing's ETag / Last-Modified.
+    """
+    version = catalog.current_version()
+    if request.method == "GET":
+        if version and _not_modified(version):
+            return _set_validators(current_app.response_class(status=304), version)
+        raw_ids, raw_fields = request.args.get("ids", ""), request.args.get("fields")
+    else:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"error": "Expected a JSON object with ids"}), 400
+        raw_ids, raw_fields = data.get("ids"), data.get("fields")
+    try:
+        ids = parse_ids(raw_ids, current_app.config["PRODUCT_BATCH_MAX_IDS"])
+        fields = parse_fields(raw_fields)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    found = load(ids, fields)
+    response = jsonify({
+        "products": {str(pid): found[pid] for pid in ids if pid in found},
+        "missing": [pid for pid in ids if pid not in found],
+    })
+    if request.method == "GET":
+        _set_validators(response, version)
+    return response, 200
 
 
 @product_bp.route("/<int:product_id>", methods=["GET"])
 def get_product(product_id):
-    """Get a single product by ID (public)"""
-    product = Product.query.get(product_id)
+    """Get a single product by ID (public); fields other than stock come from the product cache"""
+    product = load([product_id], PRODUCT_FIELDS).get(product_id)
     if not product:
         return jsonify({"error": "Product not found"}), 404
 
-    return jsonify({
-        "id": product.id,
-        "name": product.name,
-        "description": product.description,
-        "price": product.price,
-        "stock": product.stock,
-        "image_url": product.image_url,
-        "created_at": product.created_at,
-        "updated_at": product.updated_at
-    }), 200
+    return jsonify(product), 200
 
 
 # -------------------------------
@@ -93,6 +294,7 @@ def create_product():
             return jsonify({"error": f"{f} is required"}), 400
 
     new_product = Product(
+        sku=data.get("sku"),
         name=data["name"],
         description=data.get("description", ""),
         price=data["price"],
@@ -100,7 +302,11 @@ def create_product():
         image_url=data.get("image_url", "")
     )
     db.session.add(new_product)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error": f"sku {data.get('sku')} already exists"}), 409
 
     return jsonify({"message": "Product created", "id": new_product.id}), 201
 
@@ -117,13 +323,19 @@ def update_product(product_id):
         return jsonify({"error": "Product not found"}), 404
 
     data = request.get_json()
+    product.sku = data.get("sku", product.sku)
     product.name = data.get("name", product.name)
     product.description = data.get("description", product.description)
     product.price = data.get("price", product.price)
     product.stock = data.get("stock", product.stock)
     product.image_url = data.get("image_url", product.image_url)
 
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error": f"sku {data.get('sku')} already exists"}), 409
+    product_cache().invalidate([product_id])
     return jsonify({"message": "Product updated"}), 200
 
 
@@ -140,13 +352,18 @@ def delete_product(product_id):
 
     db.session.delete(product)
     db.session.commit()
+    product_cache().invalidate([product_id])
     return jsonify({"message": "Product deleted"}), 200
 
 
 @product_bp.route("/bulk", methods=["POST"])
 @jwt_required()
 def bulk_add_products():
-    """Admin: Add multiple products at once"""
+    """
+    Admin: Add multiple products at once; all or nothing. Answers with the
+    created ids, in input order. For large or repeated feeds use
+    POST /products/import.
+    """
     if not is_admin():
         return jsonify({"error": "Admins only"}), 403
 
@@ -161,6 +378,7 @@ def bulk_add_products():
             return jsonify({"error": "Each product requires name, price, and stock"}), 400
 
         product = Product(
+            sku=item.get("sku"),
             name=item["name"],
             description=item.get("description", ""),
             price=item["price"],
@@ -169,10 +387,43 @@ def bulk_add_products():
         )
         products.append(product)
 
-    db.session.bulk_save_objects(products)
-    db.session.commit()
+    # add_all + flush: batched INSERT ... RETURNING, so the new ids are known
+    db.session.add_all(products)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error": "A sku already exists or repeats in the list"}), 409
 
-    return jsonify({"message": f"{len(products)} products added successfully"}), 201
+    return jsonify({
+        "message": f"{len(products)} products added successfully",
+        "ids": [p.id for p in products],
+    }), 201
+
+
+@product_bp.route("/import", methods=["POST"])
+@jwt_required()
+def import_products():
+    """
+    Admin: Stream a supplier feed into the catalog, upserting on sku (see
+    importer.py). The body is the raw file: CSV with a header row
+    (Content-Type text/csv) or NDJSON (application/x-ndjson), or say which
+    with ?format=csv|ndjson. Columns: sku, name, description, price,
+    stock, image_url; ?chunk_size= rows per transaction. Answers with the
+    import report: counts, throughput and the row errors.
+    """
+    if not is_admin():
+        return jsonify({"error": "Admins only"}), 403
+
+    fmt = importer.detect_format(request.args.get("format"), request.content_type)
+    if fmt is None:
+        return jsonify({"error": "Send text/csv or application/x-ndjson, or pass format=csv|ndjson"}), 400
+    chunk_size = request.args.get("chunk_size", type=int)
+    if chunk_size is not None and chunk_size < 1:
+        return jsonify({"error": "chunk_size must be a positive integer"}), 400
+
+    report = importer.import_products(request.stream, fmt, chunk_size)
+    return jsonify(report), 200
 
 @product_bp.route("/<int:product_id>/stock", methods=["PUT"])
 def update_stock(product_id):
@@ -189,3 +440,12 @@ def update_stock(product_id):
 
     db.session.commit()
     return jsonify({"message": f"Stock updated for {product.name}", "stock": product.stock}), 200
+
+
+@product_bp.route("/cache/stats", methods=["GET"])
+@jwt_required()
+def product_cache_stats():
+    """Admin: hit rate and size of this worker process's product cache"""
+    if not is_admin():
+        return jsonify({"error": "Admins only"}), 403
+    return jsonify(product_cache().stats()), 200
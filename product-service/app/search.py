@@ -0,0 +1,158 @@
+# product-service/app/search.py
+"""
+Full-text product search on SQLite FTS5.
+
+products_fts indexes name and description word by word: every word of the
+query must match, as a word or a word prefix ("stee cha" finds "Steel
+Chair"), and hits are ranked by bm25 with the name weighted above the
+description. Matches in the name come first; the description is only
+searched when they do not fill the page, since ranking costs as much as
+there are matches and common words are everywhere in descriptions.
+
+When that finds nothing (usually a typo), products_trigram gives the names
+sharing the most trigrams with the query, which are re-ranked by word
+similarity() and kept from SEARCH_FUZZY_MIN_SIMILARITY up.
+
+Both tables use products as their external content and are kept in sync by
+triggers. auth-service's models create them with the products table;
+`flask search rebuild` adds them to an existing database and reindexes it.
+"""
+import re
+from flask import current_app
+from sqlalchemy import text
+from . import db
+
+# Same statements as PRODUCT_SEARCH_DDL in auth-service/app/models.py
+SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+    "name, description, content='products', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_trigram USING fts5("
+    "name, content='products', content_rowid='id', tokenize='trigram')",
+    """CREATE TRIGGER IF NOT EXISTS products_search_ai AFTER INSERT ON products BEGIN
+      INSERT INTO products_fts (rowid, name, description) VALUES (new.id, new.name, new.description);
+      INSERT INTO products_trigram (rowid, name) VALUES (new.id, new.name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_search_ad AFTER DELETE ON products BEGIN
+      INSERT INTO products_fts (products_fts, rowid, name, description)
+      VALUES ('delete', old.id, old.name, old.description);
+      INSERT INTO products_trigram (products_trigram, rowid, name) VALUES ('delete', old.id, old.name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_search_au AFTER UPDATE OF name, description ON products BEGIN
+      INSERT INTO products_fts (products_fts, rowid, name, description)
+      VALUES ('delete', old.id, old.name, old.description);
+      INSERT INTO products_trigram (products_trigram, rowid, name) VALUES ('delete', old.id, old.name);
+      INSERT INTO products_fts (rowid, name, description) VALUES (new.id, new.name, new.description);
+      INSERT INTO products_trigram (rowid, name) VALUES (new.id, new.name);
+    END""",
+]
+
+# bm25 column weights: name, description
+NAME_WEIGHT, DESCRIPTION_WEIGHT = 10.0, 1.0
+
+PRICE_FILTERS_SQL = """
+  AND (:min_price IS NULL OR p.price >= :min_price)
+  AND (:max_price IS NULL OR p.price <= :max_price)
+"""
+
+FTS_SQL = f"""
+SELECT p.id
+FROM products_fts
+JOIN products p ON p.id = products_fts.rowid
+WHERE products_fts MATCH :match
+{PRICE_FILTERS_SQL}
+ORDER BY bm25(products_fts, {NAME_WEIGHT}, {DESCRIPTION_WEIGHT}), p.id
+LIMIT :limit
+"""
+
+TRIGRAM_SQL = f"""
+SELECT p.id, p.name
+FROM products_trigram
+JOIN products p ON p.id = products_trigram.rowid
+WHERE products_trigram MATCH :match
+{PRICE_FILTERS_SQL}
+ORDER BY bm25(products_trigram), p.id
+LIMIT :limit
+"""
+
+_WORD = re.compile(r"\w+")
+
+
+def ensure_index(rebuild=False):
+    """Create the search tables and triggers if missing; with `rebuild`, reindex every product."""
+    for ddl in SEARCH_DDL:
+        db.session.execute(text(ddl))
+    if rebuild:
+        db.session.execute(text("INSERT INTO products_fts (products_fts) VALUES ('rebuild')"))
+        db.session.execute(text("INSERT INTO products_trigram (products_trigram) VALUES ('rebuild')"))
+    db.session.commit()
+
+
+def words(s):
+    return _WORD.findall(s.lower())
+
+
+def match_query(term):
+    """FTS5 query for `term`: every word, each as a quoted prefix; None if it has no words."""
+    return " AND ".join(f'"{w}"*' for w in words(term)) or None
+
+
+def word_trigrams(word):
+    """Trigrams of `word` padded as pg_trgm does, so word starts and ends count."""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(query_grams, name):
+    """
+    Mean, over the query's words, of the trigram (Jaccard) similarity of the
+    closest word of `name`: "stel chiar" vs "Oak Steel Chair" scores 0.39.
+    """
+    name_grams = [word_trigrams(w) for w in words(name)]
+    if not query_grams or not name_grams:
+        return 0.0
+    return sum(
+        max(len(q & n) / len(q | n) for n in name_grams) for q in query_grams
+    ) / len(query_grams)
+
+
+def _fts_ids(match, params, limit):
+    if limit <= 0:
+        return []
+    return db.session.execute(text(FTS_SQL), {**params, "match": match, "limit": limit}).scalars().all()
+
+
+def _fuzzy_ids(term, params, limit):
+    query_words = words(term)
+    # the trigram index only matches whole trigrams, so words of 3+ letters
+    grams = sorted({w[i:i + 3] for w in query_words for i in range(len(w) - 2)})
+    if not grams:
+        return []
+    rows = db.session.execute(text(TRIGRAM_SQL), {
+        **params,
+        "match": " OR ".join(f'"{g}"' for g in grams),
+        "limit": current_app.config["SEARCH_FUZZY_CANDIDATES"],
+    })
+    query_grams = [word_trigrams(w) for w in query_words]
+    threshold = current_app.config["SEARCH_FUZZY_MIN_SIMILARITY"]
+    scored = [(similarity(query_grams, r.name), r.id) for r in rows]
+    scored = [(score, pid) for score, pid in scored if score >= threshold]
+    scored.sort(key=lambda s: (-s[0], s[1]))
+    return [pid for _, pid in scored[:limit]]
+
+
+def search_ids(term, min_price=None, max_price=None, limit=50):
+    """
+    Ids of the products matching `term` within the price bounds, best first,
+    and how they were found: "fts" (word/prefix match) or "fuzzy" (trigram
+    fallback). Raises OperationalError if the search tables do not exist.
+    """
+    params = {"min_price": min_price, "max_price": max_price}
+    match = match_query(term)
+    ids = []
+    if match:
+        ids = _fts_ids(f"name : ({match})", params, limit)
+        ids += _fts_ids(f"({match}) NOT name : ({match})", params, limit - len(ids))
+    if ids:
+        return ids, "fts"
+    return _fuzzy_ids(term, params, limit), "fuzzy"
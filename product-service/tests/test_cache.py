@@ -0,0 +1,114 @@
+# product-service/tests/test_cache.py
+"""The product cache: the LRU (lru.py) and its coherence through catalog_version.static_version (cache.py)."""
+import filecmp
+import os
+import sqlite3
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def app(db_path):
+    con = sqlite3.connect(db_path)
+    con.executemany("INSERT INTO products (id, name, price, stock) VALUES (?, ?, ?, 10)",
+                    [(1, "Mug", 5.0), (2, "Kettle", 30.0)])
+    con.commit()
+    con.close()
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("DATABASE_URL", "sqlite:///" + db_path)
+        from app import create_app
+        app = create_app()
+    return app
+
+
+@pytest.fixture
+def db(db_path):
+    con = sqlite3.connect(db_path)
+    yield con
+    con.close()
+
+
+def _stats(app):
+    return app.extensions["product_cache"].stats()
+
+
+def _get(client, product_id):
+    resp = client.get(f"/products/{product_id}")
+    return resp.status_code, resp.get_json()
+
+
+def test_lru_evicts_the_least_recently_used():
+    from app.lru import ProductCache
+    cache = ProductCache(2)
+    cache.get_many([1, 2], ("name",), 7)
+    cache.put_many({1: {"name": "a"}, 2: {"name": "b"}}, 7)
+    assert cache.get_many([1], ("name",), 7) == ({1: {"name": "a"}}, [])   # 1 is now the newest
+    cache.put_many({3: {"name": "c"}}, 7)
+    assert cache.get_many([1, 2, 3], ("name",), 7) == ({1: {"name": "a"}, 3: {"name": "c"}}, [2])
+    # an entry without every wanted field is a miss
+    assert cache.get_many([1], ("name", "price"), 7) == ({}, [1])
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_drops_everything_when_the_version_moves():
+    from app.lru import ProductCache
+    cache = ProductCache(10)
+    cache.get_many([1], ("name",), 1)
+    cache.put_many({1: {"name": "a"}}, 1)
+    assert cache.get_many([1], ("name",), 2) == ({}, [1])
+    # a load that started under the old version is not stored
+    cache.put_many({1: {"name": "stale"}}, 1)
+    assert cache.get_many([1], ("name",), 2) == ({}, [1])
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_repeated_lookups_hit_the_cache(app):
+    client = app.test_client()
+    assert _get(client, 1)[0] == 200
+    before = _stats(app)
+    status, product = _get(client, 1)
+    assert (status, product["name"], product["price"]) == (200, "Mug", 5.0)
+    after = _stats(app)
+    assert after["hits"] == before["hits"] + 1 and after["misses"] == before["misses"]
+
+
+def test_cold_field_change_by_another_process_invalidates(app, db):
+    client = app.test_client()
+    _get(client, 2)
+    version = db.execute("SELECT static_version FROM catalog_version").fetchone()[0]
+    invalidations = _stats(app)["invalidations"]
+
+    db.execute("UPDATE products SET price = 35.0 WHERE id = 2")   # not through this process
+    db.commit()
+    assert db.execute("SELECT static_version FROM catalog_version").fetchone()[0] == version + 1
+    assert _get(client, 2)[1]["price"] == 35.0
+    assert _stats(app)["invalidations"] == invalidations + 1
+
+
+def test_stock_change_keeps_the_cache_and_is_read_fresh(app, db):
+    client = app.test_client()
+    _get(client, 1)
+    catalog = db.execute("SELECT version, static_version FROM catalog_version").fetchone()
+    before = _stats(app)
+
+    assert client.put("/products/1/stock", json={"quantity": -3}).status_code == 200
+    version, static_version = db.execute("SELECT version, static_version FROM catalog_version").fetchone()
+    assert (version, static_version) == (catalog[0] + 1, catalog[1])
+    status, product = _get(client, 1)
+    assert (status, product["stock"]) == (200, 7)
+    after = _stats(app)
+    assert after["invalidations"] == before["invalidations"]
+    assert after["hits"] == before["hits"] + 1
+
+
+def test_missing_product_is_404_and_not_cached(app):
+    client = app.test_client()
+    before = _stats(app)
+    assert _get(client, 999) == (404, {"error": "Product not found"})
+    after = _stats(app)
+    assert (after["size"], after["misses"]) == (before["size"], before["misses"])
+
+
+def test_order_service_copy_has_not_drifted(service_package):
+    order = os.path.join(os.path.dirname(service_package), "order-service", "app", "lru.py")
+    assert filecmp.cmp(os.path.join(service_package, "app", "lru.py"), order, shallow=False)
@@ -0,0 +1,70 @@
+# product-service/tests/test_importer.py
+"""Streaming sku upserts (importer.py) and POST /products/import."""
+import io
+import sqlite3
+
+import pytest
+
+FEED = b"""sku,name,description,price,stock,image_url
+A-1,Desk lamp,LED,25.00,10,
+A-2,Floor lamp,,80,5,
+A-3,Broken price,,n/a,1,
+A-4,,no name,9.99,1,
+A-5,Kettle,,30,-2,
+A-1,Desk lamp v2,,26.50,,
+"""
+
+
+@pytest.fixture(scope="module")
+def app(db_path):
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("DATABASE_URL", "sqlite:///" + db_path)
+        from app import create_app
+        app = create_app()
+    return app
+
+
+def _rows(db_path):
+    con = sqlite3.connect(db_path)
+    rows = {r[0]: r[1:] for r in con.execute("SELECT sku, name, price, stock FROM products WHERE sku IS NOT NULL")}
+    con.close()
+    return rows
+
+
+def test_csv_import_upserts_good_rows_and_reports_bad_ones(app, db_path):
+    from app import importer
+    with app.app_context():
+        report = importer.import_products(io.BytesIO(FEED), "csv", chunk_size=2)
+
+    assert (report["rows"], report["created"], report["updated"], report["failed"]) == (6, 2, 1, 3)
+    assert report["chunks"] == 3
+    assert [(e["line"], e["sku"]) for e in report["errors"]] == [(4, "A-3"), (5, "A-4"), (6, "A-5")]
+    # the repeated A-1 updated name and price and kept the stock it left blank
+    assert _rows(db_path) == {"A-1": ("Desk lamp v2", 26.5, 10), "A-2": ("Floor lamp", 80.0, 5)}
+
+
+def test_ndjson_endpoint_updates_stock_only(app, db_path):
+    from flask_jwt_extended import create_access_token
+    with app.app_context():
+        token = create_access_token(identity="1", additional_claims={"role": "admin"})
+    feed = b'{"sku": "A-2", "stock": 7}\n\n{"sku": "B-1"}\nnot json\n'
+    resp = app.test_client().post("/products/import", data=feed, content_type="application/x-ndjson",
+                                  headers={"Authorization": f"Bearer {token}"})
+
+    assert resp.status_code == 200
+    report = resp.get_json()
+    assert (report["updated"], report["created"], report["failed"]) == (1, 0, 2)
+    assert [e["line"] for e in report["errors"]] == [3, 4]
+    assert _rows(db_path)["A-2"] == ("Floor lamp", 80.0, 7)
+
+
+def test_endpoint_is_admin_only_and_needs_a_format(app):
+    from flask_jwt_extended import create_access_token
+    with app.app_context():
+        customer = create_access_token(identity="2", additional_claims={"role": "customer"})
+        admin = create_access_token(identity="1", additional_claims={"role": "admin"})
+    client = app.test_client()
+    assert client.post("/products/import", data=FEED, content_type="text/csv",
+                       headers={"Authorization": f"Bearer {customer}"}).status_code == 403
+    assert client.post("/products/import", data=FEED, content_type="text/plain",
+                       headers={"Authorization": f"Bearer {admin}"}).status_code == 400
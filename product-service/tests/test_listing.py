@@ -0,0 +1,115 @@
+# product-service/tests/test_listing.py
+"""GET /products/: conditional requests on the catalog version (catalog.py) and keyset pages."""
+import sqlite3
+from datetime import timedelta
+from email.utils import format_datetime
+
+import pytest
+from sqlalchemy import event
+
+# a price shared by a dozen products, and names shared in pairs
+TIED = [(i, f"Socks {i // 2}", 9.99) for i in range(4, 16)]
+
+
+@pytest.fixture(scope="module")
+def app(db_path):
+    con = sqlite3.connect(db_path)
+    con.executemany("INSERT INTO products (id, name, price, stock) VALUES (?, ?, ?, 10)",
+                    [(1, "Mug", 5.0), (2, "Kettle", 30.0), (3, "Lamp", 25.0)] + TIED)
+    con.commit()
+    con.close()
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("DATABASE_URL", "sqlite:///" + db_path)
+        from app import create_app
+        app = create_app()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def statements(app):
+    """SQL run while the test makes its requests."""
+    from app import db
+    seen = []
+
+    def record(conn, cursor, statement, *args):
+        seen.append(statement)
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", record)
+    yield seen
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_listing_carries_catalog_validators(client):
+    resp = client.get("/products/")
+    assert resp.status_code == 200
+    assert resp.headers["ETag"].startswith('"catalog-')
+    assert resp.headers["Cache-Control"] == "no-cache"
+    assert resp.last_modified is not None
+
+
+def test_matching_etag_gets_304_without_reading_products(client, statements):
+    etag = client.get("/products/").headers["ETag"]
+    statements.clear()
+    resp = client.get("/products/", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.data == b""
+    assert resp.headers["ETag"] == etag
+    assert len(statements) == 1 and "FROM catalog_version" in statements[0]
+
+
+def test_if_modified_since_gets_304(client):
+    last_modified = client.get("/products/").last_modified
+    assert client.get("/products/", headers={"If-Modified-Since": format_datetime(last_modified, usegmt=True)}
+                      ).status_code == 304
+    earlier = format_datetime(last_modified - timedelta(seconds=1), usegmt=True)
+    assert client.get("/products/", headers={"If-Modified-Since": earlier}).status_code == 200
+
+
+def test_any_product_write_changes_the_etag(client):
+    etag = client.get("/products/").headers["ETag"]
+    # a stock change (checkouts, holds, raw SQL from other services) counts too
+    assert client.put("/products/1/stock", json={"quantity": -1}).status_code == 200
+    resp = client.get("/products/", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
+    assert {p["id"]: p["stock"] for p in resp.get_json()}[1] == 9
+
+
+def _pages(client, sort, limit):
+    pages, cursor = [], None
+    while True:
+        query = {"sort": sort, "limit": limit, "fields": "id", **({"cursor": cursor} if cursor else {})}
+        resp = client.get("/products/", query_string=query)
+        assert resp.status_code == 200
+        pages.append([p["id"] for p in resp.get_json()])
+        cursor = resp.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages
+
+
+@pytest.mark.parametrize("sort", ["price", "-price", "name", "-name"])
+@pytest.mark.parametrize("limit", [1, 5, 12, 15])
+def test_pages_have_no_duplicates_or_gaps_across_ties(client, sort, limit):
+    everything = [p["id"] for p in client.get("/products/", query_string={"sort": sort}).get_json()]
+    assert len(everything) == 15
+    pages = _pages(client, sort, limit)
+    assert [pid for page in pages for pid in page] == everything
+    assert all(len(page) == limit for page in pages[:-1])
+
+
+def test_tied_prices_are_ordered_by_id(client):
+    ids = [p["id"] for p in client.get("/products/", query_string={"sort": "price"}).get_json()]
+    assert ids[1:13] == [i for i, _, _ in TIED]
+    ids = [p["id"] for p in client.get("/products/", query_string={"sort": "-price"}).get_json()]
+    assert ids[2:14] == [i for i, _, _ in reversed(TIED)]
+
+
+def test_cursor_of_another_sort_is_refused(client):
+    cursor = client.get("/products/", query_string={"sort": "price", "limit": 2}).headers["X-Next-Cursor"]
+    assert client.get("/products/", query_string={"sort": "name", "cursor": cursor}).status_code == 400
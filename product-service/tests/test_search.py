@@ -0,0 +1,65 @@
+# product-service/tests/test_search.py
+"""Full-text product search (search.py) through GET /products/?q=."""
+import sqlite3
+
+import pytest
+
+PRODUCTS = [
+    (1, "Desk lamp", "Adjustable LED light", 25.0),
+    (2, "Floor lamp", "Tall reading light", 80.0),
+    (3, "Electric kettle", "Boils water fast", 30.0),
+    (4, "Reading chair", "Comfortable armchair with a lamp holder", 150.0),
+    (5, "Café table", "Round oak table", 120.0),
+]
+
+
+@pytest.fixture(scope="module")
+def client(db_path):
+    con = sqlite3.connect(db_path)
+    con.executemany("INSERT INTO products (id, name, description, price, stock) VALUES (?, ?, ?, ?, 10)",
+                    PRODUCTS)
+    con.commit()
+    con.close()
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("DATABASE_URL", "sqlite:///" + db_path)
+        from app import create_app
+        app = create_app()
+    return app.test_client()
+
+
+def _search(client, **args):
+    resp = client.get("/products/", query_string=args)
+    assert resp.status_code == 200
+    return resp.headers.get("X-Search-Mode"), [p["id"] for p in resp.get_json()]
+
+
+def test_prefix_match_ranks_name_hits_before_description_hits(client):
+    mode, ids = _search(client, q="lam")
+    assert mode == "fts"
+    assert sorted(ids[:2]) == [1, 2]
+    assert ids[2:] == [4]
+
+
+def test_words_are_anded_and_diacritics_ignored(client):
+    mode, ids = _search(client, q="reading lamp")
+    assert (mode, sorted(ids)) == ("fts", [2, 4])
+    assert _search(client, q="cafe") == ("fts", [5])
+
+
+def test_price_filters_compose_with_search(client):
+    assert _search(client, q="lamp", max_price=50) == ("fts", [1])
+    assert _search(client, q="lamp", min_price=100) == ("fts", [4])
+
+
+def test_typo_falls_back_to_trigram_match(client):
+    assert _search(client, q="kettel") == ("fuzzy", [3])
+
+
+def test_index_follows_updates_and_deletes(client, db_path):
+    con = sqlite3.connect(db_path)
+    con.execute("UPDATE products SET name = 'Water boiler' WHERE id = 3")
+    con.execute("DELETE FROM products WHERE id = 1")
+    con.commit()
+    con.close()
+    assert _search(client, q="boiler")[1] == [3]
+    assert _search(client, q="lamp", max_price=50)[1] == []